@@ -1,21 +1,79 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+# first, so .env is in the environment before any module reads its settings
+from settings import settings
+from flask import Flask, Request, request, jsonify, send_from_directory, send_file, Response
 from flask_cors import CORS
-from txt_to_3d import txt_gen_3d
-from images_to_image import images_gen_image
-from vista_3d_to_images import render_views_with_pyvista
+from txt_to_3d import DEFAULT_QUALITY, QUALITY_TIERS, txt_gen_3d, txt_gen_3d_preview, txt_refine_3d
+from images_to_image import frames_gen_image
+from image_encoding import save_frames
+from glb_optimize import LOD_LEVELS, fresh_lod_path, optimize_glb_async
 from image_to_3d import image_gen_3d
+from model_serving import content_hash, send_model
 from werkzeug.utils import secure_filename
-from openai import OpenAI
+from werkzeug.security import safe_join
+from werkzeug.exceptions import RequestEntityTooLarge
+from jobs import JobManager, QueueFullError
+from result_cache import ResultCache, text_key, image_key, remix_key
+from artifact_store import ArtifactStore, StageTimings
+from retention import RetentionManager
+from batch_generate import BATCH_MAX_ITEMS, OUTPUT_FILES, load_checkpoint, normalize_item, run_batch
+from rate_limit import UpstreamBusyError, upstream_call
+from http_session import get_openai_client
+from image_ingest import INGEST_CACHE_DIR, ingested_path, verify
+from tracing import get_trace, span
+from audio_ingest import AUDIO_MAX_BYTES, prepare_audio
+from render_service import render_frames
+from glb_ingest import GLB_MAX_BYTES, UPLOAD_STAGING_DIR, GlbTooLargeError, GlbUpload, InvalidGlbError
+import metrics
+import prewarm
 import uuid, os
-import io
+import shutil
+import tempfile
+import random
+import json
+import time
+import hashlib
+
+class StreamingUploadRequest(Request):
+    """Streams /upload file parts through GLB validation and hashing as they arrive, instead of spooling them first."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == "upload_glb":
+            return GlbUpload()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
 
 app = Flask(__name__, static_folder="../frontend", static_url_path="/")
-CORS(app)
+app.request_class = StreamingUploadRequest
+CORS(app, expose_headers=["X-Model-LOD"])
 
-# OpenAI client - requires OPENAI_API_KEY in the environment
-client = OpenAI()
 DEBUG_AUDIO_DIR = "/tmp/debug_audio"
-os.makedirs(DEBUG_AUDIO_DIR, exist_ok=True)
+# Fraction of transcription uploads kept in DEBUG_AUDIO_DIR for listening to later; off by default
+DEBUG_AUDIO_SAMPLE_RATE = float(os.getenv("DEBUG_AUDIO_SAMPLE_RATE", "0"))
+# Checkpoints and manifests of batch generations
+BATCHES_DIR = os.path.join(os.getcwd(), "batches")
+# Models from before artifacts existed, still served by /models
+MODELS_DIR = os.path.join(os.getcwd(), "3d_files")
+# Also write the rendered views of every remix to disk as PNGs (debugging only)
+SAVE_RENDERED_VIEWS = os.getenv("SAVE_RENDERED_VIEWS", "0") == "1"
+if DEBUG_AUDIO_SAMPLE_RATE > 0:
+    os.makedirs(DEBUG_AUDIO_DIR, exist_ok=True)
+
+# Long-running generations run on a bounded worker pool; routes only enqueue them
+jobs = JobManager()
+# Finished generations keyed by their inputs, so repeats skip Meshy/OpenAI entirely
+result_cache = ResultCache()
+# Every generation and upload gets its own artifact directory and index entry
+artifacts = ArtifactStore()
+# Keeps artifacts, legacy output directories and debug audio within their TTLs and the disk quota
+retention = RetentionManager(artifacts, {
+    "models": [MODELS_DIR],
+    "images": [os.path.join(os.getcwd(), "images"), os.path.join(os.getcwd(), "image")],
+    "debug_audio": [DEBUG_AUDIO_DIR],
+    "batches": [BATCHES_DIR],
+    "ingest": [INGEST_CACHE_DIR, UPLOAD_STAGING_DIR],
+}).start()
+# Heavy dependencies load lazily; this loads them in the background so the first render does not wait
+prewarm.start()
 
 @app.route("/")
 def serve_index():
@@ -29,142 +87,580 @@ def chat():
     return jsonify(reply=response)
 
 
+def cache_info(key, hit, started=None):
+    info = {"hit": hit, "key": key}
+    if started is not None:
+        info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return info
+
+
+def current_session():
+    """Session the request belongs to; the frontend sends one id per browser."""
+    return request.headers.get("X-Session-Id") or None
+
+
+def artifact_url(artifact_id, name):
+    """Content-addressed URL of a file in an artifact."""
+    path = artifacts.file_path(artifact_id, name)
+    return f"/artifacts/{artifact_id}/files/{name}?v={content_hash(path)}"
+
+
+def finish_artifact(artifact_id, status, files, model, timings, **models):
+    """Record the outcome; on success returns the result fields naming the artifact and its model URLs."""
+    artifacts.finish(artifact_id, status, files=files, model=model if status == "success" else None, timings=timings)
+    if status != "success":
+        return {"artifact_id": artifact_id}
+    for name in models.values():
+        optimize_glb_async(artifacts.file_path(artifact_id, name))
+    return {"artifact_id": artifact_id, "models": {role: artifact_url(artifact_id, name) for role, name in models.items()}}
+
+
+def refine_url(artifact_id):
+    return f"/artifacts/{artifact_id}/refine"
+
+
+def finish_fast_txtgen3d(artifact_id, timings):
+    """Result fields of a successful preview-only text-to-3d artifact."""
+    fields = finish_artifact(artifact_id, "success", ("draft_model.glb",), "draft_model.glb", timings,
+                             draft="draft_model.glb")
+    return {**fields, "quality": "fast", "refine_url": refine_url(artifact_id)}
+
+
+def run_txtgen3d(text, artstyle, artifact_id, cache_key, quality="full", on_progress=None):
+    timings = StageTimings(on_progress)
+    save_path = artifacts.dir(artifact_id)
+    refined_path = os.path.join(save_path, "refined_model.glb")
+    draft_path = os.path.join(save_path, "draft_model.glb")
+
+    if quality == "fast":
+        task_id = txt_gen_3d_preview(text, artstyle, save_path, timings)
+        artifacts.update(artifact_id, task_id=task_id)
+        if task_id is None or not os.path.exists(draft_path):
+            finish_artifact(artifact_id, "fail", ("draft_model.glb",), None, timings.finish())
+            return {"status": "fail", "message": "Rendering failed.", "artifact_id": artifact_id}
+        result_cache.put(cache_key, "text-to-3d", {"draft_model.glb": draft_path}, meta={"preview_task_id": task_id})
+        fields = finish_fast_txtgen3d(artifact_id, timings.finish())
+        return {"status": "success", "message": "Rendering complete.", "cache": cache_info(cache_key, False), **fields}
+
+    task_id = txt_gen_3d(text, artstyle, save_path, timings)
+    artifacts.update(artifact_id, task_id=task_id)
+    files = ("draft_model.glb", "refined_model.glb")
+
+    if os.path.exists(refined_path) and os.path.exists(draft_path):
+        result_cache.put(cache_key, "text-to-3d", {"draft_model.glb": draft_path, "refined_model.glb": refined_path},
+                         meta={"preview_task_id": task_id})
+        fields = finish_artifact(artifact_id, "success", files, "refined_model.glb", timings.finish(),
+                                 draft="draft_model.glb", refined="refined_model.glb")
+        return {"status": "success", "message": "Rendering complete.", "cache": cache_info(cache_key, False), **fields}
+    finish_artifact(artifact_id, "fail", files, None, timings.finish())
+    return {"status": "fail", "message": "Rendering failed.", "artifact_id": artifact_id}
+
+
+def run_refine(parent_id, preview_task_id, artifact_id, cache_key, on_progress=None):
+    timings = StageTimings(on_progress)
+    save_path = artifacts.dir(artifact_id)
+    refined_path = os.path.join(save_path, "refined_model.glb")
+    draft_path = os.path.join(save_path, "draft_model.glb")
+    files = ("draft_model.glb", "refined_model.glb")
+
+    shutil.copyfile(artifacts.file_path(parent_id, "draft_model.glb"), draft_path)
+    txt_refine_3d(preview_task_id, save_path, timings)
+    if not os.path.exists(refined_path):
+        finish_artifact(artifact_id, "fail", files, None, timings.finish())
+        return {"status": "fail", "message": "Refining failed.", "artifact_id": artifact_id}
+
+    result_cache.put(cache_key, "text-to-3d", {"draft_model.glb": draft_path, "refined_model.glb": refined_path},
+                     meta={"preview_task_id": preview_task_id})
+    fields = finish_artifact(artifact_id, "success", files, "refined_model.glb", timings.finish(),
+                             draft="draft_model.glb", refined="refined_model.glb")
+    return {"status": "success", "message": "Refining complete.", "cache": cache_info(cache_key, False), **fields}
+
+
+def run_remixgen3d(glb_path, text, artifact_id, cache_key, model_info, on_progress):
+    timings = StageTimings(on_progress)
+    output_dir = artifacts.dir(artifact_id)
+    files = ("remixed_image.png", "remixed_draft_model.glb")
+
+    def fail(message):
+        finish_artifact(artifact_id, "fail", files, None, timings.finish())
+        return {"status": "fail", "message": message, "artifact_id": artifact_id}
+
+    # 1) create images from 3D model (kept in memory; written to the artifact only as a debug sink)
+    timings("render")
+    try:
+        frames = render_frames(glb_path, model_info=model_info)
+    except Exception as e:
+        print("Error rendering GLB file:", e)
+        return fail("Creating images from 3D model failed.")
+    if SAVE_RENDERED_VIEWS:
+        save_frames(frames, os.path.join(output_dir, "views"))
+
+    # 2) generate image from the views + text
+    timings("image")
+    frames_gen_image(
+        text + " Output only one image with a front view",
+        frames.values(),
+        output_dir,
+    )
+    remixed_image = os.path.join(output_dir, "remixed_image.png")
+    if not os.path.exists(remixed_image):
+        return fail("Creating image from text and images failed.")
+
+    # 3) generate 3D model from the remixed image (skipped if these exact image bytes were seen before)
+    timings("remix_draft")
+    remixed_model = os.path.join(output_dir, "remixed_draft_model.glb")
+    image_cache_key = image_key(remixed_image)
+    if result_cache.restore(image_cache_key, output_dir) is None:
+        image_gen_3d(remixed_image, output_dir, timings)
+        if not os.path.exists(remixed_model):
+            return fail("Creating 3D model from remixed image failed.")
+        result_cache.put(image_cache_key, "image-to-3d", {"remixed_draft_model.glb": remixed_model})
+
+    result_cache.put(cache_key, "remix", {"remixed_image.png": remixed_image, "remixed_draft_model.glb": remixed_model})
+    fields = finish_artifact(artifact_id, "success", files, "remixed_draft_model.glb", timings.finish(),
+                             draft="remixed_draft_model.glb")
+    return {"status": "success", "message": "Rendering complete.", "cache": cache_info(cache_key, False), **fields}
+
+
+def submit_job(kind, fn, *args, artifact_id=None, **response_fields):
+    try:
+        job = jobs.submit(kind, fn, *args)
+    except QueueFullError as e:
+        #the artifacts created for the job (one, or a batch's artifact_ids) would otherwise stay pending;
+        #a resumed batch's finished ones are left alone
+        for failed_id in [artifact_id, *response_fields.get("artifact_ids", {}).values()]:
+            if failed_id is not None and (artifacts.get(failed_id) or {}).get("status") == "pending":
+                artifacts.finish(failed_id, "error")
+        return jsonify(status="error", message=str(e)), 503
+
+    if artifact_id is not None:
+        artifacts.update(artifact_id, job_id=job.id)
+        response_fields["artifact_id"] = artifact_id
+
+    return jsonify(
+        status="queued",
+        job_id=job.id,
+        status_url=f"/jobs/{job.id}",
+        events_url=f"/jobs/{job.id}/events",
+        **response_fields,
+    ), 202
+
+
 @app.route("/txtgen3d", methods=["POST"])
 def txtgen3d_route():
+    """
+    Generates into a new artifact; the legacy save_path field is ignored. quality "fast" stops after
+    the draft model, which POST /artifacts/<id>/refine can refine later; "full" does both phases.
+    """
     text = request.json.get("text")
     artstyle = request.json.get("artstyle")
-    save_path = request.json.get("save_path")
-
-    try:
-        txt_gen_3d(text, artstyle, save_path)
-        refined_path = os.path.join(save_path, "refined_model.glb")
-        draft_path = os.path.join(save_path, "draft_model.glb")
-
-        if os.path.exists(refined_path) and os.path.exists(draft_path):
-            return jsonify(status="success", message="Rendering complete.")
-        return jsonify(status="fail", message="Rendering failed.")
-    except Exception as e:
-        print("txtgen3d error:", e)
-        return jsonify(status="error", message=str(e)), 500
+    quality = request.json.get("quality") or DEFAULT_QUALITY
+    if quality not in QUALITY_TIERS:
+        return jsonify(status="fail", message=f"quality must be one of {', '.join(QUALITY_TIERS)}."), 400
+
+    started = time.perf_counter()
+    key = text_key(text, artstyle, quality=quality)
+    artifact = artifacts.create("text-to-3d", current_session(), prompt=text, style=artstyle, quality=quality)
+    output_dir = artifacts.dir(artifact["id"])
+    if quality == "fast":
+        # a full generation of the same prompt has the same draft (and preview task) too
+        hit_key = next((k for k in (key, text_key(text, artstyle))
+                        if result_cache.restore(k, output_dir, names=("draft_model.glb",))), None)
+        if hit_key is not None:
+            artifacts.update(artifact["id"], task_id=result_cache.meta(hit_key).get("preview_task_id"))
+            fields = finish_fast_txtgen3d(artifact["id"], {"total": round(time.perf_counter() - started, 3)})
+            return jsonify(status="success", message="Rendering complete.", cache=cache_info(hit_key, True, started),
+                           **fields)
+    elif result_cache.restore(key, output_dir) is not None:
+        artifacts.update(artifact["id"], task_id=result_cache.meta(key).get("preview_task_id"))
+        fields = finish_artifact(artifact["id"], "success", ("draft_model.glb", "refined_model.glb"), "refined_model.glb",
+                                 {"total": round(time.perf_counter() - started, 3)},
+                                 draft="draft_model.glb", refined="refined_model.glb")
+        return jsonify(status="success", message="Rendering complete.", cache=cache_info(key, True, started), **fields)
+
+    return submit_job("txtgen3d", run_txtgen3d, text, artstyle, artifact["id"], key, quality,
+                      artifact_id=artifact["id"], cache=cache_info(key, False))
+
+
+@app.route("/artifacts/<artifact_id>/refine", methods=["POST"])
+def refine_artifact(artifact_id):
+    """Refines a fast text-to-3d artifact into a new child artifact, reusing its Meshy preview task."""
+    parent = artifacts.get(artifact_id)
+    if parent is None:
+        return jsonify(status="fail", message="Artifact not found."), 404
+    if parent["kind"] != "text-to-3d" or parent["quality"] != "fast" or parent["status"] != "success":
+        return jsonify(status="fail", message="Only finished fast text-to-3d artifacts can be refined."), 409
+
+    started = time.perf_counter()
+    key = text_key(parent["prompt"], parent["style"])
+    artifact = artifacts.create("refine", current_session(), prompt=parent["prompt"], style=parent["style"],
+                                parent_id=artifact_id, quality="full")
+    if result_cache.restore(key, artifacts.dir(artifact["id"])) is not None:
+        artifacts.update(artifact["id"], task_id=parent["task_id"])
+        fields = finish_artifact(artifact["id"], "success", ("draft_model.glb", "refined_model.glb"), "refined_model.glb",
+                                 {"total": round(time.perf_counter() - started, 3)},
+                                 draft="draft_model.glb", refined="refined_model.glb")
+        return jsonify(status="success", message="Refining complete.", cache=cache_info(key, True, started), **fields)
+    if not parent["task_id"]:
+        artifacts.finish(artifact["id"], "fail")
+        return jsonify(status="fail", message="The preview task of this artifact is unknown; generate it again."), 409
+
+    artifacts.update(artifact["id"], task_id=parent["task_id"])
+    return submit_job("refine", run_refine, artifact_id, parent["task_id"], artifact["id"], key,
+                      artifact_id=artifact["id"], cache=cache_info(key, False))
+
+
+def remix_source():
+    """
+    (parent artifact id, path of the model to remix, what the upload recorded about it or None)
+    from parent_id, or from the legacy glb_path field.
+    """
+    parent_id = request.json.get("parent_id")
+    if parent_id:
+        parent = artifacts.get(parent_id)
+        if parent is None or not parent["model"]:
+            return None, None, None
+        model_info = {"sha256": parent["content_hash"], **parent["mesh"]} if parent["mesh"] else None
+        return parent_id, artifacts.file_path(parent_id, parent["model"]), model_info
+    return None, request.json.get("glb_path"), None
 
 
 @app.route("/remixgen3d", methods=["POST"])
 def remixgen3d_route():
-    glb_path = request.json.get("glb_path")
-    images_output = request.json.get("images_output")
+    """Remixes the model of artifact parent_id into a new artifact that records it as its parent."""
     text = request.json.get("text")
-    image_output = request.json.get("image_output")
-    threeD_output = request.json.get("threeD_output")
+    parent_id, glb_path, model_info = remix_source()
 
+    started = time.perf_counter()
     try:
-        # 1) create images from 3D model
-        render_views_with_pyvista(glb_path, images_output)
-        if not os.path.exists(os.path.join(images_output, "top.png")):
-            return jsonify(status="fail", message="Creating images from 3D model failed.")
-
-        # 2) generate image from the views + text
-        images_gen_image(
-            text + " Output only one image with a front view",
-            images_output,
-            image_output,
-        )
-        if not os.path.exists(os.path.join(image_output, "remixed_image.png")):
-            return jsonify(status="fail", message="Creating image from text and images failed.")
-
-        # 3) generate 3D model from the remixed image
-        image_gen_3d(os.path.join(image_output, "remixed_image.png"), threeD_output)
-        if not os.path.exists(os.path.join(threeD_output, "remixed_draft_model.glb")):
-            return jsonify(status="fail", message="Creating 3D model from remixed image failed.")
-
-        return jsonify(status="success", message="Rendering complete.")
-    except Exception as e:
-        print("remixgen3d error:", e)
-        return jsonify(status="error", message=str(e)), 500
+        key = remix_key(glb_path, text)
+    except (OSError, TypeError):
+        return jsonify(status="fail", message="Model to remix was not found."), 404
+    artifact = artifacts.create("remix", current_session(), prompt=text, parent_id=parent_id)
+    output_dir = artifacts.dir(artifact["id"])
+    if result_cache.restore(key, output_dir) is not None:
+        fields = finish_artifact(artifact["id"], "success", ("remixed_image.png", "remixed_draft_model.glb"),
+                                 "remixed_draft_model.glb", {"total": round(time.perf_counter() - started, 3)},
+                                 draft="remixed_draft_model.glb")
+        return jsonify(status="success", message="Rendering complete.", cache=cache_info(key, True, started), **fields)
+
+    return submit_job(
+        "remixgen3d", run_remixgen3d, glb_path, text, artifact["id"], key, model_info,
+        artifact_id=artifact["id"], cache=cache_info(key, False),
+    )
+
+
+def run_batch_job(items, batch_dir, concurrency, on_progress):
+    finished = []
+
+    def item_done(record):
+        roles = {"draft": "draft_model.glb", "refined": "refined_model.glb"}
+        fields = finish_artifact(record["artifact_id"], record["status"], OUTPUT_FILES[record["kind"]],
+                                 "refined_model.glb", record["timings"], **roles)
+        finished.append({"id": record["id"], "status": record["status"], "cached": record.get("cached", False), **fields})
+        on_progress("batch", int(100 * len(finished) / len(items)))
+
+    manifest = run_batch(items, batch_dir, concurrency, item_dir=lambda item: artifacts.dir(item["artifact_id"]),
+                         on_item=item_done, result_cache=result_cache)
+    #items checkpointed by an earlier run of the same batch were not run again; report their artifacts too
+    reported = {entry["id"] for entry in finished}
+    for record in manifest["items"]:
+        if record["id"] not in reported:
+            finished.append({"id": record["id"], "status": record["status"], "cached": record.get("cached", False),
+                             "resumed": True, "artifact_id": record["artifact_id"],
+                             "models": {"draft": artifact_url(record["artifact_id"], "draft_model.glb"),
+                                        "refined": artifact_url(record["artifact_id"], "refined_model.glb")}})
+    summary = manifest["summary"]
+    status = "success" if summary["succeeded"] == summary["items"] else "fail"
+    message = f"{summary['succeeded']}/{summary['items']} items generated."
+    return {"status": status, "message": message, "summary": summary, "items": finished}
+
+
+@app.route("/batches", methods=["POST"])
+def batch_route():
+    """
+    Queues a batch of text-to-3d items ({"items": [{"prompt", "artstyle", "id"}], "concurrency", "batch_id"});
+    each item becomes its own artifact, and duplicate items are dropped. Sending the batch_id of an earlier
+    batch of this session resumes it: items it already generated keep their artifacts and are not run again.
+    Image items are only supported by the batch_generate.py CLI.
+    """
+    raw_items = request.json.get("items") or []
+    if not raw_items or len(raw_items) > BATCH_MAX_ITEMS:
+        return jsonify(status="fail", message=f"Send between 1 and {BATCH_MAX_ITEMS} items."), 400
+    try:
+        items = [normalize_item({key: raw.get(key) for key in ("prompt", "artstyle", "id")}) for raw in raw_items]
+        concurrency = max(1, min(int(request.json.get("concurrency", 4)), 16))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify(status="fail", message=str(e)), 400
+    batch_id = request.json.get("batch_id") or uuid.uuid4().hex
+    if not isinstance(batch_id, str) or len(batch_id) > 128:
+        return jsonify(status="fail", message="batch_id must be a string of at most 128 characters."), 400
+
+    #same prompt and artstyle without an id means the same item, as in batch_generate.load_items
+    unique = {}
+    for item in items:
+        unique.setdefault(item["id"], item)
+    items = list(unique.values())
+
+    session_id = current_session()
+    #one checkpoint directory per (session, batch_id), so a batch can only be resumed by its own session
+    batch_dir = os.path.join(BATCHES_DIR, hashlib.sha256(f"{session_id}:{batch_id}".encode()).hexdigest()[:32])
+    done = load_checkpoint(os.path.join(batch_dir, "checkpoint.jsonl"))
+    for item in items:
+        previous = done.get(item["id"], {}).get("artifact_id")
+        if previous and artifacts.get(previous) is not None:
+            item["artifact_id"] = previous
+        else:
+            item["artifact_id"] = artifacts.create("text-to-3d", session_id, prompt=item["prompt"], style=item["artstyle"])["id"]
+    return submit_job("batch", run_batch_job, items, batch_dir, concurrency, batch_id=batch_id,
+                      artifact_ids={item["id"]: item["artifact_id"] for item in items})
 
 
-@app.route("/models/<filename>")
-def serve_model(filename):
+@app.route("/artifacts")
+def list_artifacts():
+    """Newest first, filtered by session_id (defaults to the caller's; none lists nothing), kind, parent_id and status."""
     try:
-        base_dir = os.path.join(os.getcwd(), "3d_files")
-        file_path = os.path.join(base_dir, filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=False)
-        else:
+        before = float(request.args["before"]) if "before" in request.args else None
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "before and limit must be numbers"}), 400
+    session_id = request.args.get("session_id", current_session())
+    if not session_id:
+        #without a session there is nothing of the caller's to list; never fall back to everyone's
+        return jsonify(artifacts=[], next_before=None)
+    items = artifacts.list(
+        session_id=session_id,
+        kind=request.args.get("kind"),
+        parent_id=request.args.get("parent_id"),
+        status=request.args.get("status"),
+        before=before,
+        limit=limit,
+    )
+    return jsonify(artifacts=items, next_before=items[-1]["created_at"] if items else None)
+
+
+@app.route("/artifacts/<artifact_id>")
+def get_artifact(artifact_id):
+    artifact = artifacts.get(artifact_id)
+    if artifact is None:
+        return jsonify({"error": "Artifact not found"}), 404
+    urls = {name: artifact_url(artifact_id, name) for name in artifact["files"]
+            if os.path.exists(artifacts.file_path(artifact_id, name))}
+    return jsonify({**artifact, "urls": urls, "lineage": artifacts.lineage(artifact_id)})
+
+
+@app.route("/healthz")
+def healthz():
+    """Liveness; prewarmed says whether the heavy dependencies are loaded yet (for readiness checks)."""
+    return jsonify(status="ok", prewarmed=prewarm.ready())
+
+
+@app.route("/metrics")
+def metrics_route():
+    """Counters, gauges and latency histograms (per pipeline stage in span_seconds) for Prometheus."""
+    return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/traces/<trace_id>")
+def trace_route(trace_id):
+    """Spans of a recent job, by the trace_id in its result."""
+    spans = get_trace(trace_id)
+    if spans is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return jsonify(trace_id=trace_id, spans=spans)
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    snapshot = jobs.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(snapshot[1])
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """
+    Server-sent events stream of job updates; the stream ends once the job reaches a terminal status.
+    """
+    snapshot = jobs.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream(version, state):
+        yield f"data: {json.dumps(state)}\n\n"
+        while state["status"] not in ("success", "fail", "error"):
+            update = jobs.wait_for_update(job_id, version)
+            if update is None:
+                return
+            if update[0] == version:
+                # keep-alive comment so proxies do not drop an idle stream
+                yield ": ping\n\n"
+                continue
+            version, state = update
+            yield f"data: {json.dumps(state)}\n\n"
+
+    return Response(stream(*snapshot), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def serve_model_file(file_path, filename):
+    """
+    Serves a model file; ?lod=low|medium|high serves that optimized variant once it has been built
+    and falls back to the original otherwise. X-Model-LOD says which one was sent.
+    ?v=<content hash> (see artifact_url) makes the response cacheable forever.
+    """
+    try:
+        if file_path is None:
             return jsonify({"error": "File not found"}), 404
+        lod = request.args.get("lod")
+        variant = fresh_lod_path(file_path, lod) if lod in LOD_LEVELS else None
+        # the variant is derived from the addressed source, so it is content addressed too;
+        # a fallback to the original is not, since the variant may appear later
+        version = request.args.get("v")
+        immutable = bool(version) and (variant is not None or lod is None) and version == content_hash(file_path)
+        mimetype = "model/gltf-binary" if filename.lower().endswith(".glb") else None
+        response = send_model(variant or file_path, mimetype=mimetype, immutable=immutable)
+        response.headers["X-Model-LOD"] = lod if variant else "original"
+        return response
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
     except Exception as e:
         print("serve_model error:", e)
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/upload", methods=["POST"])
-def upload_glb():
-    if "file" not in request.files:
-        return jsonify(status="fail", message="No file provided"), 400
+@app.route("/artifacts/<artifact_id>/files/<filename>")
+def serve_artifact_file(artifact_id, filename):
+    artifacts.touch(artifact_id)
+    return serve_model_file(artifacts.file_path(artifact_id, filename), filename)
 
-    file = request.files["file"]
-    if file.filename == "":
-        return jsonify(status="fail", message="Empty filename"), 400
 
-    filename = secure_filename(file.filename)
-    save_dir = os.path.join(os.getcwd(), "3d_files")
-    os.makedirs(save_dir, exist_ok=True)
+@app.route("/models/<filename>")
+def serve_model(filename):
+    return serve_model_file(safe_join(MODELS_DIR, filename), filename)
 
-    save_path = os.path.join(save_dir, filename)
-    file.save(save_path)
 
-    return jsonify(status="success", filename=filename)
+@app.route("/ingest/<name>")
+def serve_ingested_image(name):
+    """Prepared upstream inputs (see image_ingest), only through a signed, unexpired link."""
+    if not verify(name, request.args.get("expires"), request.args.get("sig")):
+        return jsonify({"error": "Invalid or expired link"}), 403
+    path = ingested_path(name)
+    if path is None:
+        return jsonify({"error": "File not found"}), 404
+    return send_file(path, max_age=0)
+
+
+@app.route("/upload", methods=["POST"])
+def upload_glb():
+    """
+    Stores an uploaded GLB model as a new artifact. The file is validated, hashed and written to disk as it
+    streams in (400 if it is not a valid GLB, 413 past GLB_MAX_BYTES); re-uploading the same bytes in a
+    session returns the existing artifact. Triangle count and bounds are recorded with the artifact.
+    """
+    request.max_content_length = GLB_MAX_BYTES + 64 * 1024
+    started = time.perf_counter()
+    try:
+        file = request.files.get("file")
+        if file is None:
+            return jsonify(status="fail", message="No file provided"), 400
+        if file.filename == "":
+            return jsonify(status="fail", message="Empty filename"), 400
+        info = file.stream.finish()
+    except (RequestEntityTooLarge, GlbTooLargeError):
+        metrics.inc("glb_uploads_rejected", reason="too_large")
+        return jsonify(status="fail", message=f"Model is larger than {GLB_MAX_BYTES} bytes."), 413
+    except InvalidGlbError as e:
+        metrics.inc("glb_uploads_rejected", reason="invalid")
+        return jsonify(status="fail", message=str(e)), 400
+
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify(status="fail", message="Invalid filename"), 400
+    if not filename.lower().endswith(".glb"):
+        filename = os.path.splitext(filename)[0] + ".glb"
+
+    session_id = current_session()
+    existing = artifacts.find_upload(info["sha256"], session_id)
+    if existing is not None:
+        metrics.inc("glb_uploads_deduplicated")
+        artifacts.touch(existing["id"])
+        return jsonify(status="success", filename=existing["model"], artifact_id=existing["id"], deduplicated=True,
+                       models={"refined": artifact_url(existing["id"], existing["model"])}, mesh=existing["mesh"])
+
+    artifact = artifacts.create("upload", session_id, prompt=file.filename)
+    file.stream.save(artifacts.file_path(artifact["id"], filename))
+    artifacts.update(artifact["id"], content_hash=info["sha256"], mesh=info["stats"])
+    timings = {"total": round(time.perf_counter() - started, 3)}
+    fields = finish_artifact(artifact["id"], "success", (filename,), filename, timings, refined=filename)
+    return jsonify(status="success", filename=filename, deduplicated=False, mesh=info["stats"], **fields)
 
 
 @app.route("/transcribe", methods=["POST"])
 def transcribe():
     """
     Uses OpenAI's gpt-4o-transcribe model to turn uploaded audio into text.
-    Frontend sends FormData with a 'file' field (audio blob).
+    Frontend sends FormData with a 'file' field (audio blob). The upload is streamed to a temporary file
+    (413 past AUDIO_MAX_BYTES) and trimmed/recompressed by audio_ingest before it is sent on.
     """
-    if "file" not in request.files:
+    # checked by werkzeug as the body streams in, not after it has all been buffered
+    request.max_content_length = AUDIO_MAX_BYTES + 64 * 1024
+    try:
+        audio_file = request.files.get("file")
+    except RequestEntityTooLarge:
+        return jsonify(status="error", message=f"Audio is larger than {AUDIO_MAX_BYTES} bytes."), 413
+    if audio_file is None:
         return jsonify(status="error", message="No audio file uploaded."), 400
 
-    audio_file = request.files["file"]
-
     print("Incoming file:")
     print("  filename:", audio_file.filename)
     print("  mimetype:", audio_file.mimetype)
 
-    audio_bytes = audio_file.read()
-    size = len(audio_bytes)
-    print("  size (bytes):", size)
-
-    if not audio_bytes:
-        print("Transcribe: received empty audio.")
-        return jsonify(status="error", message="Uploaded audio file is empty."), 400
-
-    # Save a copy so YOU can listen
-    debug_id = uuid.uuid4().hex[:8]
-    safe_name = audio_file.filename or "speech.webm"
-    saved_path = os.path.join(DEBUG_AUDIO_DIR, f"{debug_id}_{safe_name}")
-    with open(saved_path, "wb") as f:
-        f.write(audio_bytes)
-
-    print("Saved uploaded audio to:", saved_path)
-
-    file_obj = io.BytesIO(audio_bytes)
-    file_obj.name = safe_name
-
-    try:
-        transcription = client.audio.transcriptions.create(
-            model="gpt-4o-transcribe",
-            file=file_obj,
-            temperature=0,
-            language="en",
-            # No prompt here on purpose – avoids the model echoing it
-        )
-
-        return jsonify(status="success", text=transcription.text)
-    except Exception as e:
-        print("Transcription error:", e)
-        return jsonify(status="error", message=str(e)), 500
+    safe_name = secure_filename(audio_file.filename or "") or "speech.webm"
+    with tempfile.TemporaryDirectory(prefix="transcribe_") as work_dir:
+        source_path = os.path.join(work_dir, "upload_" + safe_name)
+        audio_file.save(source_path)
+        size = os.path.getsize(source_path)
+        print("  size (bytes):", size)
+
+        if not size:
+            print("Transcribe: received empty audio.")
+            return jsonify(status="error", message="Uploaded audio file is empty."), 400
+
+        # Save a sampled copy so YOU can listen
+        if random.random() < DEBUG_AUDIO_SAMPLE_RATE:
+            debug_id = uuid.uuid4().hex[:8]
+            saved_path = os.path.join(DEBUG_AUDIO_DIR, f"{debug_id}_{safe_name}")
+            shutil.copyfile(source_path, saved_path)
+            print("Saved uploaded audio to:", saved_path)
+
+        upload_path, upload_name = prepare_audio(source_path, safe_name, work_dir)
+        upload_size = os.path.getsize(upload_path)
+
+        def transcribe_once():
+            # reopened per attempt, since a rate-limited attempt may have consumed the last one
+            with open(upload_path, "rb") as file_obj:
+                return get_openai_client().audio.transcriptions.create(
+                    model="gpt-4o-transcribe",
+                    file=(upload_name, file_obj),
+                    temperature=0,
+                    language="en",
+                    # No prompt here on purpose – avoids the model echoing it
+                )
+
+        try:
+            with span("openai.transcribe", model="gpt-4o-transcribe", request_bytes=upload_size) as transcription_span:
+                transcription = upstream_call("openai.transcribe", transcribe_once)
+                transcription_span.set(response_bytes=len(transcription.text or ""))
+
+            return jsonify(status="success", text=transcription.text)
+        except UpstreamBusyError as e:
+            return jsonify(status="error", message=str(e)), 503, {"Retry-After": str(int(e.retry_after) + 1)}
+        except Exception as e:
+            print("Transcription error:", e)
+            return jsonify(status="error", message=str(e)), 500
 
 
 if __name__ == "__main__":
     # Flask will listen on port 5000; frontend is served from ../frontend
-    app.run(host="0.0.0.0", port=5000)
+    app.run(host=settings.host, port=settings.port)
@@ -0,0 +1,232 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+
+#every generation (text-to-3d, remix, upload) gets its own directory <dir>/<artifact id>/,
+#so concurrent users never share output filenames. <dir>/index.sqlite records what each artifact is:
+#who made it (session), from what (prompt, style, remix parent), which files it holds and how long it took.
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(os.getcwd(), "artifacts"))
+ARTIFACT_LIST_LIMIT = int(os.getenv("ARTIFACT_LIST_LIMIT", "200"))
+#reads of an artifact refresh its last_access at most this often
+ARTIFACT_TOUCH_SECONDS = float(os.getenv("ARTIFACT_TOUCH_SECONDS", "60"))
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_COLUMNS = ("id", "session_id", "kind", "status", "prompt", "style", "parent_id", "model", "files", "size",
+            "timings", "job_id", "created_at", "updated_at", "last_access", "quality", "task_id",
+            "content_hash", "mesh")
+#columns holding JSON
+_JSON_COLUMNS = ("files", "timings", "mesh")
+
+
+class StageTimings:
+    """Wraps an on_progress callback to record how long each pipeline stage took."""
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+        self.timings = {}
+        self._stage = None
+        self._stage_started = self.started
+
+    def _close_stage(self, now):
+        if self._stage is not None:
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0) + now - self._stage_started, 3)
+
+    def __call__(self, stage, progress=None, **fields):
+        if stage is not None and stage != self._stage:
+            now = time.perf_counter()
+            self._close_stage(now)
+            self._stage, self._stage_started = stage, now
+        if self.on_progress is not None:
+            self.on_progress(stage, progress, **fields)
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close_stage(now)
+        self._stage = None
+        self.timings["total"] = round(now - self.started, 3)
+        return dict(self.timings)
+
+
+class ArtifactStore:
+    """
+    Directory-per-artifact storage with a SQLite index for lookup, listing and lineage.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._touched = {}
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        # WAL lets readers in other processes list artifacts while a generation is being recorded
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " id TEXT PRIMARY KEY, session_id TEXT, kind TEXT, status TEXT, prompt TEXT, style TEXT,"
+            " parent_id TEXT, model TEXT, files TEXT, size INTEGER, timings TEXT, job_id TEXT,"
+            " created_at REAL, updated_at REAL, last_access REAL, quality TEXT, task_id TEXT,"
+            " content_hash TEXT, mesh TEXT)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(artifacts)")]
+        if "last_access" not in columns:
+            self._db.execute("ALTER TABLE artifacts ADD COLUMN last_access REAL")
+            self._db.execute("UPDATE artifacts SET last_access = updated_at")
+        # quality tier of text-to-3d generations and the meshy preview task a fast one can be refined from
+        for column in ("quality", "task_id"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE artifacts ADD COLUMN {column} TEXT")
+        # sha256 of an uploaded model, for deduplication, and its triangle count and bounds
+        for column in ("content_hash", "mesh"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE artifacts ADD COLUMN {column} TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_session ON artifacts (session_id, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_parent ON artifacts (parent_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_status ON artifacts (status, last_access)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_content ON artifacts (content_hash)")
+        self._db.commit()
+
+    @staticmethod
+    def valid_id(artifact_id):
+        return bool(artifact_id) and _ID_PATTERN.match(artifact_id) is not None
+
+    def dir(self, artifact_id):
+        if not self.valid_id(artifact_id):
+            raise ValueError(f"Invalid artifact id: {artifact_id!r}")
+        return os.path.join(self.root, artifact_id)
+
+    def file_path(self, artifact_id, name):
+        """Path of a file inside the artifact's directory, or None for an unknown id or a name escaping it."""
+        if not self.valid_id(artifact_id) or not name or os.path.basename(name) != name or name.startswith("."):
+            return None
+        return os.path.join(self.root, artifact_id, name)
+
+    def create(self, kind, session_id=None, prompt=None, style=None, parent_id=None, quality=None):
+        artifact_id = uuid.uuid4().hex
+        os.makedirs(self.dir(artifact_id))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO artifacts (id, session_id, kind, status, prompt, style, parent_id, files, size,"
+                " timings, created_at, updated_at, last_access, quality)"
+                " VALUES (?, ?, ?, 'pending', ?, ?, ?, '{}', 0, '{}', ?, ?, ?, ?)",
+                (artifact_id, session_id, kind, prompt, style, parent_id, now, now, now, quality),
+            )
+            self._db.commit()
+        return self.get(artifact_id)
+
+    def update(self, artifact_id, **fields):
+        unknown = set(fields) - set(_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown artifact fields: {sorted(unknown)}")
+        for name in _JSON_COLUMNS:
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE artifacts SET {assignments} WHERE id = ?", (*fields.values(), artifact_id))
+            self._db.commit()
+
+    def finish(self, artifact_id, status, files=(), model=None, timings=None):
+        """Record the outcome of a generation and the sizes of the files it produced."""
+        sizes = {}
+        for name in files:
+            path = self.file_path(artifact_id, name)
+            if path is not None and os.path.exists(path):
+                sizes[name] = os.path.getsize(path)
+        fields = {"status": status, "files": sizes, "size": sum(sizes.values())}
+        if model is not None:
+            fields["model"] = model
+        if timings is not None:
+            fields["timings"] = timings
+        self.update(artifact_id, **fields)
+        return self.get(artifact_id)
+
+    def _row(self, row):
+        artifact = dict(zip(_COLUMNS, row))
+        artifact["files"] = json.loads(artifact["files"] or "{}")
+        artifact["timings"] = json.loads(artifact["timings"] or "{}")
+        artifact["mesh"] = json.loads(artifact["mesh"]) if artifact["mesh"] else None
+        return artifact
+
+    def get(self, artifact_id):
+        if not self.valid_id(artifact_id):
+            return None
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def find_upload(self, content_hash, session_id=None):
+        """The session's newest successful upload with these exact bytes whose model is still on disk, or None."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM artifacts WHERE content_hash = ? AND session_id IS ?"
+                " AND kind = 'upload' AND status = 'success' ORDER BY created_at DESC",
+                (content_hash, session_id),
+            ).fetchall()
+        for row in rows:
+            artifact = self._row(row)
+            if artifact["model"] and os.path.exists(self.file_path(artifact["id"], artifact["model"])):
+                return artifact
+        return None
+
+    def list(self, session_id=None, kind=None, parent_id=None, status=None, before=None, limit=50):
+        """Newest first; page with before=<created_at of the last artifact seen>."""
+        clauses, params = [], []
+        for column, value in (("session_id", session_id), ("kind", kind), ("parent_id", parent_id), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if before is not None:
+            clauses.append("created_at < ?")
+            params.append(before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit = max(1, min(int(limit), ARTIFACT_LIST_LIMIT))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM artifacts{where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def lineage(self, artifact_id, max_depth=32):
+        """Ids of the artifact's ancestors, nearest parent first."""
+        ancestors = []
+        artifact = self.get(artifact_id)
+        while artifact is not None and artifact["parent_id"] and len(ancestors) < max_depth:
+            ancestors.append(artifact["parent_id"])
+            artifact = self.get(artifact["parent_id"])
+        return ancestors
+
+    def touch(self, artifact_id):
+        """Mark the artifact as recently used, which keeps it from being evicted first."""
+        now = time.time()
+        # skip the write entirely for an artifact this process touched moments ago
+        if now - self._touched.get(artifact_id, 0) < ARTIFACT_TOUCH_SECONDS:
+            return
+        if len(self._touched) > 10000:
+            self._touched.clear()
+        self._touched[artifact_id] = now
+        with self._lock:
+            self._db.execute("UPDATE artifacts SET last_access = ? WHERE id = ? AND last_access < ?",
+                             (now, artifact_id, now - ARTIFACT_TOUCH_SECONDS))
+            self._db.commit()
+
+    def stored(self):
+        """(id, status, parent_id, created_at, last_access) of every artifact whose files are still on disk."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, status, parent_id, created_at, last_access FROM artifacts WHERE status != 'evicted'"
+            ).fetchall()
+
+    def evict(self, artifact_id):
+        """Delete the artifact's files; the record stays (status evicted) so listings and lineage still resolve."""
+        shutil.rmtree(self.dir(artifact_id), ignore_errors=True)
+        self.update(artifact_id, status="evicted", files={}, size=0)
@@ -0,0 +1,77 @@
+import os
+import time
+import shutil
+import subprocess
+import metrics
+from tracing import span
+
+#voice prompts are shrunk before they are sent for transcription: ffmpeg trims leading and trailing silence
+#(a level-threshold voice activity gate), downmixes to mono, resamples to 16 kHz and encodes low-bitrate
+#opus in ogg. without ffmpeg, or when it fails or does not make the clip smaller, the original is sent.
+
+#uploads larger than this are rejected with 413 while the request body is still streaming in
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+FFMPEG = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+#speech recognition works on 16 kHz mono; more is only more bytes
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "24k")
+#opus encoder effort 0-10; at speech bitrates low settings are ~2x faster for about the same size
+AUDIO_OPUS_COMPLEXITY = int(os.getenv("AUDIO_OPUS_COMPLEXITY", "1"))
+#peak level below which audio counts as silence
+AUDIO_SILENCE_THRESHOLD = os.getenv("AUDIO_SILENCE_THRESHOLD", "-45dB")
+#silence kept before and after the speech so word onsets and endings are not clipped
+AUDIO_SILENCE_PADDING = float(os.getenv("AUDIO_SILENCE_PADDING", "0.25"))
+AUDIO_FFMPEG_TIMEOUT = float(os.getenv("AUDIO_FFMPEG_TIMEOUT", "30"))
+#an encoded result smaller than this holds no speech (ogg/opus headers only); send the original instead
+_MIN_ENCODED_BYTES = 1024
+
+
+def _trim_filter():
+    #silenceremove only trims the start, so trim, reverse, trim again and reverse back
+    trim = (f"silenceremove=start_periods=1:start_threshold={AUDIO_SILENCE_THRESHOLD}"
+            f":start_silence={AUDIO_SILENCE_PADDING}:detection=peak")
+    return ",".join((trim, "areverse", trim, "areverse"))
+
+
+def encode_speech(source_path, dest_path):
+    """Trim, downmix, resample and encode source_path to ogg/opus at dest_path; raises on ffmpeg errors."""
+    command = [
+        FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", source_path,
+        "-vn", "-af", _trim_filter(), "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-c:a", "libopus", "-b:a", AUDIO_BITRATE, "-application", "voip",
+        "-compression_level", str(AUDIO_OPUS_COMPLEXITY), "-f", "ogg", dest_path,
+    ]
+    subprocess.run(command, check=True, capture_output=True, timeout=AUDIO_FFMPEG_TIMEOUT)
+
+
+def prepare_audio(source_path, filename, work_dir):
+    """(path, filename) to upload for the recording at source_path: the compact version if it helps."""
+    source_bytes = os.path.getsize(source_path)
+    with span("audio.ingest", source_bytes=source_bytes) as ingest:
+        if not AUDIO_PREPROCESS or not FFMPEG:
+            ingest.set(preprocessed=False)
+            return source_path, filename
+
+        started = time.perf_counter()
+        dest_path = os.path.join(work_dir, "speech.ogg")
+        try:
+            encode_speech(source_path, dest_path)
+        except (subprocess.SubprocessError, OSError) as e:
+            stderr = (getattr(e, "stderr", None) or b"").decode(errors="replace").strip()
+            print("Audio preprocessing failed, sending the original:", stderr.splitlines()[-1] if stderr else e)
+            metrics.inc("audio_preprocess_failures")
+            ingest.set(preprocessed=False)
+            return source_path, filename
+
+        encoded_bytes = os.path.getsize(dest_path)
+        seconds = time.perf_counter() - started
+        metrics.observe("audio_preprocess_seconds", seconds)
+        if encoded_bytes < _MIN_ENCODED_BYTES or encoded_bytes >= source_bytes:
+            ingest.set(preprocessed=False, encoded_bytes=encoded_bytes)
+            return source_path, filename
+
+        metrics.observe("audio_bytes_saved", source_bytes - encoded_bytes)
+        ingest.set(preprocessed=True, upload_bytes=encoded_bytes)
+        print(f"Preprocessed audio: {source_bytes} -> {encoded_bytes} bytes in {seconds * 1000:.0f} ms")
+        return dest_path, os.path.splitext(filename)[0] + ".ogg"
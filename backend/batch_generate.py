@@ -0,0 +1,219 @@
+import os
+import re
+import csv
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from txt_to_3d import txt_gen_3d
+from image_to_3d import image_gen_3d
+from artifact_store import StageTimings
+from result_cache import ResultCache, text_key, image_key, file_sha256
+from rate_limit import priority
+from tracing import span, wrap
+
+#generates a catalog of models from a JSONL or CSV list of prompts or image paths.
+#items run concurrently (polling is multiplexed on the shared meshy client, so threads mostly wait),
+#every finished item is appended to <output>/checkpoint.jsonl, and a rerun skips items already done
+#there. Finished generations also land in the result cache, so a repeated prompt is never paid twice.
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", "1"))
+#largest batch the API accepts in one request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+OUTPUT_FILES = {
+    "text-to-3d": ("draft_model.glb", "refined_model.glb"),
+    "image-to-3d": ("remixed_draft_model.glb",),
+}
+
+
+def item_id(item):
+    """Stable id from the item's inputs, so the same prompt keeps its checkpoint entry across runs."""
+    if item["kind"] == "image-to-3d":
+        source = {"image": file_sha256(item["image_path"])}
+    else:
+        source = {"prompt": item["prompt"], "artstyle": item["artstyle"]}
+    return hashlib.sha256(json.dumps({"kind": item["kind"], **source}, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_item(raw, default_artstyle="realistic"):
+    """{"prompt", "artstyle"} or {"image_path"} (plus an optional "id") -> item with kind and id."""
+    raw = {key: value.strip() if isinstance(value, str) else value for key, value in raw.items()}
+    if raw.get("image_path"):
+        item = {"kind": "image-to-3d", "image_path": raw["image_path"]}
+    elif raw.get("prompt"):
+        item = {"kind": "text-to-3d", "prompt": raw["prompt"], "artstyle": raw.get("artstyle") or default_artstyle}
+    else:
+        raise ValueError(f"Batch item needs a prompt or an image_path: {raw}")
+    #ids name the item's output directory, so keep them to safe filename characters
+    item["id"] = re.sub(r"[^A-Za-z0-9_.-]", "_", str(raw["id"])) if raw.get("id") else item_id(item)
+    return item
+
+
+def load_items(path, default_artstyle="realistic"):
+    """Read items from a .jsonl file or a .csv file with a header row (prompt, artstyle, image_path, id)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    items = [normalize_item(row, default_artstyle) for row in rows]
+
+    seen = set()
+    unique = []
+    for item in items:
+        if item["id"] not in seen:
+            seen.add(item["id"])
+            unique.append(item)
+    if len(unique) != len(items):
+        print(f"Skipping {len(items) - len(unique)} duplicate items.")
+    return unique
+
+
+def load_checkpoint(checkpoint_path):
+    """{item id: record} of items that already succeeded in an earlier run and whose files are still there."""
+    done = {}
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                #a crash can leave a torn last line
+                continue
+            files = [os.path.join(record.get("output_dir", ""), name) for name in record.get("files", {})]
+            if record.get("status") == "success" and all(os.path.exists(path) for path in files):
+                done[record["id"]] = record
+            else:
+                done.pop(record["id"], None)
+    return done
+
+
+def generate_item(item, output_dir, result_cache=None, on_progress=None):
+    """Run one item into output_dir; returns its manifest record."""
+    timings = StageTimings(on_progress)
+    kind = item["kind"]
+    if kind == "text-to-3d":
+        key = text_key(item["prompt"], item["artstyle"])
+    else:
+        key = image_key(item["image_path"])
+
+    with span("batch.item", item_id=item["id"], kind=kind) as item_span:
+        cached = result_cache is not None and result_cache.restore(key, output_dir) is not None
+        item_span.set(cached=cached)
+        if not cached:
+            if kind == "text-to-3d":
+                txt_gen_3d(item["prompt"], item["artstyle"], output_dir, timings)
+            else:
+                image_gen_3d(item["image_path"], output_dir, timings)
+
+    paths = {name: os.path.join(output_dir, name) for name in OUTPUT_FILES[kind]}
+    ok = all(os.path.exists(path) for path in paths.values())
+    if ok and not cached and result_cache is not None:
+        result_cache.put(key, kind, paths)
+    return {
+        **item,
+        "status": "success" if ok else "fail",
+        "cached": cached,
+        "output_dir": output_dir,
+        "files": {name: os.path.getsize(path) for name, path in paths.items() if os.path.exists(path)},
+        "timings": timings.finish(),
+    }
+
+
+def run_batch(items, output_dir, concurrency=BATCH_CONCURRENCY, retries=BATCH_RETRIES, item_dir=None,
+              on_item=None, result_cache=None):
+    """
+    Generate every item, skipping those checkpointed as done in output_dir/checkpoint.jsonl.
+    item_dir(item) picks each item's directory (default output_dir/<item id>); on_item(record) is called
+    as each item finishes. Writes output_dir/manifest.json and returns it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+    item_dir = item_dir or (lambda item: os.path.join(output_dir, item["id"]))
+    done = load_checkpoint(checkpoint_path)
+    wanted = {item["id"] for item in items}
+    records = {item_id: record for item_id, record in done.items() if item_id in wanted}
+    todo = [item for item in items if item["id"] not in records]
+    if records:
+        print(f"Resuming: {len(records)} items already done, {len(todo)} to go.")
+
+    write_lock = threading.Lock()
+
+    def run(item):
+        record = None
+        for attempt in range(retries + 1):
+            started = time.perf_counter()
+            try:
+                #catalog work yields to interactive requests at the upstream limiters
+                with priority("batch"):
+                    record = generate_item(item, item_dir(item), result_cache)
+            except Exception as e:
+                record = {**item, "status": "error", "error": str(e), "output_dir": item_dir(item),
+                          "timings": {"total": round(time.perf_counter() - started, 3)}}
+            record["attempts"] = attempt + 1
+            if record["status"] == "success":
+                break
+        record["finished_at"] = time.time()
+        with write_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+        futures = [pool.submit(wrap(run), item) for item in todo]
+        for future in as_completed(futures):
+            record = future.result()
+            records[record["id"]] = record
+            print(f"[{len(records)}/{len(items)}] {record['id']} {record['status']}"
+                  f" in {record['timings'].get('total', 0):.1f}s")
+            if on_item is not None:
+                on_item(record)
+    elapsed = time.perf_counter() - started
+
+    ordered = [records[item["id"]] for item in items if item["id"] in records]
+    succeeded = sum(1 for record in ordered if record["status"] == "success")
+    manifest = {
+        "items": ordered,
+        "summary": {
+            "items": len(items),
+            "succeeded": succeeded,
+            "failed": len(ordered) - succeeded,
+            "resumed": len(items) - len(todo),
+            "cached": sum(1 for record in ordered if record.get("cached")),
+            "seconds": round(elapsed, 3),
+        },
+    }
+    tmp_path = os.path.join(output_dir, f"manifest.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, "manifest.json"))
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, required=True, help="JSONL or CSV of items with prompt (+ artstyle) or image_path, optional id")
+    parser.add_argument("--save_path", type=str, required=True, help="Directory for the models, checkpoint and manifest")
+    parser.add_argument("--artstyle", type=str, choices=['realistic', 'sculpture', 'pbr'], default="realistic", help="Art style for prompts that do not set one")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Items generated at the same time")
+    parser.add_argument("--retries", type=int, default=BATCH_RETRIES, help="Extra attempts for a failed item")
+    parser.add_argument("--no_cache", action="store_true", help="Do not reuse or fill the result cache")
+
+    args = parser.parse_args()
+
+    items = load_items(args.input, args.artstyle)
+    print(f"Generating {len(items)} items with concurrency {args.concurrency}...")
+    manifest = run_batch(items, args.save_path, args.concurrency, args.retries,
+                         result_cache=None if args.no_cache else ResultCache())
+
+    summary = manifest["summary"]
+    print(f"Done: {summary['succeeded']}/{summary['items']} succeeded ({summary['resumed']} resumed,"
+          f" {summary['cached']} from cache) in {summary['seconds']:.1f}s."
+          f" Manifest: {os.path.join(args.save_path, 'manifest.json')}")
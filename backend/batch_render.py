@@ -0,0 +1,144 @@
+import os
+import glob
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+#renders many GLBs across a pool of processes, each holding its own offscreen GL context.
+#heavy rendering modules are imported inside the workers, after the GL backend has been selected.
+
+#named view subsets; "all" means every view the renderer defines
+VIEW_SETS = {
+    "all": None,
+    "sides": ["front", "back", "left", "right"],
+    "front": ["front"],
+}
+
+#how each software backend is selected for vtk (pyvista) and pyopengl (pyrender)
+GL_BACKENDS = {
+    "osmesa": {"VTK_DEFAULT_OPENGL_WINDOW": "vtkOSOpenGLRenderWindow", "PYOPENGL_PLATFORM": "osmesa"},
+    "egl": {"VTK_DEFAULT_OPENGL_WINDOW": "vtkEGLRenderWindow", "PYOPENGL_PLATFORM": "egl"},
+}
+
+_worker = {}
+
+
+def resolve_views(all_views, view_set):
+    """view_set is a VIEW_SETS name or a comma separated list of view names."""
+    names = VIEW_SETS[view_set] if view_set in VIEW_SETS else [v.strip() for v in view_set.split(",") if v.strip()]
+    if names is None:
+        return dict(all_views)
+    unknown = [name for name in names if name not in all_views]
+    if unknown:
+        raise ValueError(f"Unknown views {unknown}; available: {list(all_views)}")
+    return {name: all_views[name] for name in names}
+
+
+def _init_worker(renderer, gl_backend, view_set, window_size):
+    if gl_backend:
+        os.environ.update(GL_BACKENDS[gl_backend])
+    _worker["renderer"] = renderer
+    _worker["window_size"] = tuple(window_size)
+
+    if renderer == "pyvista":
+        import vista_3d_to_images
+        _worker["views"] = resolve_views(vista_3d_to_images.CAMERA_VIEWS, view_set)
+        vista_3d_to_images.warm_up(window_size)
+    else:
+        import threeD_to_images
+        _worker["views"] = resolve_views(threeD_to_images.CAMERA_VIEWS, view_set)
+
+
+def _render_one(glb_path, output_dir):
+    start = time.perf_counter()
+    try:
+        if _worker["renderer"] == "pyvista":
+            from vista_3d_to_images import render_frames_with_pyvista
+            from image_encoding import save_frames
+            frames = render_frames_with_pyvista(glb_path, _worker["views"], _worker["window_size"])
+            save_frames(frames, output_dir)
+        else:
+            from threeD_to_images import render_views
+            render_views(glb_path, output_dir, _worker["views"], _worker["window_size"])
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {
+        "glb_path": glb_path,
+        "output_dir": output_dir,
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+        "error": error,
+    }
+
+
+def batch_render(glb_paths, output_dir, view_set="all", window_size=(640, 480), workers=None,
+                 renderer="pyvista", gl_backend=None):
+    """
+    Render every model in glb_paths to output_dir/<model name>/<view>.png using a pool of worker processes.
+    Returns a summary with per-model results and throughput in models per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    # spawn so every worker creates its own GL context instead of inheriting a forked one
+    context = multiprocessing.get_context("spawn")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(renderer, gl_backend, view_set, tuple(window_size))) as pool:
+        futures = []
+        for glb_path in glb_paths:
+            name = os.path.splitext(os.path.basename(glb_path))[0]
+            futures.append(pool.submit(_render_one, glb_path, os.path.join(output_dir, name)))
+        for future in as_completed(futures):
+            result = future.result()
+            status = "failed: " + result["error"] if result["error"] else f"{result['seconds']:.2f}s"
+            print(f"[pid {result['pid']}] {result['glb_path']} {status}")
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for r in results if r["error"] is None)
+    return {
+        "models": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "workers": workers,
+        "seconds": elapsed,
+        "models_per_second": succeeded / elapsed if elapsed > 0 else 0.0,
+        "results": results,
+    }
+
+
+def collect_glb_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.glb"))))
+        else:
+            paths.extend(sorted(glob.glob(item)) or [item])
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, nargs="+", required=True, help="GLB files, glob patterns or directories of GLBs")
+    parser.add_argument("--save_path", type=str, required=True, help="Directory to save the images (one subdirectory per model)")
+    parser.add_argument("--views", type=str, default="all", help=f"View set ({', '.join(VIEW_SETS)}) or comma separated view names")
+    parser.add_argument("--width", type=int, default=640, help="Image width")
+    parser.add_argument("--height", type=int, default=480, help="Image height")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--renderer", type=str, choices=["pyvista", "pyrender"], default="pyvista", help="Rendering backend")
+    parser.add_argument("--gl_backend", type=str, choices=list(GL_BACKENDS), default=None, help="Software GL backend for headless Linux")
+
+    args = parser.parse_args()
+
+    glb_paths = collect_glb_paths(args.input)
+    print(f"Rendering {len(glb_paths)} models with {args.workers or os.cpu_count()} workers...")
+
+    summary = batch_render(glb_paths, args.save_path, args.views, (args.width, args.height), args.workers,
+                           args.renderer, args.gl_backend)
+
+    print(f"Rendered {summary['succeeded']}/{summary['models']} models in {summary['seconds']:.2f}s"
+          f" ({summary['models_per_second']:.2f} models/second, {summary['workers']} workers)")
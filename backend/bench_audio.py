@@ -0,0 +1,93 @@
+import os
+import re
+import time
+import random
+import tempfile
+import statistics
+import subprocess
+from fake_upstreams import FakeUpstreams
+import audio_ingest
+
+#bytes and time per voice clip sent for transcription as recorded (browser webm, stereo 48 kHz opus) vs
+#after audio_ingest (silence trimmed, mono 16 kHz low-bitrate opus), against the local stand-in transcription
+#server. upload time on localhost is tiny, so --uplink_mbps estimates it on a real connection; the trimmed
+#seconds matter too, since transcription time grows with audio length.
+
+
+def synthesize_clip(path, lead, speech, tail):
+    """Browser-like recording: silence, a speech-like modulated noise burst, silence."""
+    source = f"anoisesrc=d={speech}:c=pink:a=0.3,volume='0.5+0.5*sin(2*PI*3*t)':eval=frame,aresample=48000"
+    graph = (f"[1]atrim=0:{lead}[lead];[1]atrim=0:{tail}[tail];[0]aformat=channel_layouts=stereo[speech];"
+             "[lead][speech][tail]concat=n=3:v=0:a=1")
+    subprocess.run([audio_ingest.FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi", "-i", source,
+                    "-f", "lavfi", "-i", "anullsrc=r=48000:cl=stereo", "-filter_complex", graph,
+                    "-c:a", "libopus", "-b:a", "96k", path], check=True)
+
+
+def duration(path):
+    output = subprocess.run([audio_ingest.FFMPEG, "-hide_banner", "-i", path], capture_output=True, text=True).stderr
+    match = re.search(r"Duration: (\d+):(\d+):([\d.]+)", output)
+    return int(match[1]) * 3600 + int(match[2]) * 60 + float(match[3]) if match else None
+
+
+def timed_transcription(client, path, name):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        client.audio.transcriptions.create(model="gpt-4o-transcribe", file=(name, f), temperature=0, language="en")
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=str, nargs="*", default=None, help="Recordings to use (default: synthesize some)")
+    parser.add_argument("--count", type=int, default=8, help="Clips to synthesize when --clips is not given")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in server latency per request (s)")
+    parser.add_argument("--uplink_mbps", type=float, default=5, help="Uplink bandwidth for the transfer estimate")
+
+    args = parser.parse_args()
+    if not audio_ingest.FFMPEG:
+        raise SystemExit("ffmpeg not found; install it or set FFMPEG_PATH.")
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as work_dir, FakeUpstreams(latency=args.latency) as upstreams:
+        os.environ.update(upstreams.env())
+        from openai import OpenAI
+        client = OpenAI()
+
+        clips = args.clips
+        if not clips:
+            clips = []
+            for i in range(args.count):
+                path = os.path.join(work_dir, f"clip{i}.webm")
+                synthesize_clip(path, round(random.uniform(0.5, 2.5), 2), round(random.uniform(1.5, 6), 2),
+                                round(random.uniform(0.5, 2.5), 2))
+                clips.append(path)
+        timed_transcription(client, clips[0], os.path.basename(clips[0]))
+
+        rows = []
+        print(f"{'clip':>12} {'bytes':>8} {'-> bytes':>8} {'audio s':>8} {'-> s':>6} {'prep ms':>8}"
+              f" {'orig ms':>8} {'new ms':>8} {'uplink saved ms':>16}")
+        for i, clip in enumerate(clips):
+            clip_dir = os.path.join(work_dir, f"work{i}")
+            os.makedirs(clip_dir)
+            name = os.path.basename(clip)
+            original_ms = timed_transcription(client, clip, name)
+
+            start = time.perf_counter()
+            upload_path, upload_name = audio_ingest.prepare_audio(clip, name, clip_dir)
+            prep_ms = (time.perf_counter() - start) * 1000
+            new_ms = prep_ms + timed_transcription(client, upload_path, upload_name)
+
+            before, after = os.path.getsize(clip), os.path.getsize(upload_path)
+            uplink_saved = (before - after) * 8 / (args.uplink_mbps * 1e6) * 1000
+            rows.append((before, after, original_ms, new_ms, uplink_saved, duration(clip), duration(upload_path)))
+            print(f"{name[-12:]:>12} {before:>8} {after:>8} {rows[-1][5] or 0:>8.2f} {rows[-1][6] or 0:>6.2f}"
+                  f" {prep_ms:>8.1f} {original_ms:>8.1f} {new_ms:>8.1f} {uplink_saved:>16.1f}")
+
+        print(f"mean per clip: {statistics.mean(r[0] - r[1] for r in rows):.0f} bytes saved"
+              f" ({1 - sum(r[1] for r in rows) / sum(r[0] for r in rows):.0%}),"
+              f" {statistics.mean((r[5] or 0) - (r[6] or 0) for r in rows):.2f} s of audio trimmed,"
+              f" {statistics.mean(r[2] - r[3] for r in rows):.1f} ms saved locally,"
+              f" {statistics.mean(r[4] - (r[3] - r[2]) for r in rows):.1f} ms saved at {args.uplink_mbps:g} Mbit/s")
@@ -0,0 +1,85 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+from glb_optimize import LOD_LEVELS, GLTFPACK_PATH, optimize_glb, read_glb
+
+#reports transfer size, optimize time and decode time of every LOD variant against the original GLB.
+#decode time covers the meshopt-compressed buffers only (what the viewer decodes before building geometry)
+#and needs the meshoptimizer python package; it is reported as n/a without it.
+
+try:
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
+
+MESHOPT_FILTERS = {
+    "OCTAHEDRAL": "decode_filter_oct",
+    "QUATERNION": "decode_filter_quat",
+    "EXPONENTIAL": "decode_filter_exp",
+}
+
+
+def decode_meshopt(glb_path):
+    """Decode every EXT_meshopt_compression bufferView in glb_path; returns (buffer views, milliseconds)."""
+    gltf, binary = read_glb(glb_path)
+    compressed = [view["extensions"]["EXT_meshopt_compression"] for view in gltf.get("bufferViews", [])
+                  if "EXT_meshopt_compression" in view.get("extensions", {})]
+
+    start = time.perf_counter()
+    for ext in compressed:
+        #gltfpack puts the compressed data in the GLB binary chunk (buffer 0)
+        offset = ext.get("byteOffset", 0)
+        data = binary[offset:offset + ext["byteLength"]]
+        count, stride = ext["count"], ext["byteStride"]
+        if ext["mode"] == "ATTRIBUTES":
+            decoded = meshoptimizer.decode_vertex_buffer(count, stride, data, dtype=np.uint8)
+            if ext.get("filter", "NONE") in MESHOPT_FILTERS:
+                getattr(meshoptimizer, MESHOPT_FILTERS[ext["filter"]])(decoded, count, stride)
+        elif ext["mode"] == "TRIANGLES":
+            meshoptimizer.decode_index_buffer(count, stride, data)
+        else:
+            meshoptimizer.decode_index_sequence(count, stride, data)
+    return len(compressed), (time.perf_counter() - start) * 1000
+
+
+def report(label, size, original_size, optimize_seconds=None, decode=None):
+    saved = 100 * (1 - size / original_size) if original_size else 0
+    optimize = f"{optimize_seconds:6.2f} s" if optimize_seconds is not None else "     -  "
+    if decode is None:
+        decode_text = "n/a"
+    else:
+        decode_text = f"{decode[1]:7.1f} ms ({decode[0]} views)"
+    print(f"{label:>8}: {size / 1024:10.1f} KB | saved {saved:5.1f}% | optimize {optimize} | decode {decode_text}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--glb_path", type=str, required=True, help="Path to input GLB file")
+    parser.add_argument("--runs", type=int, default=5, help="Decode runs per variant (best is reported)")
+
+    args = parser.parse_args()
+
+    if not GLTFPACK_PATH:
+        raise SystemExit("gltfpack not found; install it or set GLTFPACK_PATH")
+
+    #optimize a copy so the benchmark never leaves variants next to the input
+    with tempfile.TemporaryDirectory() as work_dir:
+        glb_path = os.path.join(work_dir, os.path.basename(args.glb_path))
+        shutil.copyfile(args.glb_path, glb_path)
+        original_size = os.path.getsize(glb_path)
+
+        variants = optimize_glb(glb_path)
+
+        report("original", original_size, original_size)
+        for level in LOD_LEVELS:
+            if level not in variants:
+                print(f"{level:>8}: failed")
+                continue
+            decode = None
+            if meshoptimizer is not None:
+                decode = min((decode_meshopt(variants[level]["path"]) for _ in range(args.runs)), key=lambda d: d[1])
+            report(level, variants[level]["bytes"], original_size, variants[level]["seconds"], decode)
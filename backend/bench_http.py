@@ -0,0 +1,119 @@
+import os
+import ssl
+import json
+import time
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+#per-poll latency against a local stand-in for the meshy task endpoint: a fresh connection per request
+#(module-level requests.get, as the pollers used to do) vs the pooled keep-alive session vs the shared
+#aiohttp client the poll scheduler uses. --tls adds a self-signed TLS handshake, as with the real API.
+
+TASK = json.dumps({"id": "bench", "status": "IN_PROGRESS", "progress": 42}).encode("utf-8")
+
+
+class TaskHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    #headers and body go out in separate writes; without this, kept-alive connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(TASK)))
+        self.end_headers()
+        self.wfile.write(TASK)
+
+
+def self_signed_cert(directory):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                    "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1"],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def start_server(tls_dir=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TaskHandler)
+    scheme = "http"
+    if tls_dir:
+        cert, key = self_signed_cert(tls_dir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        #both requests and aiohttp clients pick the CA up from the environment
+        os.environ["REQUESTS_CA_BUNDLE"] = cert
+        os.environ["SSL_CERT_FILE"] = cert
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+
+def time_polls(poll, polls):
+    timings = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        poll()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    print(f"{label:>9}: mean {statistics.mean(timings):7.2f} ms | p50 {statistics.median(timings):7.2f} ms"
+          f" | p95 {ordered[int(len(ordered) * 0.95) - 1]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=200, help="Status polls per mode")
+    parser.add_argument("--tls", action="store_true", help="Serve over TLS with a self-signed certificate")
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tls_dir:
+        server, base_url = start_server(tls_dir if args.tls else None)
+        os.environ["MESHY_BASE_URL"] = base_url
+
+        #imported after MESHY_BASE_URL and the CA bundle are set
+        import requests
+        from http_session import get_session
+        from meshy_client import get_client, run_sync
+
+        url = f"{base_url}/openapi/v2/text-to-3d/bench"
+        headers = {"Authorization": "Bearer bench"}
+        session = get_session()
+        client = get_client()
+
+        def per_call():
+            response = requests.get(url, headers=headers, timeout=10)
+            response.raise_for_status()
+            response.json()
+
+        def pooled():
+            response = session.get(url, headers=headers)
+            response.raise_for_status()
+            response.json()
+
+        def scheduler_client():
+            run_sync(client.get_task("text-to-3d", "bench", headers))
+
+        print(f"{args.polls} polls per mode against {base_url}")
+        results = {}
+        for label, poll in (("per-call", per_call), ("session", pooled), ("aiohttp", scheduler_client)):
+            poll()
+            results[label] = time_polls(poll, args.polls)
+            report(label, results[label])
+
+        baseline = statistics.mean(results["per-call"])
+        print(f"pooled session saves {baseline - statistics.mean(results['session']):.2f} ms per poll"
+              f" ({baseline / statistics.mean(results['session']):.1f}x)")
+        server.shutdown()
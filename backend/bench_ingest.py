@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import base64
+import tempfile
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+import image_ingest
+
+#size and upload time of the meshy image-to-3d request body: the original png inlined as a data uri (as
+#create_draft_task used to send it) vs the ingested image as a data uri vs a signed link. uploads go to a
+#local sink, so the --uplink_mbps column estimates what the transfer costs on a real connection.
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def raw_data_uri(image_path):
+    with open(image_path, "rb") as f:
+        return f"data:image/png;base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+def payload_bytes(image_url):
+    payload = {"image_url": image_url, "enable_pbr": False, "should_remesh": True, "should_texture": True}
+    return json.dumps(payload).encode("utf-8")
+
+
+def time_uploads(session, url, body, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.post(url, data=body, headers={"Content-Type": "application/json"}).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_path", type=str, required=True, help="Image to send, e.g. a remixed_image.png")
+    parser.add_argument("--runs", type=int, default=20, help="Uploads per variant")
+    parser.add_argument("--uplink_mbps", type=float, default=20, help="Uplink bandwidth for the transfer estimate")
+
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/openapi/v1/image-to-3d"
+    session = requests.Session()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        prepared = image_ingest.prepare_image(args.image_path, cache_dir)
+        cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        image_ingest.prepare_image(args.image_path, cache_dir)
+        cached_ms = (time.perf_counter() - start) * 1000
+
+        variants = {
+            "original": raw_data_uri(args.image_path),
+            "ingested": image_ingest.image_reference(args.image_path, public_url="", cache_dir=cache_dir),
+        }
+        image_ingest.INGEST_URL_SECRET = image_ingest.INGEST_URL_SECRET or "bench"
+        variants["signed"] = image_ingest.image_reference(args.image_path, public_url="https://remix.example.com",
+                                                         cache_dir=cache_dir)
+
+        print(f"ingest: {os.path.getsize(args.image_path) / 1024:.0f} KB -> {os.path.getsize(prepared) / 1024:.0f} KB"
+              f" ({os.path.basename(prepared)}) in {cold_ms:.1f} ms, cached lookup {cached_ms:.1f} ms")
+        baseline = None
+        for label, image_url in variants.items():
+            body = payload_bytes(image_url)
+            session.post(url, data=body).raise_for_status()
+            local_ms = time_uploads(session, url, body, args.runs)
+            uplink_ms = len(body) * 8 / (args.uplink_mbps * 1e6) * 1000
+            baseline = baseline or len(body)
+            print(f"{label:>9}: body {len(body) / 1024:8.1f} KB ({len(body) / baseline:6.1%}) | local upload {local_ms:6.2f} ms"
+                  f" | at {args.uplink_mbps:g} Mbit/s {uplink_ms:8.1f} ms")
+
+    server.shutdown()
@@ -0,0 +1,231 @@
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+import requests
+from fake_upstreams import FakeUpstreams, cube_glb
+
+#end-to-end throughput of the app against the fake meshy/openai servers: --concurrency clients send a
+#weighted mix of /txtgen3d (txtgen3d_fast for the preview-only tier), /remixgen3d, /upload, /transcribe and
+#model download (model) requests for --seconds, following queued jobs to completion. reports p50/p95/p99 latency per route and
+#finished jobs per minute. without --url the app is started in this process against fresh fakes; with
+#--url, start the app yourself with the environment fake_upstreams.py prints. --save writes the results, --baseline fails on a p95 regression.
+
+JOB_POLL_INTERVAL = 0.1
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def wait_for_job(session, base_url, job_id, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = session.get(f"{base_url}/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(JOB_POLL_INTERVAL)
+    return {"status": "timeout", "result": {}}
+
+
+class Driver:
+    def __init__(self, base_url, job_timeout):
+        self.base_url = base_url
+        self.job_timeout = job_timeout
+        self.glb = cube_glb()
+        self.parent_id = None
+        self.model_url = None
+
+    def finish(self, session, response):
+        """Follow a queued job to its end; returns (ok, status)."""
+        body = response.json()
+        if response.status_code == 202:
+            job = wait_for_job(session, self.base_url, body["job_id"], self.job_timeout)
+            return job["status"] == "success", job["status"]
+        return response.ok and body.get("status") == "success", body.get("status", str(response.status_code))
+
+    def upload(self, session):
+        files = {"file": (f"bench-{uuid.uuid4().hex[:8]}.glb", io.BytesIO(self.glb), "model/gltf-binary")}
+        response = session.post(f"{self.base_url}/upload", files=files)
+        body = response.json()
+        if response.ok and self.parent_id is None:
+            self.parent_id = body.get("artifact_id")
+            self.model_url = body.get("models", {}).get("refined")
+        return response.ok and body.get("status") == "success", body.get("status", str(response.status_code))
+
+    def txtgen3d(self, session):
+        #unique prompts, so the result cache never answers for upstream
+        payload = {"text": f"a benchmark frog {uuid.uuid4().hex}", "artstyle": "realistic"}
+        return self.finish(session, session.post(f"{self.base_url}/txtgen3d", json=payload))
+
+    def txtgen3d_fast(self, session):
+        #preview-only tier: time to the first (draft) model
+        payload = {"text": f"a benchmark frog {uuid.uuid4().hex}", "artstyle": "realistic", "quality": "fast"}
+        return self.finish(session, session.post(f"{self.base_url}/txtgen3d", json=payload))
+
+    def remixgen3d(self, session):
+        if self.parent_id is None:
+            self.upload(session)
+        payload = {"text": f"give it a straw hat {uuid.uuid4().hex}", "parent_id": self.parent_id}
+        return self.finish(session, session.post(f"{self.base_url}/remixgen3d", json=payload))
+
+    def model(self, session):
+        #what a viewer does after every generation: download the model
+        if self.model_url is None:
+            self.upload(session)
+        response = session.get(f"{self.base_url}{self.model_url}")
+        return response.ok, str(response.status_code)
+
+    def transcribe(self, session):
+        files = {"file": ("speech.webm", io.BytesIO(os.urandom(32 * 1024)), "audio/webm")}
+        response = session.post(f"{self.base_url}/transcribe", files=files)
+        return response.ok, response.json().get("status", str(response.status_code))
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        mix[route.strip()] = float(weight or 1)
+    return mix
+
+
+def run(driver, mix, concurrency, seconds):
+    results = {route: [] for route in mix}
+    routes, weights = list(mix), list(mix.values())
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            route = random.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok, status = getattr(driver, route)(session)
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            with lock:
+                results[route].append((time.perf_counter() - started, ok, status))
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    summary = {"elapsed": round(elapsed, 3), "routes": {}}
+    jobs = 0
+    for route, samples in results.items():
+        latencies = [seconds for seconds, ok, _ in samples if ok]
+        errors = {}
+        for _, ok, status in samples:
+            if not ok:
+                errors[status] = errors.get(status, 0) + 1
+        summary["routes"][route] = {
+            "requests": len(samples), "ok": len(latencies), "errors": errors,
+            **{f"p{int(q * 100)}": percentile(latencies, q) for q in (0.5, 0.95, 0.99)},
+        }
+        if route in ("txtgen3d", "txtgen3d_fast", "remixgen3d"):
+            jobs += len(latencies)
+    summary["jobs_per_minute"] = round(jobs / elapsed * 60, 2) if elapsed else 0
+    return summary
+
+
+def report(summary):
+    print(f"{'route':>13} {'requests':>8} {'ok':>5} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}  errors")
+    for route, stats in summary["routes"].items():
+        cells = [f"{stats[p]:8.3f}" if stats[p] is not None else f"{'-':>8}" for p in ("p50", "p95", "p99")]
+        print(f"{route:>13} {stats['requests']:>8} {stats['ok']:>5} {' '.join(cells)}  {stats['errors'] or ''}")
+    print(f"finished generation jobs per minute: {summary['jobs_per_minute']}")
+
+
+def regressions(summary, baseline, tolerance):
+    """Routes whose p95 got worse than the baseline by more than tolerance (a fraction)."""
+    found = []
+    for route, stats in summary["routes"].items():
+        before = baseline.get("routes", {}).get(route, {}).get("p95")
+        if before and stats["p95"] is not None and stats["p95"] > before * (1 + tolerance):
+            found.append(f"{route}: p95 {stats['p95']:.3f}s vs baseline {before:.3f}s")
+    return found
+
+
+def start_app(upstreams):
+    """Start the app in this process, against upstreams, in a scratch working directory."""
+    from werkzeug.serving import make_server
+    import logging
+    import tempfile
+
+    os.environ.update(upstreams.env())
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.chdir(workdir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+
+    #one access log line per job status poll would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"App running in {workdir}")
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default=None, help="Running app to drive (default: start one here)")
+    parser.add_argument("--mix", type=str, default="txtgen3d=1,remixgen3d=1,upload=2,transcribe=4",
+                        help="Routes and their weights")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--seconds", type=float, default=60, help="How long to send new requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake upstream latency per request (s)")
+    parser.add_argument("--task_seconds", type=float, default=3.0, help="Fake meshy task duration (s)")
+    parser.add_argument("--failure_rate", type=float, default=0.0, help="Fraction of fake upstream calls that fail")
+    parser.add_argument("--job_timeout", type=float, default=600, help="Give up on a job after this long (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the route mix")
+    parser.add_argument("--save", type=str, default=None, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="Results JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression vs the baseline")
+
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    upstreams = None
+    base_url = args.url
+    if base_url is None:
+        upstreams = FakeUpstreams(latency=args.latency, task_seconds=args.task_seconds,
+                                  failure_rate=args.failure_rate).start()
+        base_url = start_app(upstreams)
+
+    mix = parse_mix(args.mix)
+    print(f"{args.concurrency} clients for {args.seconds:g}s against {base_url}: {mix}")
+    results, elapsed = run(Driver(base_url, args.job_timeout), mix, args.concurrency, args.seconds)
+    summary = summarize(results, elapsed)
+    summary["config"] = {key: getattr(args, key) for key in ("mix", "concurrency", "seconds", "latency",
+                                                            "task_seconds", "failure_rate", "seed")}
+    if upstreams is not None:
+        summary["upstream_calls"] = dict(upstreams.counts)
+    report(summary)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(summary, json.load(f), args.tolerance)
+        for line in found:
+            print("REGRESSION", line)
+        if found:
+            sys.exit(1)
@@ -0,0 +1,54 @@
+import time
+import statistics
+import pyvista as pv
+from vista_3d_to_images import CAMERA_VIEWS, WINDOW_SIZE, add_lights, render_frames_with_pyvista, warm_up
+
+#compares the old per-request plotter (create, light, import, render, close) against the warmed renderer
+
+
+def render_cold(glb_path):
+    plotter = pv.Plotter(off_screen=True, window_size=WINDOW_SIZE, lighting='none')
+    plotter.import_gltf(glb_path)
+    add_lights(plotter)
+    frames = {}
+    for view_name, (pos, focal, up) in CAMERA_VIEWS.items():
+        plotter.camera_position = [pos, focal, up]
+        frames[view_name] = plotter.screenshot(return_img=True)
+    plotter.close()
+    return frames
+
+
+def time_runs(fn, glb_path, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(glb_path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:>5}: mean {statistics.mean(timings):8.1f} ms | median {statistics.median(timings):8.1f} ms"
+          f" | min {min(timings):8.1f} ms | max {max(timings):8.1f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--glb_path", type=str, required=True, help="Path to input GLB file")
+    parser.add_argument("--runs", type=int, default=10, help="Render requests to time per mode")
+
+    args = parser.parse_args()
+
+    cold = time_runs(render_cold, args.glb_path, args.runs)
+
+    warm_up()
+    render_frames_with_pyvista(args.glb_path)
+    warm = time_runs(render_frames_with_pyvista, args.glb_path, args.runs)
+
+    print(f"{len(CAMERA_VIEWS)} views at {WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}, {args.runs} requests each")
+    report("cold", cold)
+    report("warm", warm)
+    print(f"warm saves {statistics.mean(cold) - statistics.mean(warm):.1f} ms per request"
+          f" ({statistics.mean(cold) / statistics.mean(warm):.2f}x)")
@@ -0,0 +1,76 @@
+import time
+import threading
+import statistics
+import requests
+
+#load test for /models against a running server: requests/second and latency for a full download,
+#an ETag revalidation (304), a gzip download and a ranged read, each from several concurrent clients
+
+MODES = {
+    "full": {"Accept-Encoding": "identity"},
+    "revalidate": {"Accept-Encoding": "identity"},
+    "gzip": {"Accept-Encoding": "gzip"},
+    "range": {"Accept-Encoding": "identity", "Range": "bytes=0-65535"},
+}
+
+
+def run_mode(url, headers, clients, seconds):
+    """Hammer url from `clients` threads for `seconds`; returns (latencies in ms, bytes received, statuses)."""
+    latencies, received, statuses = [], [0], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        session = requests.Session()
+        local, size, codes = [], 0, {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            # read the raw body so gzip responses are counted as sent over the wire
+            response = session.get(url, headers=headers, stream=True)
+            body = response.raw.read(decode_content=False)
+            local.append((time.perf_counter() - start) * 1000)
+            size += len(body)
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local)
+            received[0] += size
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, received[0], statuses
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:5000/models/refined_model.glb", help="Model URL to load")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each mode")
+    parser.add_argument("--modes", type=str, default=",".join(MODES), help="Comma separated modes to run")
+
+    args = parser.parse_args()
+
+    etag = requests.get(args.url, headers={"Accept-Encoding": "identity"}).headers.get("ETag")
+    print(f"{args.url} ({args.clients} clients, {args.seconds:g}s per mode, ETag {etag})")
+
+    for mode in args.modes.split(","):
+        headers = dict(MODES[mode])
+        if mode == "revalidate":
+            headers["If-None-Match"] = etag or ""
+        latencies, received, statuses = run_mode(args.url, headers, args.clients, args.seconds)
+        if not latencies:
+            print(f"{mode:>10}: no requests completed")
+            continue
+        print(f"{mode:>10}: {len(latencies) / args.seconds:8.1f} req/s | p50 {statistics.median(latencies):7.1f} ms"
+              f" | p95 {percentile(latencies, 95):7.1f} ms | {received / args.seconds / 1e6:8.1f} MB/s | status {statuses}")
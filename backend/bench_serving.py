@@ -0,0 +1,76 @@
+import os
+import sys
+import random
+import tempfile
+import subprocess
+from fake_upstreams import FakeUpstreams
+from bench_startup import free_port, wait_until_up
+from bench_pipeline import Driver, parse_mix, run, summarize, report
+
+#throughput of the two ways to serve the app under the same mixed traffic: the flask development server
+#(`python app.py`, one process) and gunicorn (gunicorn.conf.py: --workers http processes plus the render
+#service). both run against the same fake meshy/openai servers, in fresh working directories, while
+#--concurrency clients send a weighted mix of uploads, model downloads and generations (bench_pipeline's
+#routes) for --seconds. reports latency per route, requests per second and finished jobs per minute.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve(mode, upstreams, port, workdir, workers, render_workers):
+    env = {**os.environ, **upstreams.env(), "HOST": "127.0.0.1", "PORT": str(port),
+           "WEB_CONCURRENCY": str(workers), "RENDER_WORKERS": str(render_workers)}
+    if mode == "dev":
+        command = [sys.executable, os.path.join(BACKEND_DIR, "app.py")]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"), "app:app"]
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def bench(mode, upstreams, mix, args):
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix=f"bench_serving_{mode}_") as workdir:
+        process = serve(mode, upstreams, port, workdir, args.workers, args.render_workers)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(f"{base_url}/healthz", process)
+            results, elapsed = run(Driver(base_url, args.job_timeout), mix, args.concurrency, args.seconds)
+            summary = summarize(results, elapsed)
+            summary["requests_per_second"] = round(sum(r["ok"] for r in summary["routes"].values()) / elapsed, 2)
+            return summary
+        finally:
+            #SIGTERM: gunicorn drains its jobs first, so the directory is not removed under a running one
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", type=str, default="dev,gunicorn", help="Servers to compare: dev, gunicorn")
+    parser.add_argument("--mix", type=str, default="upload=4,model=8,txtgen3d=1,remixgen3d=1",
+                        help="Routes and their weights")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--seconds", type=float, default=60, help="How long to send new requests")
+    parser.add_argument("--workers", type=int, default=4, help="Gunicorn http worker processes")
+    parser.add_argument("--render_workers", type=int, default=2, help="Render service worker processes")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake upstream latency per request (s)")
+    parser.add_argument("--task_seconds", type=float, default=3.0, help="Fake meshy task duration (s)")
+    parser.add_argument("--job_timeout", type=float, default=600, help="Give up on a job after this long (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the route mix")
+
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    summaries = {}
+    with FakeUpstreams(latency=args.latency, task_seconds=args.task_seconds) as upstreams:
+        for mode in args.modes.split(","):
+            random.seed(args.seed)
+            print(f"\n{mode}: {args.concurrency} clients for {args.seconds:g}s: {mix}")
+            summaries[mode] = bench(mode, upstreams, mix, args)
+            report(summaries[mode])
+            print(f"requests per second: {summaries[mode]['requests_per_second']}")
+
+    print(f"\n{'mode':>9} {'req/s':>8} {'jobs/min':>9}")
+    for mode, summary in summaries.items():
+        print(f"{mode:>9} {summary['requests_per_second']:>8} {summary['jobs_per_minute']:>9}")
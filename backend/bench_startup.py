@@ -0,0 +1,94 @@
+import os
+import io
+import sys
+import time
+import socket
+import tempfile
+import statistics
+import subprocess
+import requests
+from fake_upstreams import FakeUpstreams, cube_glb
+
+#cold start of the app: time from launching `python app.py` until it answers http, and how long the first
+#remix (the first request that needs pyvista and the openai sdk) takes after that, with and without the
+#prewarm thread. --delay is the idle time between the server coming up and that first request, as when a
+#fresh replica joins a load balancer. upstreams are local fakes with no latency, so the remix time is
+#mostly imports, renderer setup and rendering.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except (requests.ConnectionError, requests.Timeout):
+            time.sleep(0.005)
+    raise TimeoutError(f"{url} did not come up in {timeout}s")
+
+
+def first_remix(base_url, timeout=120):
+    session = requests.Session()
+    upload = session.post(f"{base_url}/upload", files={"file": ("cube.glb", io.BytesIO(cube_glb()))}).json()
+    response = session.post(f"{base_url}/remixgen3d", json={"text": "give it a hat", "parent_id": upload["artifact_id"]})
+    job_url = f"{base_url}{response.json()['status_url']}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = session.get(job_url).json()
+        if job["status"] not in ("queued", "running"):
+            return job["status"]
+        time.sleep(0.01)
+    return "timeout"
+
+
+def cold_start(upstreams, prewarm, delay):
+    port = free_port()
+    env = {**os.environ, **upstreams.env(), "PORT": str(port), "HOST": "127.0.0.1", "PREWARM": "1" if prewarm else "0"}
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, "app.py")], cwd=workdir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(f"{base_url}/healthz", process)
+            up = time.perf_counter() - started
+            time.sleep(delay)
+            request_started = time.perf_counter()
+            status = first_remix(base_url)
+            return up, time.perf_counter() - request_started, status
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode")
+    parser.add_argument("--delay", type=float, default=2.0, help="Seconds between the app coming up and the first request")
+
+    args = parser.parse_args()
+
+    with FakeUpstreams(latency=0, task_seconds=0) as upstreams:
+        print(f"{'prewarm':>8} {'up s':>8} {'first remix s':>14} {'up + first s':>13}")
+        for prewarm in (False, True):
+            runs = []
+            for _ in range(args.runs):
+                up, first, status = cold_start(upstreams, prewarm, args.delay)
+                if status != "success":
+                    print(f"  first remix ended with {status}")
+                runs.append((up, first))
+            up = statistics.median(r[0] for r in runs)
+            first = statistics.median(r[1] for r in runs)
+            print(f"{'on' if prewarm else 'off':>8} {up:>8.3f} {first:>14.3f} {up + first:>13.3f}")
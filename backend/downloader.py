@@ -0,0 +1,130 @@
+import os
+import time
+import hashlib
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http_session import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, get_session
+from tracing import span, wrap
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1 << 20)))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+#extra formats from meshy's model_urls to fetch next to every glb, e.g. "fbx,usdz"
+MODEL_FORMATS = [fmt.strip() for fmt in os.getenv("MESHY_MODEL_FORMATS", "glb").split(",") if fmt.strip()]
+
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _file_sha256(path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _total_size(response, offset):
+    #"Content-Range: bytes 100-999/1000" on a resumed request, plain Content-Length otherwise
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def download(url, dest_path, expected_size=None, sha256=None, retries=DOWNLOAD_RETRIES,
+             chunk_size=DOWNLOAD_CHUNK_SIZE, session=None):
+    """
+    Stream url to dest_path without buffering the body in memory.
+
+    Bytes go to dest_path + ".part"; a connection dropped during this call resumes from the bytes already
+    on disk with an HTTP Range request (a .part file left by an earlier call is discarded, not resumed). The size (expected_size, else what the server announced) and optional sha256
+    are verified before the file is atomically renamed into place, so dest_path is never half written.
+    """
+    with span("meshy.download", file=os.path.basename(dest_path)) as transfer:
+        return _download(url, dest_path, expected_size, sha256, retries, chunk_size, session, transfer)
+
+
+def _download(url, dest_path, expected_size, sha256, retries, chunk_size, session, transfer):
+    http = session or get_session()
+    part_path = dest_path + ".part"
+    announced_size = None
+    #left by a killed process or an earlier task writing to the same path, possibly from another url
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    for attempt in range(retries + 1):
+        transfer.set(attempts=attempt + 1)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with http.get(url, headers=headers, stream=True,
+                          timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)) as response:
+                if offset and response.status_code == 416:
+                    known_size = expected_size if expected_size is not None else announced_size
+                    if known_size == offset:
+                        #nothing left to fetch: the previous attempt got every byte before the connection dropped
+                        break
+                    #no way to tell the file is complete, start over
+                    os.remove(part_path)
+                    continue
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    #server ignored the range, start over
+                    offset = 0
+                announced_size = _total_size(response, offset)
+
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        transfer.add("bytes", len(chunk))
+            if announced_size is None or os.path.getsize(part_path) >= announced_size:
+                break
+            print(f"Download of {url} ended early, resuming...")
+        except _TRANSIENT_ERRORS as e:
+            if attempt == retries:
+                raise
+            print(f"Download of {url} interrupted ({e}), resuming...")
+        time.sleep(min(2 ** attempt, 10))
+
+    size = os.path.getsize(part_path)
+    want_size = expected_size if expected_size is not None else announced_size
+    if want_size is not None and size != want_size:
+        os.remove(part_path)
+        raise DownloadError(f"Downloaded {size} bytes from {url}, expected {want_size}.")
+    if sha256 is not None and _file_sha256(part_path) != sha256:
+        os.remove(part_path)
+        raise DownloadError(f"Checksum mismatch for {url}.")
+
+    os.replace(part_path, dest_path)
+    return dest_path
+
+
+def download_many(items, max_workers=DOWNLOAD_WORKERS, session=None):
+    """Download [(url, dest_path), ...] concurrently; returns the destination paths in order."""
+    if len(items) == 1:
+        return [download(items[0][0], items[0][1], session=session)]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download") as pool:
+        futures = [pool.submit(wrap(download), url, dest_path, session=session) for url, dest_path in items]
+        return [future.result() for future in futures]
+
+
+def download_task_models(task, glb_path, formats=None, session=None):
+    """
+    Download a finished meshy task's glb to glb_path, plus any other requested formats from its
+    model_urls next to it (same stem, format as extension), all at once.
+    """
+    formats = MODEL_FORMATS if formats is None else formats
+    model_urls = task["model_urls"]
+    stem = os.path.splitext(glb_path)[0]
+
+    items = [(model_urls["glb"], glb_path)]
+    for fmt in formats:
+        if fmt != "glb" and model_urls.get(fmt):
+            items.append((model_urls[fmt], f"{stem}.{fmt}"))
+    return download_many(items, session=session)
@@ -0,0 +1,212 @@
+import io
+import json
+import time
+import base64
+import random
+import struct
+import itertools
+import threading
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+
+#local stand-ins for the meshy and openai APIs, so the pipeline can be exercised and benchmarked without
+#paying for real generations. meshy tasks progress from PENDING to SUCCEEDED over task_seconds and their
+#model_urls point back at this server; openai answers image generation with a png and transcription with
+#fixed text. every request waits latency seconds first, and failure_rate of them fail (5xx on requests,
+#FAILED on tasks). point the app at them with MESHY_BASE_URL and OPENAI_BASE_URL (see FakeUpstreams.env).
+
+
+def cube_glb():
+    """A minimal valid GLB: a unit cube with positions and indices only."""
+    positions = [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)]
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    vertex_bytes = b"".join(struct.pack("<3f", *p) for p in positions)
+    index_bytes = b"".join(struct.pack("<3H", *f) for f in faces)
+    binary = vertex_bytes + index_bytes
+    binary += b"\0" * (-len(binary) % 4)
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(vertex_bytes), "target": 34962},
+            {"buffer": 0, "byteOffset": len(vertex_bytes), "byteLength": len(index_bytes), "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": [-0.5, -0.5, -0.5], "max": [0.5, 0.5, 0.5]},
+            {"bufferView": 1, "componentType": 5123, "count": len(faces) * 3, "type": "SCALAR"},
+        ],
+    }
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return (struct.pack("<4sII", b"glTF", 2, total) + struct.pack("<I4s", len(json_chunk), b"JSON") + json_chunk
+            + struct.pack("<I4s", len(binary), b"BIN\0") + binary)
+
+
+def generated_png(size=1024):
+    """A distinct png per call, so the image-to-3d result cache never short-circuits a benchmark."""
+    color = tuple(random.randrange(256) for _ in range(3))
+    image = Image.new("RGB", (size, size), color)
+    image.paste(tuple(255 - c for c in color), (size // 4, size // 4, 3 * size // 4, 3 * size // 4))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeUpstreams:
+    """Both fake APIs on one local port; use as a context manager or call start()/stop()."""
+
+    def __init__(self, port=0, latency=0.05, task_seconds=3.0, failure_rate=0.0, glb_path=None):
+        self.latency = latency
+        self.task_seconds = task_seconds
+        self.failure_rate = failure_rate
+        self.glb = open(glb_path, "rb").read() if glb_path else cube_glb()
+        self.tasks = {}
+        self.counts = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def env(self):
+        """Environment that points the app at these servers."""
+        return {"MESHY_BASE_URL": self.url, "MESHY_API": "fake", "OPENAI_BASE_URL": f"{self.url}/v1",
+                "OPENAI_API_KEY": "fake"}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def create_task(self, kind):
+        with self._lock:
+            task_id = f"fake-{next(self._ids)}"
+            self.tasks[task_id] = {"kind": kind, "created": time.time(), "failed": random.random() < self.failure_rate}
+        return task_id
+
+    def task_status(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        elapsed = time.time() - task["created"]
+        progress = min(100, int(100 * elapsed / self.task_seconds)) if self.task_seconds > 0 else 100
+        if progress >= 100:
+            status = "FAILED" if task["failed"] else "SUCCEEDED"
+        else:
+            status = "PENDING" if progress == 0 else "IN_PROGRESS"
+        result = {"id": task_id, "status": status, "progress": progress}
+        if status == "SUCCEEDED":
+            result["model_urls"] = {"glb": f"{self.url}/files/{task_id}.glb"}
+        return result
+
+    def image_response(self):
+        return {
+            "id": f"resp_{next(self._ids)}", "object": "response", "created_at": int(time.time()),
+            "status": "completed", "model": "gpt-5.1", "parallel_tool_calls": True, "tool_choice": "auto",
+            "tools": [{"type": "image_generation"}],
+            "output": [{"id": f"ig_{next(self._ids)}", "type": "image_generation_call", "status": "completed",
+                        "result": base64.b64encode(generated_png()).decode("ascii")}],
+        }
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body, content_type="application/json"):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _begin(self, name):
+                upstreams._count(name)
+                if upstreams.latency > 0:
+                    time.sleep(upstreams.latency)
+
+            def _failed(self):
+                if random.random() < upstreams.failure_rate:
+                    self._send(500, {"message": "injected failure"})
+                    return True
+                return False
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = urlparse(self.path).path
+                if path in ("/openapi/v2/text-to-3d", "/openapi/v1/image-to-3d"):
+                    self._begin("meshy.create")
+                    if not self._failed():
+                        self._send(202, {"result": upstreams.create_task(path.rsplit("/", 1)[1])})
+                elif path == "/v1/responses":
+                    self._begin("openai.image")
+                    if not self._failed():
+                        self._send(200, upstreams.image_response())
+                elif path == "/v1/audio/transcriptions":
+                    self._begin("openai.transcribe")
+                    if not self._failed():
+                        self._send(200, {"text": "make it look like a happy frog"})
+                else:
+                    self._send(404, {"message": "not found"})
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path.startswith("/files/"):
+                    self._begin("meshy.download")
+                    return self._send(200, upstreams.glb, "model/gltf-binary")
+                if path.startswith(("/openapi/v2/text-to-3d/", "/openapi/v1/image-to-3d/")):
+                    self._begin("meshy.poll")
+                    task = upstreams.task_status(path.rsplit("/", 1)[1])
+                    return self._send(200, task) if task else self._send(404, {"message": "no such task"})
+                self._send(404, {"message": "not found"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--task_seconds", type=float, default=3.0, help="Seconds a meshy task takes to finish")
+    parser.add_argument("--failure_rate", type=float, default=0.0, help="Fraction of requests and tasks that fail")
+    parser.add_argument("--glb_path", type=str, default=None, help="Model served for finished tasks (default: a cube)")
+
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.port, args.latency, args.task_seconds, args.failure_rate, args.glb_path)
+    print("Fake Meshy/OpenAI listening; start the app with:")
+    print("  " + " ".join(f"{key}={value}" for key, value in upstreams.env().items()) + " python app.py")
+    upstreams.server.serve_forever()
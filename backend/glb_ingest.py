@@ -0,0 +1,305 @@
+import os
+import json
+import struct
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+#uploaded models are checked while they stream in: the multipart parser writes the file part into a
+#GlbUpload, which hashes it, writes it to a staging file and validates the GLB header and chunk table as
+#bytes arrive. files that declare (or grow) past GLB_MAX_BYTES, are not glTF 2.0 binaries or have a
+#malformed chunk table are rejected at that point, before the rest is read. the JSON chunk is then checked
+#against the binary chunk, and triangle counts and bounds are taken from it for the renderers.
+
+GLB_MAX_BYTES = int(os.getenv("GLB_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", os.path.join(os.getcwd(), "cache", "uploads"))
+
+_HEADER = struct.Struct("<4sII")
+_CHUNK_HEADER = struct.Struct("<I4s")
+_JSON, _BIN = b"JSON", b"BIN\x00"
+#glTF primitive modes that draw triangles
+_TRIANGLES, _TRIANGLE_STRIP, _TRIANGLE_FAN = 4, 5, 6
+
+
+class InvalidGlbError(Exception):
+    #not a ValueError: werkzeug's form parser swallows those, and these must abort the upload
+    pass
+
+
+class GlbTooLargeError(InvalidGlbError):
+    pass
+
+
+class GlbValidator:
+    """Incremental check of the GLB container: feed() the bytes in order, then close() for the glTF JSON."""
+
+    def __init__(self, max_bytes=GLB_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.length = None
+        self.position = 0
+        self.bin_length = None
+        self._pending = b""
+        self._chunk_type = None
+        self._chunk_left = 0
+        self._chunks = 0
+        self._json = bytearray()
+
+    def feed(self, data):
+        if self.position + len(self._pending) + len(data) > self.max_bytes:
+            raise GlbTooLargeError(f"Model is larger than {self.max_bytes} bytes.")
+        view = memoryview(data)
+        while view:
+            if self._chunk_left:
+                body = view[:self._chunk_left]
+                if self._chunk_type == _JSON:
+                    self._json += body
+                self._chunk_left -= len(body)
+                self.position += len(body)
+                view = view[len(body):]
+                continue
+
+            if self.length is not None and self.position >= self.length:
+                raise InvalidGlbError("Data continues past the length in the GLB header.")
+            size = _HEADER.size if self.length is None else _CHUNK_HEADER.size
+            needed = size - len(self._pending)
+            self._pending += bytes(view[:needed])
+            view = view[needed:]
+            if len(self._pending) < size:
+                break
+            header, self._pending = self._pending, b""
+            if self.length is None:
+                self._header(header)
+            else:
+                self._chunk_header(header)
+
+    def _header(self, header):
+        magic, version, length = _HEADER.unpack(header)
+        if magic != b"glTF":
+            raise InvalidGlbError("Not a GLB file.")
+        if version != 2:
+            raise InvalidGlbError(f"GLB version {version} is not supported; expected glTF 2.0.")
+        if length > self.max_bytes:
+            raise GlbTooLargeError(f"Model is {length} bytes; the limit is {self.max_bytes}.")
+        if length < _HEADER.size + _CHUNK_HEADER.size:
+            raise InvalidGlbError("GLB header declares an impossible length.")
+        self.length = length
+        self.position = _HEADER.size
+
+    def _chunk_header(self, header):
+        chunk_length, chunk_type = _CHUNK_HEADER.unpack(header)
+        self.position += _CHUNK_HEADER.size
+        if self.position + chunk_length > self.length:
+            raise InvalidGlbError("GLB chunk runs past the end of the file.")
+        if self._chunks == 0 and chunk_type != _JSON:
+            raise InvalidGlbError("The first GLB chunk must be JSON.")
+        if self._chunks > 0 and chunk_type == _JSON:
+            raise InvalidGlbError("GLB has more than one JSON chunk.")
+        if chunk_type == _BIN:
+            if self._chunks != 1:
+                raise InvalidGlbError("The GLB binary chunk must directly follow the JSON chunk.")
+            self.bin_length = chunk_length
+        self._chunks += 1
+        self._chunk_type = chunk_type
+        self._chunk_left = chunk_length
+
+    def close(self):
+        """The parsed glTF JSON once every byte was fed; raises InvalidGlbError if the file is incomplete."""
+        if self.length is None or self._pending or self._chunk_left or self.position != self.length:
+            raise InvalidGlbError("GLB file is truncated.")
+        try:
+            gltf = json.loads(bytes(self._json))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise InvalidGlbError(f"GLB JSON chunk is not valid JSON: {e}")
+        check_gltf(gltf, self.bin_length)
+        return gltf
+
+
+def check_gltf(gltf, bin_length):
+    """Raise InvalidGlbError unless every buffer, view, accessor and node reference in gltf resolves."""
+    try:
+        if not isinstance(gltf, dict) or not str(gltf["asset"]["version"]).startswith("2."):
+            raise InvalidGlbError("Not a glTF 2.0 asset.")
+        buffers, views, accessors = gltf.get("buffers", []), gltf.get("bufferViews", []), gltf.get("accessors", [])
+        for index, buffer in enumerate(buffers):
+            if index == 0 and "uri" not in buffer:
+                if bin_length is None or buffer["byteLength"] > bin_length:
+                    raise InvalidGlbError("GLB binary chunk is shorter than its buffer.")
+            elif "uri" in buffer and not buffer["uri"].startswith("data:"):
+                raise InvalidGlbError("GLB references external files; upload a self-contained model.")
+        for view in views:
+            if view.get("byteOffset", 0) + view["byteLength"] > buffers[view["buffer"]]["byteLength"]:
+                raise InvalidGlbError("A GLB buffer view runs past the end of its buffer.")
+        for accessor in accessors:
+            if "bufferView" in accessor:
+                views[accessor["bufferView"]]
+        primitives = [primitive for mesh in gltf.get("meshes", []) for primitive in mesh["primitives"]]
+        for primitive in primitives:
+            accessors[primitive["attributes"]["POSITION"]]
+            if "indices" in primitive:
+                accessors[primitive["indices"]]
+        if not primitives:
+            raise InvalidGlbError("GLB contains no meshes.")
+        nodes = gltf.get("nodes", [])
+        for node in nodes:
+            if "mesh" in node:
+                gltf["meshes"][node["mesh"]]
+            for child in node.get("children", []):
+                nodes[child]
+        for scene in gltf.get("scenes", []):
+            for root in scene.get("nodes", []):
+                nodes[root]
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise InvalidGlbError(f"GLB JSON is malformed ({type(e).__name__}: {e}).")
+
+
+def _node_matrix(node):
+    if "matrix" in node:
+        #glTF matrices are column-major
+        return np.array(node["matrix"], dtype=float).reshape(4, 4).T
+    x, y, z, w = node.get("rotation", (0, 0, 0, 1))
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.get("scale", (1, 1, 1)), dtype=float)
+    matrix[:3, 3] = node.get("translation", (0, 0, 0))
+    return matrix
+
+
+def _primitive_triangles(primitive, accessors):
+    count = accessors[primitive.get("indices", primitive["attributes"]["POSITION"])]["count"]
+    mode = primitive.get("mode", _TRIANGLES)
+    if mode == _TRIANGLES:
+        return count // 3
+    if mode in (_TRIANGLE_STRIP, _TRIANGLE_FAN):
+        return max(0, count - 2)
+    return 0
+
+
+def model_stats(gltf):
+    """{"triangles", "vertices", "meshes", "bounds": [[min xyz], [max xyz]] or None} of the default scene."""
+    accessors, meshes, nodes = gltf.get("accessors", []), gltf.get("meshes", []), gltf.get("nodes", [])
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        children = {child for node in nodes for child in node.get("children", [])}
+        roots = [index for index in range(len(nodes)) if index not in children]
+
+    #(mesh index, world matrix) for every mesh instance; meshes no node uses count once, untransformed
+    instances = []
+    stack = [(root, np.eye(4), ()) for root in roots]
+    while stack:
+        index, parent, path = stack.pop()
+        if index in path:
+            continue
+        node = nodes[index]
+        world = parent @ _node_matrix(node)
+        if "mesh" in node:
+            instances.append((node["mesh"], world))
+        stack.extend((child, world, path + (index,)) for child in node.get("children", []))
+    if not nodes:
+        instances = [(index, np.eye(4)) for index in range(len(meshes))]
+
+    triangles = vertices = 0
+    corners = []
+    for mesh_index, world in instances:
+        for primitive in meshes[mesh_index]["primitives"]:
+            position = accessors[primitive["attributes"]["POSITION"]]
+            triangles += _primitive_triangles(primitive, accessors)
+            vertices += position["count"]
+            if "min" in position and "max" in position:
+                low, high = position["min"], position["max"]
+                box = np.array([[x, y, z, 1] for x in (low[0], high[0]) for y in (low[1], high[1])
+                                for z in (low[2], high[2])], dtype=float)
+                corners.append((box @ world.T)[:, :3])
+
+    bounds = None
+    if corners:
+        points = np.concatenate(corners)
+        bounds = [[round(float(v), 6) for v in points.min(axis=0)], [round(float(v), 6) for v in points.max(axis=0)]]
+    return {"triangles": triangles, "vertices": vertices, "meshes": len(meshes), "bounds": bounds}
+
+
+class GlbUpload:
+    """
+    Writable file object the form parser streams an uploaded file into. Bytes are validated, hashed and
+    written to a staging file as they arrive; close() removes the staging file unless save() moved it.
+    """
+
+    def __init__(self, staging_dir=UPLOAD_STAGING_DIR, max_bytes=GLB_MAX_BYTES):
+        os.makedirs(staging_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=staging_dir, suffix=".glb.part")
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+        self.validator = GlbValidator(max_bytes)
+        self.bytes = 0
+
+    def write(self, data):
+        try:
+            self.validator.feed(data)
+        except InvalidGlbError:
+            #the parser gives up on the request, so nothing else will close this
+            self.close()
+            raise
+        self._digest.update(data)
+        self._file.write(data)
+        self.bytes += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        #the parser rewinds finished file parts; the data is only read back through save()
+        self._file.flush()
+        return 0
+
+    def finish(self):
+        """{"sha256", "bytes", "stats"} of the complete upload; raises InvalidGlbError if it is not a valid GLB."""
+        self._file.flush()
+        gltf = self.validator.close()
+        try:
+            stats = model_stats(gltf)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise InvalidGlbError(f"GLB scene is malformed ({type(e).__name__}: {e}).")
+        return {"sha256": self._digest.hexdigest(), "bytes": self.bytes, "stats": stats}
+
+    def save(self, dest_path):
+        self._file.close()
+        shutil.move(self.path, dest_path)
+        self.path = None
+
+    def close(self):
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+def ingest_glb(path, max_bytes=GLB_MAX_BYTES, chunk_size=1 << 16):
+    """Validate and describe a GLB already on disk, reading it the way an upload streams in."""
+    validator = GlbValidator(max_bytes)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            validator.feed(chunk)
+            digest.update(chunk)
+    return {"sha256": digest.hexdigest(), "bytes": validator.position, "stats": model_stats(validator.close())}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--glb_path", type=str, required=True, help="GLB file to validate")
+    parser.add_argument("--max_bytes", type=int, default=GLB_MAX_BYTES, help="Size limit")
+
+    args = parser.parse_args()
+    try:
+        print(json.dumps(ingest_glb(args.glb_path, args.max_bytes), indent=2))
+    except InvalidGlbError as e:
+        raise SystemExit(f"Invalid: {e}")
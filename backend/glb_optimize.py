@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import struct
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from model_serving import precompress
+
+#post-download optimization: every model gets meshopt-compressed, quantized LOD variants next to it
+#(refined_model.glb -> refined_model.low.glb, ...) made with gltfpack, so the viewer can show a small
+#model instantly and upgrade progressively. Without gltfpack installed the originals are served as-is.
+#the original and every variant also get gzip/brotli siblings for clients that accept them.
+
+GLTFPACK_PATH = os.getenv("GLTFPACK_PATH") or shutil.which("gltfpack")
+GLB_OPTIMIZE_WORKERS = int(os.getenv("GLB_OPTIMIZE_WORKERS", "2"))
+
+#gltfpack arguments per level: -si keeps that fraction of triangles, -tl caps texture size,
+#-tw re-encodes textures as WebP (needed for -tl), -cc applies meshopt compression on top of quantization
+LOD_LEVELS = {
+    "low": ["-si", "0.1", "-tw", "-tl", "256"],
+    "medium": ["-si", "0.35", "-tw", "-tl", "1024"],
+    "high": ["-tw", "-tl", "2048"],
+}
+COMMON_ARGS = ["-cc"]
+
+_pool = ThreadPoolExecutor(max_workers=GLB_OPTIMIZE_WORKERS, thread_name_prefix="glb-optimize")
+
+
+def lod_path(glb_path, level):
+    stem, ext = os.path.splitext(glb_path)
+    return f"{stem}.{level}{ext}"
+
+
+def lod_base_name(filename):
+    """The source a variant was made from (model.low.glb -> model.glb); other names come back unchanged."""
+    parts = filename.split(".")
+    if len(parts) >= 3 and parts[-2] in LOD_LEVELS:
+        return ".".join(parts[:-2] + parts[-1:])
+    return filename
+
+
+def fresh_lod_path(glb_path, level):
+    """The variant for level if it exists and was made from the current source file, else None."""
+    variant = lod_path(glb_path, level)
+    try:
+        if os.path.getmtime(variant) >= os.path.getmtime(glb_path):
+            return variant
+    except OSError:
+        pass
+    return None
+
+
+def optimize_glb(glb_path, levels=None):
+    """
+    Write every LOD variant of glb_path with gltfpack; returns {level: {"path", "bytes", "seconds"}}.
+    """
+    precompress(glb_path)
+    if not GLTFPACK_PATH:
+        print("gltfpack not found; skipping GLB optimization.")
+        return {}
+
+    levels = LOD_LEVELS if levels is None else levels
+    source_bytes = os.path.getsize(glb_path)
+    variants = {}
+    for level, args in levels.items():
+        out_path = lod_path(glb_path, level)
+        #gltfpack infers the container from the extension, so the temp file must still end in .glb
+        tmp_path = f"{os.path.splitext(out_path)[0]}.tmp-{os.getpid()}.glb"
+        start = time.perf_counter()
+        result = subprocess.run(
+            [GLTFPACK_PATH, "-i", glb_path, "-o", tmp_path, *COMMON_ARGS, *args],
+            capture_output=True, text=True,
+        )
+        seconds = time.perf_counter() - start
+        if result.returncode != 0 or not os.path.exists(tmp_path):
+            print(f"gltfpack failed for {glb_path} ({level}):", result.stderr.strip())
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            continue
+
+        os.replace(tmp_path, out_path)
+        precompress(out_path)
+        size = os.path.getsize(out_path)
+        variants[level] = {"path": out_path, "bytes": size, "seconds": seconds}
+        metrics.observe("glb_optimize_seconds", seconds, level=level)
+        metrics.inc("glb_optimize_bytes_saved", source_bytes - size, level=level)
+        print(f"Optimized {glb_path} ({level}): {source_bytes} -> {size} bytes in {seconds:.2f}s")
+    return variants
+
+
+def optimize_glb_async(glb_path):
+    """Queue optimization in the background; the original stays servable until variants exist."""
+    return _pool.submit(optimize_glb, glb_path)
+
+
+def read_glb(glb_path):
+    """Return (gltf json dict, binary chunk bytes or b"") from a GLB file."""
+    with open(glb_path, "rb") as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    if magic != b"glTF" or version != 2:
+        raise ValueError(f"{glb_path} is not a glTF 2.0 binary file")
+
+    gltf, binary, offset = None, b"", 12
+    while offset + 8 <= min(length, len(data)):
+        chunk_length, chunk_type = struct.unpack_from("<I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == b"JSON":
+            gltf = json.loads(chunk)
+        elif chunk_type == b"BIN\x00":
+            binary = chunk
+        offset += 8 + chunk_length
+    if gltf is None:
+        raise ValueError(f"{glb_path} has no JSON chunk")
+    return gltf, binary
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import signal
+import secrets
+import threading
+import subprocess
+
+#production serving: `gunicorn -c backend/gunicorn.conf.py app:app` runs WEB_CONCURRENCY http worker
+#processes, each with GUNICORN_THREADS threads, instead of flask's single-process development server.
+#before the workers start, the master launches the render service (render_service.py) that every worker
+#sends its renders to, and points the workers at shared state: upstream rate limits (RATE_LIMIT_STATE_DIR)
+#and the job database, so a job poll can land on any worker. on shutdown or reload each worker stops taking
+#new jobs and gives the ones it is running JOB_DRAIN_SECONDS to finish; the render service stops last.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+JOB_DRAIN_SECONDS = float(os.getenv("JOB_DRAIN_SECONDS", "300"))
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(max(2, min(8, os.cpu_count() or 2)))))
+#threads, so that long /jobs/<id>/events streams and uploads do not each hold a whole process
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+pythonpath = BACKEND_DIR
+#not preloaded: the job pool, sqlite connections and the prewarm thread are created in each worker
+preload_app = False
+graceful_timeout = int(JOB_DRAIN_SECONDS) + 30
+#a worker draining its jobs stops heartbeating; on a reload it must not be killed as hung before the drain ends
+timeout = graceful_timeout
+#an idle keep-alive connection holds a stopping gthread worker open until graceful_timeout; behind a proxy
+#(or for browsers polling a job every few seconds) reconnecting is cheap
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+
+_render_service = None
+
+
+def on_starting(server):
+    global _render_service
+    state_dir = os.path.join(os.getcwd(), "cache", "serving")
+    os.makedirs(state_dir, exist_ok=True)
+    os.environ.setdefault("RATE_LIMIT_STATE_DIR", os.path.join(state_dir, "rate_limit"))
+    os.makedirs(os.environ["RATE_LIMIT_STATE_DIR"], exist_ok=True)
+    if os.getenv("RENDER_SERVICE_ADDRESS"):
+        #an externally run render service
+        return
+
+    address = os.path.join(state_dir, "render.sock")
+    os.environ["RENDER_SERVICE_ADDRESS"] = address
+    os.environ["RENDER_SERVICE_AUTHKEY"] = secrets.token_hex(16)
+    if os.path.exists(address):
+        os.remove(address)
+    _render_service = subprocess.Popen([sys.executable, "-u", os.path.join(BACKEND_DIR, "render_service.py"),
+                                        "--address", address], cwd=os.getcwd())
+    #the socket appears as soon as the service listens; renders sent while its workers are still opening
+    #their GL contexts just wait for them, but ones sent before it listens would fall back to in-process
+    deadline = time.monotonic() + 60
+    while not os.path.exists(address) and _render_service.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if not os.path.exists(address):
+        server.log.warning("Render service is not up; workers render in-process until it is")
+
+
+def _drain(worker):
+    app = sys.modules.get("app")
+    worker.jobs_cut_off = app.jobs.drain(JOB_DRAIN_SECONDS) if app is not None else 0
+
+
+def post_worker_init(worker):
+    #drain jobs from the moment SIGTERM arrives, alongside gunicorn finishing the requests in flight
+    #(job event streams among them), rather than only once those are done
+    handle_exit = worker.handle_exit
+
+    def handle_term(signum, frame):
+        handle_exit(signum, frame)
+        if worker.drain_thread is None:
+            worker.drain_thread = threading.Thread(target=_drain, args=(worker,), name="drain")
+            worker.drain_thread.start()
+
+    worker.drain_thread = None
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    if getattr(worker, "drain_thread", None) is None:
+        #stopped some other way (max_requests, SIGQUIT, a failed boot)
+        _drain(worker)
+    else:
+        worker.drain_thread.join()
+    cut_off = getattr(worker, "jobs_cut_off", 0)
+    if cut_off:
+        server.log.warning("Worker %s stopped with %d unfinished jobs", worker.pid, cut_off)
+        #the cut-off job threads would otherwise keep the interpreter alive until graceful_timeout
+        os._exit(0)
+
+
+def on_exit(server):
+    if _render_service is not None and _render_service.poll() is None:
+        _render_service.terminate()
+        try:
+            _render_service.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            _render_service.kill()
@@ -0,0 +1,63 @@
+import os
+import threading
+import importlib.util
+import requests
+from requests.adapters import HTTPAdapter
+from settings import settings
+
+#shared HTTP clients for upstream calls: one pooled keep-alive requests session for meshy creates and
+#downloads, and one OpenAI client (HTTP/2 when the h2 package is installed) instead of one per call.
+#reusing connections skips a TCP + TLS handshake on every request; every call gets a timeout.
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+#keep-alive connections kept per upstream host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+#image generation responses can take minutes
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "300"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies (connect, read) timeouts to calls that do not pass their own."""
+
+    def __init__(self, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), pool_size=HTTP_POOL_SIZE):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_lock = threading.Lock()
+_session = None
+_openai_client = None
+
+
+def get_session():
+    """The process-wide pooled session (urllib3 pools are thread safe)."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = TimeoutSession()
+        return _session
+
+
+def get_openai_client():
+    """The process-wide OpenAI client; needs OPENAI_API_KEY (environment or .env)."""
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            from openai import OpenAI, DefaultHttpxClient
+            _openai_client = OpenAI(
+                api_key=settings.openai_api_key,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=OPENAI_MAX_RETRIES,
+                http_client=DefaultHttpxClient(http2=HTTP2_AVAILABLE),
+            )
+        return _openai_client
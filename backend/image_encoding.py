@@ -0,0 +1,46 @@
+import io
+import os
+import base64
+import numpy as np
+from PIL import Image
+
+#format and quality used when rendered views are sent to the image model
+REMIX_IMAGE_FORMAT = os.getenv("REMIX_IMAGE_FORMAT", "jpeg")
+REMIX_IMAGE_QUALITY = int(os.getenv("REMIX_IMAGE_QUALITY", "85"))
+
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def encode_frame(frame, fmt=REMIX_IMAGE_FORMAT, quality=REMIX_IMAGE_QUALITY):
+    """Encode an HxWx3 (or HxWx4) uint8 frame to image bytes in memory; quality is ignored for png."""
+    fmt = fmt.lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    image = Image.fromarray(np.asarray(frame))
+    if fmt == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG", optimize=False)
+    else:
+        image.save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def encode_frames_base64(frames, fmt=REMIX_IMAGE_FORMAT, quality=REMIX_IMAGE_QUALITY):
+    """Return (mime_type, [base64 strings]) for an iterable of frames."""
+    fmt = "jpeg" if fmt.lower() == "jpg" else fmt.lower()
+    encoded = [base64.b64encode(encode_frame(frame, fmt, quality)).decode("utf-8") for frame in frames]
+    return MIME_TYPES[fmt], encoded
+
+
+def save_frames(frames, output_dir, fmt="png"):
+    """Write {name: frame} to output_dir/<name>.<fmt>; only used as a debug sink for rendered views."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, frame in frames.items():
+        paths[name] = os.path.join(output_dir, f"{name}.{fmt}")
+        with open(paths[name], "wb") as f:
+            f.write(encode_frame(frame, fmt))
+    return paths
@@ -0,0 +1,126 @@
+import os
+import io
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from urllib.parse import urlencode
+from PIL import Image
+import metrics
+from tracing import span
+from result_cache import file_sha256
+
+#images sent to meshy are first shrunk to the resolution it works at and recompressed (png only when the
+#image has transparency), then cached by content hash so retries and repeats skip the work. by default the
+#result is inlined as a data uri; with INGEST_PUBLIC_URL and INGEST_URL_SECRET set, meshy gets a short
+#signed link to /ingest/<name> on this server instead and fetches the image itself.
+
+INGEST_CACHE_DIR = os.getenv("INGEST_CACHE_DIR", os.path.join(os.getcwd(), "cache", "ingest"))
+#longest side sent upstream; larger inputs are downscaled, smaller ones are never upscaled
+INGEST_MAX_SIDE = int(os.getenv("INGEST_MAX_SIDE", "1024"))
+INGEST_JPEG_QUALITY = int(os.getenv("INGEST_JPEG_QUALITY", "90"))
+#externally reachable base url of this server, e.g. https://remix.example.com; empty sends data uris
+INGEST_PUBLIC_URL = os.getenv("INGEST_PUBLIC_URL", "").rstrip("/")
+INGEST_URL_SECRET = os.getenv("INGEST_URL_SECRET", "")
+#how long a signed link stays valid; meshy fetches the image right after the task is created
+INGEST_URL_TTL_SECONDS = int(os.getenv("INGEST_URL_TTL_SECONDS", "3600"))
+
+MIME_TYPES = {".png": "image/png", ".jpg": "image/jpeg"}
+
+
+def _has_transparency(image):
+    if image.mode in ("RGBA", "LA"):
+        return image.getchannel("A").getextrema()[0] < 255
+    return image.mode == "P" and "transparency" in image.info
+
+
+def _encode(image):
+    """(bytes, extension) for a resized image: png if any pixel is transparent, else jpeg."""
+    buffer = io.BytesIO()
+    if _has_transparency(image):
+        image.convert("RGBA").save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), ".png"
+    image.convert("RGB").save(buffer, format="JPEG", quality=INGEST_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), ".jpg"
+
+
+def prepare_image(image_path, cache_dir=INGEST_CACHE_DIR, max_side=INGEST_MAX_SIDE):
+    """
+    Path of the upload-ready version of image_path, built once per (content, settings). If recompressing
+    does not make an already small enough png/jpeg any smaller, the original bytes are kept.
+    """
+    source_size = os.path.getsize(image_path)
+    digest = hashlib.sha256(f"{file_sha256(image_path)}:{max_side}:{INGEST_JPEG_QUALITY}".encode("utf-8")).hexdigest()
+    for ext in MIME_TYPES:
+        cached = os.path.join(cache_dir, digest[:32] + ext)
+        if os.path.exists(cached):
+            os.utime(cached)
+            metrics.inc("ingest_cache_hits")
+            return cached
+
+    started = time.perf_counter()
+    with Image.open(image_path) as image:
+        source_format = image.format
+        resized = image.width > max_side or image.height > max_side
+        image.load()
+        if resized:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        data, ext = _encode(image)
+
+    if not resized and source_format in ("PNG", "JPEG") and source_size <= len(data):
+        with open(image_path, "rb") as f:
+            data = f.read()
+        ext = ".png" if source_format == "PNG" else ".jpg"
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, digest[:32] + ext)
+    part_path = f"{path}.{threading.get_ident()}.part"
+    with open(part_path, "wb") as f:
+        f.write(data)
+    os.replace(part_path, path)
+
+    metrics.observe("ingest_seconds", time.perf_counter() - started)
+    metrics.observe("ingest_bytes_saved", source_size - len(data))
+    print(f"Ingested {os.path.basename(image_path)}: {source_size / 1024:.0f} KB -> {len(data) / 1024:.0f} KB")
+    return path
+
+
+def sign(name, expires, secret=None):
+    secret = (secret or INGEST_URL_SECRET).encode("utf-8")
+    return hmac.new(secret, f"{name}:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify(name, expires, signature, secret=None):
+    """True if signature matches name and expires has not passed."""
+    if not (secret or INGEST_URL_SECRET) or not signature:
+        return False
+    try:
+        if int(expires) < time.time():
+            return False
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(sign(name, expires, secret), signature)
+
+
+def ingested_path(name, cache_dir=INGEST_CACHE_DIR):
+    """Cache file for a name from a signed link, or None if it is not a plain cached image name."""
+    stem, ext = os.path.splitext(name)
+    if ext not in MIME_TYPES or len(stem) != 32 or not all(c in "0123456789abcdef" for c in stem):
+        return None
+    path = os.path.join(cache_dir, name)
+    return path if os.path.exists(path) else None
+
+
+def image_reference(image_path, public_url=INGEST_PUBLIC_URL, cache_dir=INGEST_CACHE_DIR):
+    """The image_url value for meshy: a signed link when a public url and secret are configured, else a data uri."""
+    with span("image.ingest", source_bytes=os.path.getsize(image_path)) as ingest:
+        path = prepare_image(image_path, cache_dir)
+        name = os.path.basename(path)
+        ingest.set(upload_bytes=os.path.getsize(path), signed_link=bool(public_url and INGEST_URL_SECRET))
+        if public_url and INGEST_URL_SECRET:
+            expires = int(time.time()) + INGEST_URL_TTL_SECONDS
+            return f"{public_url}/ingest/{name}?" + urlencode({"expires": expires, "sig": sign(name, expires)})
+        with open(path, "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        return f"data:{MIME_TYPES[os.path.splitext(name)[1]]};base64,{encoded}"
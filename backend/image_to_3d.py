@@ -1,88 +1,72 @@
-import requests
-import time
-import base64
-from dotenv import load_dotenv
+from settings import settings
+from meshy_client import MESHY_BASE_URL, wait_for_task_sync
+from downloader import download_task_models
+from rate_limit import upstream_call
+from http_session import get_session
+from image_ingest import image_reference
+from tracing import response_sizes, span
 import os
 
-# Function to encode the image
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
 #create task to generate 3d model from text
 def create_draft_task(image_path, headers):
 
     payload = {
     #"mode": "preview",
-    "image_url": f'data:image/png;base64,{encode_image(image_path)}',
+    #resized and recompressed once per image; a signed link instead of a data uri when INGEST_PUBLIC_URL is set
+    "image_url": image_reference(image_path),
     #"enable_pbr": True,
     "enable_pbr": False,
     "should_remesh": True,
     "should_texture": True,
     }
 
-    response = requests.post(
-    "https://api.meshy.ai/openapi/v1/image-to-3d",
-    headers=headers,
-    json=payload,
-    )
+    with span("meshy.create", kind="image-to-3d", image_bytes=os.path.getsize(image_path)) as create:
+        response = upstream_call(
+        "meshy.create",
+        get_session().post,
+        f"{MESHY_BASE_URL}/openapi/v1/image-to-3d",
+        headers=headers,
+        json=payload,
+        )
+        create.set(status_code=response.status_code, **response_sizes(response))
 
-    if response.status_code != 200 and response.status_code != 202:
-        print("Error:", response.status_code, response.text)
-    response.raise_for_status()
-    task_id = response.json()["result"]
+        if response.status_code != 200 and response.status_code != 202:
+            print("Error:", response.status_code, response.text)
+        response.raise_for_status()
+        task_id = response.json()["result"]
+        create.set(task_id=task_id)
     print("Task created. Task ID:", task_id)
 
     return task_id
 
 #we get the id of the task returned from meshy ai
 #since this is an asynchronous task handled by meshy ai's servers, we need to continually request the status of the task
-def return_draft_task(task_id, headers):
-    task = None
+#polling is multiplexed with every other outstanding task on the shared meshy client's event loop
+def return_draft_task(task_id, headers, on_progress=None):
+    report = (lambda task: on_progress("remix_draft", task["progress"])) if on_progress else None
+    task = wait_for_task_sync("image-to-3d", task_id, headers, report, stage="remix_draft")
 
-    while True:
-        task_response = requests.get(
-            f"https://api.meshy.ai/openapi/v2/text-to-3d/{task_id}",
-            headers=headers,
-        )
-
-        if task_response.status_code != 200 and task_response.status_code != 202:
-            print("Error:", task_response.status_code, task_response.text)
-        task_response.raise_for_status()
-
-        task = task_response.json()
-
-        #if we break from this, the task has finished processing on the server
-        if task["status"] == "SUCCEEDED":
-            print("Task finished.")
-            break
-
-        if task["status"] == "FAILED" or task["status"] == "CANCELED" :
-            print("Task failed, please retry this operation.")
-            return
-
-        print("Task status:", task["status"], "| Progress:", task["progress"], "| Retrying in 5 seconds...")
-        time.sleep(5)
+    if task["status"] != "SUCCEEDED":
+        print("Task failed, please retry this operation.")
+        return
 
+    print("Task finished.")
     return task
 
-#download the 3d model in glb format
+#download the 3d model in glb format (plus any extra MESHY_MODEL_FORMATS), streamed straight to disk
 def download_draft__model(task, draft_filename):
-    model_url = task["model_urls"]["glb"]
-
-    model_response = requests.get(model_url)
-    model_response.raise_for_status()
-
-    with open(draft_filename, "wb") as f:
-        f.write(model_response.content)
+    download_task_models(task, draft_filename)
 
     print("Draft model downloaded.")
 
 
-def gen_3d_draft(image_path, draft_filename, headers):
+def gen_3d_draft(image_path, draft_filename, headers, on_progress=None):
     task_id = create_draft_task(image_path, headers)
 
-    task = return_draft_task(task_id, headers)
+    task = return_draft_task(task_id, headers, on_progress)
+
+    if task is None:
+        return
 
     download_draft__model(task, draft_filename)
 
@@ -161,21 +145,13 @@ def gen_3d_refined(task_id, refined_filename):
     download_refined_model(refined_task, refined_filename)
 '''
 
-def image_gen_3d(image_path, save_path):
+def image_gen_3d(image_path, save_path, on_progress=None):
 
     os.makedirs(save_path, exist_ok=True)
 
-    load_dotenv()
-
-    api_key = os.getenv("MESHY_API")
-
-    headers = {
-        "Authorization": f"Bearer {api_key}"
-    }
-
     draft_filepath = save_path + "/remixed_draft_model.glb"
     
-    gen_3d_draft(image_path, draft_filepath, headers)
+    gen_3d_draft(image_path, draft_filepath, settings.meshy_headers(), on_progress)
 
 if __name__ == "__main__":
     import argparse
@@ -191,10 +167,12 @@ if __name__ == "__main__":
 
     os.makedirs(save_path, exist_ok=True)
 
+    headers = settings.meshy_headers()
+
     draft_filepath = save_path + "/remixed_draft_model.glb"
 
     #FIRST PHASE: GENERATE 3D DRAFT
-    gen_3d_draft(image_path, draft_filepath)
+    gen_3d_draft(image_path, draft_filepath, headers)
     #task_id = gen_3d_draft(image_path, draft_filepath)
 
     #SECOND PHASE: GENERATE 3D REFINE
@@ -1,9 +1,10 @@
 import base64
 import os
 import glob
-from openai import OpenAI
-from IPython.display import display
-from dotenv import load_dotenv
+from image_encoding import REMIX_IMAGE_FORMAT, REMIX_IMAGE_QUALITY, encode_frames_base64
+from rate_limit import upstream_call
+from http_session import get_openai_client
+from tracing import span
 
 # Function to encode the image
 def encode_image(image_path):
@@ -17,32 +18,37 @@ def get_image_files(input_dir):
     image_paths.extend(glob.glob(os.path.join(input_dir, ext)))
    return image_paths
     
-def gen_image(client, text_prompt, encoded_images, save_dir):
+def gen_image(client, text_prompt, encoded_images, save_dir, mime_type="image/jpeg"):
   #we need to iteratively add the encoded images since we do not know how many there will be before runtime
   content = [{ "type": "input_text", "text": text_prompt }]
 
   for encoded_image in encoded_images:
      content.append({
         "type": "input_image",
-        "image_url": f"data:image/jpeg;base64,{encoded_image}",
+        "image_url": f"data:{mime_type};base64,{encoded_image}",
      })
 
-  response = client.responses.create(
-      model="gpt-5.1",
-      input=[
-          {
-              "role": "user",
-              "content": content,
-          }
-      ],
-      tools=[{"type": "image_generation"}],
-  )
-  # Save the image to a file
-  image_data = [
-      output.result
-      for output in response.output
-      if output.type == "image_generation_call"
-  ]
+  with span("openai.image", model="gpt-5.1", input_images=len(encoded_images),
+            request_bytes=sum(len(encoded_image) for encoded_image in encoded_images)) as generate:
+    response = upstream_call(
+        "openai.image",
+        client.responses.create,
+        model="gpt-5.1",
+        input=[
+            {
+                "role": "user",
+                "content": content,
+            }
+        ],
+        tools=[{"type": "image_generation"}],
+    )
+    # Save the image to a file
+    image_data = [
+        output.result
+        for output in response.output
+        if output.type == "image_generation_call"
+    ]
+    generate.set(response_bytes=sum(len(result or "") for result in image_data))
 
   if image_data:
     image_filename = save_dir
@@ -54,9 +60,7 @@ def gen_image(client, text_prompt, encoded_images, save_dir):
 
 def images_gen_image(text, image_dir, save_path):
     os.makedirs(save_path, exist_ok=True)
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(api_key=api_key)
+    client = get_openai_client()
 
     image_paths = get_image_files(image_dir)
     print(f"Found {len(image_paths)} images.")
@@ -67,6 +71,17 @@ def images_gen_image(text, image_dir, save_path):
        
     #generate image from text prompt and multiple images
     gen_image(client, text, encoded_images, save_path + "/remixed_image.png")
+
+#same as images_gen_image, but takes rendered frames straight from memory instead of re-reading pngs from disk
+def frames_gen_image(text, frames, save_path, image_format=REMIX_IMAGE_FORMAT, quality=REMIX_IMAGE_QUALITY):
+    os.makedirs(save_path, exist_ok=True)
+    client = get_openai_client()
+
+    mime_type, encoded_images = encode_frames_base64(frames, image_format, quality)
+    print(f"Encoded {len(encoded_images)} rendered views as {mime_type}.")
+
+    #generate image from text prompt and multiple images
+    gen_image(client, text, encoded_images, save_path + "/remixed_image.png", mime_type)
     
 
 if __name__ == "__main__":
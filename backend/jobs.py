@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tracing import span
+
+#generation jobs run on a bounded pool of worker threads so an HTTP request only has to enqueue work
+#and hand back a job id; clients then poll /jobs/<id> or stream /jobs/<id>/events for progress.
+#every change is also written to a SQLite file, so when several server processes share it (gunicorn
+#workers), whichever process a poll lands on can answer for a job another one is running
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+#jobs waiting for a worker beyond this are rejected instead of piling up unbounded
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "64"))
+#finished jobs are kept around this long so clients can still fetch their result
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.getcwd(), "cache", "jobs.sqlite"))
+#how often a stream following a job run by another process re-reads it
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+TERMINAL_STATUSES = ("success", "fail", "error")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.progress = 0
+        self.message = None
+        self.result = {}
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        #bumped on every change so streaming clients can wait for "something newer than what I saw"
+        self.version = 0
+
+    @property
+    def done(self):
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, max_queued=JOB_MAX_QUEUED, ttl=JOB_TTL_SECONDS, db_path=JOB_DB_PATH):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._max_workers = max_workers
+        self._max_queued = max_queued
+        self._ttl = ttl
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._draining = False
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, state TEXT, version INTEGER, done INTEGER,"
+            " updated_at REAL, pid INTEGER)"
+        )
+        self._db.commit()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs, on_progress=...) on the worker pool and return the Job.
+        fn reports progress through on_progress(stage, progress=None, **result_fields) and
+        returns a dict with "status" ("success"/"fail") and "message"; anything else it
+        returns is merged into the job result. Exceptions mark the job as "error".
+        """
+        job = Job(kind)
+        with self._cond:
+            if self._draining:
+                raise QueueFullError("The server is restarting, please retry in a moment.")
+            self._expire_locked()
+            pending = sum(1 for j in self._jobs.values() if not j.done)
+            if pending >= self._max_workers + self._max_queued:
+                raise QueueFullError("Too many generation jobs in progress, please retry later.")
+            self._jobs[job.id] = job
+            self._save_locked(job)
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        """(version, dict) of a job run by this or another process sharing the job database, or None."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.version, job.to_dict()
+            row = self._db.execute("SELECT version, state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def wait_for_update(self, job_id, seen_version, timeout=15):
+        """Block until the job changes past seen_version (or timeout); returns (version, dict) or None."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._jobs.get(job_id) is not None:
+                job = self._jobs[job_id]
+                if job.version != seen_version or job.done:
+                    return job.version, job.to_dict()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return job.version, job.to_dict()
+                self._cond.wait(remaining)
+
+        #run by another process: poll the shared database
+        while True:
+            snapshot = self.snapshot(job_id)
+            if snapshot is None or snapshot[0] != seen_version or snapshot[1]["status"] in TERMINAL_STATUSES:
+                return snapshot
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return snapshot
+            time.sleep(min(JOB_POLL_SECONDS, remaining))
+
+    def update(self, job_id, stage=None, progress=None, **result_fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if stage is not None and stage != job.stage:
+                job.stage = stage
+                job.progress = 0
+            if progress is not None:
+                job.progress = progress
+            if result_fields:
+                job.result.update(result_fields)
+            self._touch_locked(job)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def drain(self, timeout):
+        """
+        Stop accepting jobs and wait up to timeout seconds for queued and running ones to finish; jobs still
+        unfinished then are marked as errors. Returns how many were cut off.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            self._draining = True
+            while True:
+                pending = [job for job in self._jobs.values() if not job.done]
+                remaining = deadline - time.time()
+                if not pending or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            for job in pending:
+                job.status = "error"
+                job.message = "The server shut down before this job finished; please retry."
+                self._touch_locked(job)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return len(pending)
+
+    def _run(self, job, fn, args, kwargs):
+        #every stage the job runs becomes a child span of this one; the trace id is in the job result
+        with span(f"job.{job.kind}", job_id=job.id, queued_seconds=round(time.time() - job.created_at, 6)) as root:
+            with self._cond:
+                job.status = "running"
+                job.result["trace_id"] = root.trace_id
+                self._touch_locked(job)
+
+            def on_progress(stage, progress=None, **result_fields):
+                self.update(job.id, stage=stage, progress=progress, **result_fields)
+
+            try:
+                outcome = fn(*args, on_progress=on_progress, **kwargs) or {}
+                status = outcome.pop("status", "success")
+                message = outcome.pop("message", None)
+            except Exception as e:
+                print(f"{job.kind} job {job.id} error:", e)
+                status, message, outcome = "error", str(e), {}
+                root.error = message
+            root.set(status=status)
+
+        with self._cond:
+            job.status = status
+            job.message = message
+            job.result.update(outcome)
+            if status == "success":
+                job.progress = 100
+            self._touch_locked(job)
+
+    def _touch_locked(self, job):
+        job.updated_at = time.time()
+        job.version += 1
+        self._save_locked(job)
+        self._cond.notify_all()
+
+    def _save_locked(self, job):
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs (id, state, version, done, updated_at, pid) VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, json.dumps(job.to_dict()), job.version, int(job.done), job.updated_at, os.getpid()),
+        )
+        self._db.commit()
+
+    def _expire_locked(self):
+        cutoff = time.time() - self._ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self._db.execute("DELETE FROM jobs WHERE done = 1 AND updated_at < ?", (cutoff,))
+        self._db.commit()
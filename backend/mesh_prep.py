@@ -0,0 +1,149 @@
+import os
+import threading
+import numpy as np
+import pyvista as pv
+from collections import OrderedDict
+from result_cache import file_sha256
+
+#preprocessing that bounds render time regardless of how dense the source model is:
+#models are centered and scaled to fit the fixed camera distances the renderers use (3 to 5 units),
+#and decimated to a face budget for preview renders
+
+MESH_CACHE_DIR = os.getenv("MESH_CACHE_DIR", os.path.join(os.getcwd(), "cache", "meshes"))
+PREVIEW_FACE_BUDGET = int(os.getenv("PREVIEW_FACE_BUDGET", "50000"))
+#normalized models fit inside a sphere of this radius around the origin
+TARGET_RADIUS = float(os.getenv("PREVIEW_TARGET_RADIUS", "1.0"))
+#decimated actor geometry kept in memory for the pyvista renderer, keyed by source hash
+ACTOR_CACHE_SIZE = int(os.getenv("PREVIEW_ACTOR_CACHE_SIZE", "8"))
+
+
+def load_mesh(glb_path):
+    #trimesh is only needed by the trimesh-based renderer, not the pyvista one
+    import trimesh
+
+    #load 3d scene from the GLB file using trimesh
+    scene_or_mesh = trimesh.load(glb_path, force='scene')
+    #convert trimesh.Scene to a list of meshes (if it isnt a single mesh)
+    if isinstance(scene_or_mesh, trimesh.Scene):
+        #create a single merged mesh
+        return trimesh.util.concatenate(scene_or_mesh.dump())
+    return scene_or_mesh
+
+
+def normalize_mesh(mesh, radius=TARGET_RADIUS):
+    """Center the mesh's bounding box on the origin and scale it to fit a sphere of the given radius."""
+    mesh.apply_translation(-mesh.bounding_box.centroid)
+    extent = np.linalg.norm(mesh.vertices, axis=1).max() if len(mesh.vertices) else 0
+    if extent > 0:
+        mesh.apply_scale(radius / extent)
+    return mesh
+
+
+def decimate_polydata(poly, face_budget):
+    """Quadric decimation down to about face_budget triangles, keeping texture coordinates and normals."""
+    poly = poly.triangulate()
+    if face_budget <= 0 or poly.n_cells <= face_budget:
+        return poly
+    reduction = 1.0 - face_budget / poly.n_cells
+    return poly.decimate(reduction, tcoords=True, normals=True)
+
+
+def decimate_mesh(mesh, face_budget=PREVIEW_FACE_BUDGET):
+    if face_budget <= 0 or len(mesh.faces) <= face_budget:
+        return mesh
+    import trimesh
+
+    poly = decimate_polydata(pv.wrap(mesh), face_budget)
+    faces = poly.faces.reshape(-1, 4)[:, 1:]
+    return trimesh.Trimesh(vertices=np.asarray(poly.points), faces=faces, process=False)
+
+
+def prepare_mesh(glb_path, face_budget=PREVIEW_FACE_BUDGET, radius=TARGET_RADIUS, cache_dir=MESH_CACHE_DIR):
+    """
+    Load, normalize and decimate glb_path, reusing the simplified mesh cached for identical source bytes.
+    """
+    import trimesh
+
+    os.makedirs(cache_dir, exist_ok=True)
+    key = f"{file_sha256(glb_path)}_{face_budget}_{radius:g}"
+    cached_path = os.path.join(cache_dir, key + ".ply")
+    if os.path.exists(cached_path):
+        return trimesh.load(cached_path, force='mesh', process=False)
+
+    mesh = load_mesh(glb_path)
+    faces_before = len(mesh.faces)
+    mesh = decimate_mesh(normalize_mesh(mesh, radius), face_budget)
+    print(f"Prepared mesh: {faces_before} -> {len(mesh.faces)} faces")
+
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    mesh.export(tmp_path, file_type="ply")
+    os.replace(tmp_path, cached_path)
+    return mesh
+
+
+def _actors(renderer):
+    props = renderer.GetViewProps()
+    props.InitTraversal()
+    actors = []
+    for _ in range(props.GetNumberOfItems()):
+        prop = props.GetNextProp()
+        if prop.IsA("vtkActor") and prop.GetMapper() is not None:
+            actors.append(prop)
+    return actors
+
+
+_actor_cache = OrderedDict()
+_actor_cache_lock = threading.Lock()
+
+
+def decimate_actors(renderer, source_key, face_budget=PREVIEW_FACE_BUDGET):
+    """
+    Decimate the geometry of every actor in the renderer so their total stays within face_budget,
+    keeping each actor's material and textures. Results are cached by source_key (the file hash).
+    """
+    actors = _actors(renderer)
+    with _actor_cache_lock:
+        cached = _actor_cache.get((source_key, face_budget))
+        if cached is not None:
+            _actor_cache.move_to_end((source_key, face_budget))
+
+    if cached is None:
+        inputs = [pv.wrap(actor.GetMapper().GetInput()) for actor in actors]
+        total = sum(poly.n_cells for poly in inputs)
+        if face_budget <= 0 or total <= face_budget:
+            cached = [None] * len(actors)
+        else:
+            #each actor keeps its share of the budget
+            cached = [decimate_polydata(poly, max(1, int(face_budget * poly.n_cells / total))) for poly in inputs]
+            print(f"Decimated preview: {total} -> {sum(poly.n_cells for poly in cached)} faces")
+        with _actor_cache_lock:
+            _actor_cache[(source_key, face_budget)] = cached
+            while len(_actor_cache) > ACTOR_CACHE_SIZE:
+                _actor_cache.popitem(last=False)
+
+    if len(cached) != len(actors):
+        return
+    for actor, poly in zip(actors, cached):
+        if poly is not None:
+            actor.GetMapper().SetInputData(poly)
+
+
+def fit_actors(renderer, radius=TARGET_RADIUS):
+    """Center and scale every actor together so the whole model fits a sphere of the given radius."""
+    xmin, xmax, ymin, ymax, zmin, zmax = renderer.ComputeVisiblePropBounds()
+    if xmin > xmax:
+        return
+    center = np.array([(xmin + xmax) / 2, (ymin + ymax) / 2, (zmin + zmax) / 2])
+    half_diagonal = np.linalg.norm([xmax - xmin, ymax - ymin, zmax - zmin]) / 2
+    if half_diagonal <= 0:
+        return
+    scale = radius / half_diagonal
+    #S * T(-center), in world coordinates
+    fit = np.diag([scale, scale, scale, 1.0])
+    fit[:3, 3] = -center * scale
+    for actor in _actors(renderer):
+        #vtk applies the actor's user matrix (the glTF node transform) after its own scale and position,
+        #so the fit has to go in front of that matrix rather than into SetScale/SetPosition
+        user = actor.GetUserMatrix()
+        matrix = fit if user is None else fit @ pv.array_from_vtkmatrix(user)
+        actor.SetUserMatrix(pv.vtkmatrix_from_array(matrix))
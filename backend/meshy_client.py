@@ -0,0 +1,227 @@
+import os
+import atexit
+import asyncio
+import threading
+import metrics
+from tracing import span
+from polling import PollingPolicy, parse_retry_after
+from http_session import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+#point this at a local stand-in server to exercise the pipeline without paying for real generations
+MESHY_BASE_URL = os.getenv("MESHY_BASE_URL", "https://api.meshy.ai")
+#upper bound on simultaneous sockets to meshy, shared by every create/poll/download
+MESHY_MAX_CONNECTIONS = int(os.getenv("MESHY_MAX_CONNECTIONS", "20"))
+
+TASK_PATHS = {
+    "text-to-3d": "/openapi/v2/text-to-3d",
+    "image-to-3d": "/openapi/v1/image-to-3d",
+}
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "CANCELED", "EXPIRED")
+
+
+class _PendingTask:
+    def __init__(self, kind, task_id, headers, future, policy, next_poll):
+        self.kind = kind
+        self.task_id = task_id
+        self.headers = headers
+        self.future = future
+        self.policy = policy
+        self.next_poll = next_poll
+        self.progress_callbacks = []
+
+
+class MeshyClient:
+    """
+    asyncio client for the meshy task API.
+
+    Every outstanding task registered through wait_for_task is polled by one scheduler coroutine
+    over one pooled aiohttp session, so the number of in-flight tasks does not cost threads or sockets.
+    When each task is next polled is decided by its PollingPolicy.
+    """
+
+    def __init__(self, base_url=MESHY_BASE_URL, max_connections=MESHY_MAX_CONNECTIONS, policy_factory=PollingPolicy):
+        self.base_url = base_url.rstrip("/")
+        self.policy_factory = policy_factory
+        self.max_connections = max_connections
+        self._session = None
+        self._pending = {}
+        self._wakeup = None
+        self._scheduler = None
+
+    def _task_url(self, kind, task_id=None):
+        url = self.base_url + TASK_PATHS[kind]
+        return url if task_id is None else f"{url}/{task_id}"
+
+    async def _get_session(self):
+        #aiohttp is imported on first use, so importing the generation modules stays cheap at startup
+        import aiohttp
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            #no total timeout, since downloads can be long; stalled connects and reads still fail
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def _request_json(self, method, url, headers, payload=None):
+        session = await self._get_session()
+        async with session.request(method, url, headers=headers, json=payload) as response:
+            if response.status != 200 and response.status != 202:
+                print("Error:", response.status, await response.text())
+            response.raise_for_status()
+            return await response.json()
+
+    async def create_task(self, kind, payload, headers):
+        result = await self._request_json("POST", self._task_url(kind), headers, payload)
+        task_id = result["result"]
+        print("Task created. Task ID:", task_id)
+        return task_id
+
+    async def get_task(self, kind, task_id, headers):
+        return await self._request_json("GET", self._task_url(kind, task_id), headers)
+
+    async def wait_for_task(self, kind, task_id, headers, on_progress=None, stage=None):
+        """
+        Wait until the task reaches a terminal status and return the final task object.
+        on_progress(task) is called after every non-terminal poll. stage labels the task's
+        polling metrics and completion-rate history (defaults to kind).
+        """
+        loop = asyncio.get_running_loop()
+        key = (kind, task_id)
+        entry = self._pending.get(key)
+        if entry is None:
+            now = loop.time()
+            policy = self.policy_factory(stage or kind, started_at=now)
+            entry = _PendingTask(kind, task_id, headers, loop.create_future(), policy, now)
+            self._pending[key] = entry
+        if on_progress:
+            entry.progress_callbacks.append(on_progress)
+
+        self._ensure_scheduler()
+        return await asyncio.shield(entry.future)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _ensure_scheduler(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.ensure_future(self._run_scheduler())
+
+    async def _run_scheduler(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wakeup.clear()
+            now = loop.time()
+            due = [entry for entry in self._pending.values() if entry.next_poll <= now]
+            if due:
+                await asyncio.gather(*(self._poll(entry) for entry in due))
+
+            if not self._pending:
+                break
+            delay = min(entry.next_poll for entry in self._pending.values()) - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _poll(self, entry):
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        key = (entry.kind, entry.task_id)
+        stage = entry.policy.stage
+        metrics.inc("meshy_polls_total", stage=stage)
+        try:
+            task = await self.get_task(entry.kind, entry.task_id, entry.headers)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                self._rate_limited(loop.time(), e.headers)
+                return
+            self._fail(key, entry, e)
+            return
+        except Exception as e:
+            self._fail(key, entry, e)
+            return
+
+        now = loop.time()
+        if task["status"] in TERMINAL_STATUSES:
+            self._pending.pop(key, None)
+            saved = entry.policy.finish(now)
+            metrics.observe("meshy_poll_latency_saved_seconds", saved, stage=stage)
+            metrics.observe("meshy_polls_per_task", entry.policy.polls + 1, stage=stage)
+            if not entry.future.done():
+                entry.future.set_result(task)
+            return
+
+        entry.policy.record(now, task.get("progress"))
+        delay = entry.policy.next_delay(now)
+        entry.next_poll = now + delay
+        print("Task", entry.task_id, "status:", task["status"], "| Progress:", task.get("progress"), f"| Next poll in {delay:.1f} seconds...")
+        for callback in entry.progress_callbacks:
+            try:
+                callback(task)
+            except Exception as e:
+                print("Progress callback error:", e)
+
+    def _fail(self, key, entry, error):
+        self._pending.pop(key, None)
+        if not entry.future.done():
+            entry.future.set_exception(error)
+
+    def _rate_limited(self, now, headers):
+        #the limit applies to the api key, so back every outstanding task off, not just the one that hit it
+        retry_after = parse_retry_after(headers.get("Retry-After") if headers else None)
+        if retry_after is None:
+            retry_after = max(entry.policy.fixed_interval for entry in self._pending.values())
+        print(f"Rate limited by meshy, backing off {retry_after:.1f} seconds...")
+        metrics.inc("meshy_rate_limited_total")
+        for entry in self._pending.values():
+            #Retry-After: 0 (or a date in the past) must still back off, or every task is re-polled at once
+            delay = max(retry_after, entry.policy.min_interval)
+            entry.policy.defer(now, delay)
+            entry.next_poll = max(entry.next_poll, now + delay)
+
+
+#synchronous callers (flask routes, job workers, CLIs) share one client running on a background event loop
+_loop = None
+_client = None
+_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="meshy-client", daemon=True).start()
+        return _loop
+
+
+def get_client():
+    global _client
+    _get_loop()
+    with _lock:
+        if _client is None:
+            _client = MeshyClient()
+        return _client
+
+
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def wait_for_task_sync(kind, task_id, headers, on_progress=None, stage=None):
+    with span("meshy.poll", kind=kind, task_id=task_id, stage=stage) as poll:
+        task = run_sync(get_client().wait_for_task(kind, task_id, headers, on_progress, stage))
+        poll.set(status=task["status"])
+        return task
+
+
+@atexit.register
+def _close_client():
+    if _client is not None and _loop is not None and _loop.is_running():
+        asyncio.run_coroutine_threadsafe(_client.close(), _loop).result(timeout=5)
@@ -0,0 +1,111 @@
+import threading
+
+#process-wide counters, summaries and gauges; labels are passed as keyword arguments, e.g. observe("x", 1.2, stage="draft")
+#observations of names ending in _seconds are also bucketed into a latency histogram
+_lock = threading.Lock()
+_counters = {}
+_summaries = {}
+_gauges = {}
+
+#upper bounds in seconds; pipeline stages range from milliseconds (cache hits) to many minutes (refines)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            summary = _summaries[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            if name.endswith("_seconds"):
+                summary["buckets"] = [0] * len(LATENCY_BUCKETS)
+        else:
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+        buckets = summary.get("buckets")
+        if buckets is not None:
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+                    break
+
+
+def gauge(name, value, **labels):
+    """Set a value that goes up and down, e.g. a queue depth."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def snapshot():
+    """Return {"counters": [...], "summaries": [...], "gauges": [...]} with one entry per (name, labels) pair."""
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in _counters.items()
+        ]
+        summaries = [
+            {"name": name, "labels": dict(labels), **summary, "mean": summary["sum"] / summary["count"]}
+            for (name, labels), summary in _summaries.items()
+        ]
+        for summary in summaries:
+            if "buckets" in summary:
+                summary["buckets"] = list(summary["buckets"])
+        gauges = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in _gauges.items()
+        ]
+    return {"counters": counters, "summaries": summaries, "gauges": gauges}
+
+
+def _labels(labels, **extra):
+    pairs = list(labels.items()) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def prometheus():
+    """All metrics in the Prometheus text exposition format; _seconds summaries are histograms."""
+    data = snapshot()
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for counter in sorted(data["counters"], key=lambda c: c["name"]):
+        header(counter["name"], "counter")
+        lines.append(f"{counter['name']}{_labels(counter['labels'])} {counter['value']}")
+    for level in sorted(data["gauges"], key=lambda g: g["name"]):
+        header(level["name"], "gauge")
+        lines.append(f"{level['name']}{_labels(level['labels'])} {level['value']}")
+    for summary in sorted(data["summaries"], key=lambda s: s["name"]):
+        name, labels = summary["name"], summary["labels"]
+        if "buckets" in summary:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, summary["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {summary['count']}")
+        else:
+            header(name, "summary")
+        lines.append(f"{name}_sum{_labels(labels)} {summary['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {summary['count']}")
+    return "\n".join(lines) + "\n"
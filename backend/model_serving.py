@@ -0,0 +1,121 @@
+import os
+import gzip
+import mimetypes
+import shutil
+import threading
+from flask import request, send_file
+from result_cache import file_sha256
+
+#conditional, range and precompressed serving for model files:
+#strong ETags come from the content hash (computed once per file version, keyed by mtime and size),
+#If-None-Match and Range are answered by send_file, and .gz/.br siblings are sent when the client accepts them.
+#URLs carrying ?v=<content hash> are content addressed and cached by browsers for a year.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+#unversioned URLs always revalidate, which costs a 304 instead of the whole file
+REVALIDATE_CACHE_CONTROL = "no-cache"
+#below this size compression is not worth a second file
+PRECOMPRESS_MIN_BYTES = int(os.getenv("PRECOMPRESS_MIN_BYTES", "1024"))
+ETAG_CACHE_SIZE = int(os.getenv("ETAG_CACHE_SIZE", "1024"))
+
+#content encoding -> file suffix, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"} if brotli is not None else {"gzip": ".gz"}
+
+_etags = {}
+_etags_lock = threading.Lock()
+
+
+def content_hash(path, stat=None):
+    """sha256 of path, recomputed only when its mtime or size changes."""
+    stat = stat or os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _etags_lock:
+        cached = _etags.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    digest = file_sha256(path)
+    with _etags_lock:
+        if len(_etags) >= ETAG_CACHE_SIZE:
+            _etags.clear()
+        _etags[path] = (version, digest)
+    return digest
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress(path):
+    """Write compressed siblings (path.gz, path.br) next to path; skipped when they would not be smaller."""
+    if os.path.getsize(path) < PRECOMPRESS_MIN_BYTES:
+        return {}
+    with open(path, "rb") as f:
+        data = f.read()
+
+    written = {}
+    for encoding, suffix in ENCODINGS.items():
+        compressed = _compress(data, encoding)
+        out_path = path + suffix
+        if len(compressed) >= len(data):
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            continue
+        tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        shutil.copystat(path, tmp_path)
+        os.replace(tmp_path, out_path)
+        written[encoding] = len(compressed)
+    if written:
+        print(f"Precompressed {path}: {len(data)} -> {written}")
+    return written
+
+
+def _accepted_encodings():
+    accepted = request.accept_encodings
+    return [encoding for encoding in ENCODINGS if accepted[encoding] > 0]
+
+
+def _precompressed(path, stat):
+    """The best fresh compressed sibling of path the client accepts, as (encoding, path), or (None, path)."""
+    # byte ranges are defined on the identity bytes, so ranged requests always get the original
+    if request.range is not None:
+        return None, path
+    for encoding in _accepted_encodings():
+        candidate = path + ENCODINGS[encoding]
+        try:
+            if os.stat(candidate).st_mtime_ns >= stat.st_mtime_ns:
+                return encoding, candidate
+        except OSError:
+            continue
+    return None, path
+
+
+def send_model(path, mimetype=None, immutable=False):
+    """
+    send_file with a strong content ETag, Range support and precompressed variants.
+    immutable marks a content-addressed URL, which browsers may then cache forever.
+    Raises FileNotFoundError if path does not exist.
+    """
+    stat = os.stat(path)
+    digest = content_hash(path, stat)
+    encoding, send_path = _precompressed(path, stat)
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    # each representation needs its own strong ETag
+    etag = digest if encoding is None else f"{digest}-{encoding}"
+    response = send_file(send_path, mimetype=mimetype, etag=etag, conditional=True)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Accept-Ranges"] = "bytes"
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response
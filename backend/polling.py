@@ -0,0 +1,122 @@
+import os
+import math
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+#the interval the pipeline used to poll at; kept as the baseline the adaptive policy is measured against
+FIXED_POLL_INTERVAL = float(os.getenv("MESHY_POLL_INTERVAL", "5"))
+MIN_POLL_INTERVAL = float(os.getenv("MESHY_MIN_POLL_INTERVAL", "0.5"))
+MAX_POLL_INTERVAL = float(os.getenv("MESHY_MAX_POLL_INTERVAL", "20"))
+POLL_JITTER = float(os.getenv("MESHY_POLL_JITTER", "0.2"))
+
+#completion rate (progress points per second) of recently finished tasks, per stage;
+#used to guess an ETA for a task that has not reported any progress yet
+_rate_history = {}
+_rate_lock = threading.Lock()
+_RATE_SMOOTHING = 0.3
+
+
+def record_completion_rate(stage, duration):
+    if duration <= 0:
+        return
+    rate = 100.0 / duration
+    with _rate_lock:
+        previous = _rate_history.get(stage)
+        _rate_history[stage] = rate if previous is None else previous + _RATE_SMOOTHING * (rate - previous)
+
+
+def historical_rate(stage):
+    with _rate_lock:
+        return _rate_history.get(stage)
+
+
+def parse_retry_after(value, now=None):
+    """Retry-After is either a number of seconds or an HTTP date; returns seconds to wait or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class PollingPolicy:
+    """
+    Decides how long to wait before the next status poll of one meshy task.
+
+    The completion rate is estimated from the task's own (time, progress) samples, or from recently
+    finished tasks of the same stage before the task reports any progress. The next poll is scheduled
+    about halfway to the predicted finish, so polls are sparse early on and converge on the finish time,
+    clamped to [min_interval, max_interval] with multiplicative jitter. Rate-limit responses push the
+    next poll out to at least the server's Retry-After.
+    """
+
+    def __init__(self, stage, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL,
+                 jitter=POLL_JITTER, fixed_interval=FIXED_POLL_INTERVAL, history=8, started_at=None, rng=None):
+        self.stage = stage
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.fixed_interval = fixed_interval
+        self.samples = deque(maxlen=history)
+        self.not_before = 0.0
+        self.started_at = started_at
+        self.last_pending_at = None
+        self.polls = 0
+        self._rng = rng or random.Random()
+
+    def record(self, now, progress):
+        if self.started_at is None:
+            self.started_at = now
+        self.last_pending_at = now
+        self.polls += 1
+        self.samples.append((now, float(progress or 0)))
+
+    def rate(self):
+        if len(self.samples) >= 2:
+            (t0, p0), (t1, p1) = self.samples[0], self.samples[-1]
+            if t1 > t0 and p1 > p0:
+                return (p1 - p0) / (t1 - t0)
+        return historical_rate(self.stage)
+
+    def eta(self, now):
+        """Predicted seconds until the task reaches 100%, or None without any rate estimate."""
+        rate = self.rate()
+        if not rate or not self.samples:
+            return None
+        t_last, p_last = self.samples[-1]
+        return max(0.0, (100.0 - p_last) / rate - (now - t_last))
+
+    def next_delay(self, now):
+        eta = self.eta(now)
+        delay = self.fixed_interval if eta is None else eta / 2
+        delay = min(self.max_interval, max(self.min_interval, delay))
+        if self.jitter:
+            delay *= self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(delay, self.not_before - now)
+
+    def defer(self, now, seconds):
+        self.not_before = max(self.not_before, now + seconds)
+
+    def finish(self, now):
+        """
+        Call when a terminal status is observed. Returns the estimated seconds of latency saved
+        versus polling every fixed_interval from the task's first poll (negative if it was slower).
+        """
+        if self.started_at is None:
+            return 0.0
+        last_pending = self.last_pending_at if self.last_pending_at is not None else self.started_at
+        #the task finished somewhere between the last pending poll and this one; take the midpoint
+        completed = (last_pending + now) / 2 - self.started_at
+        fixed_detected = math.ceil(completed / self.fixed_interval) * self.fixed_interval
+        record_completion_rate(self.stage, now - self.started_at)
+        return fixed_detected - (now - self.started_at)
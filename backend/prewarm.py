@@ -0,0 +1,57 @@
+import time
+import threading
+import importlib
+import metrics
+import render_service
+from settings import settings
+
+#the app starts without its heavy dependencies (pyvista/vtk, the openai sdk, aiohttp); they load on first
+#use. prewarming loads them on a background thread right after startup instead, and also opens the
+#renderer's GL context and the shared openai client, so the first real request usually finds them ready.
+#a request that arrives mid-prewarm just waits on the same import lock rather than importing twice.
+#with a render service configured, this process never renders, so pyvista is left out.
+
+PREWARM_MODULES = ("openai", "aiohttp")
+
+_started = threading.Event()
+_done = threading.Event()
+
+
+def prewarm():
+    started = time.perf_counter()
+    for name in PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Prewarm: importing {name} failed:", e)
+
+    from http_session import get_openai_client
+    try:
+        get_openai_client()
+    except Exception as e:
+        #e.g. no OPENAI_API_KEY yet; the first transcription will report it
+        print("Prewarm: creating the OpenAI client failed:", e)
+
+    if not render_service.enabled():
+        try:
+            from vista_3d_to_images import warm_up
+            warm_up()
+        except Exception as e:
+            print("Prewarm: warming up the renderer failed:", e)
+
+    seconds = time.perf_counter() - started
+    metrics.observe("prewarm_seconds", seconds)
+    print(f"Prewarmed in {seconds:.2f}s")
+    _done.set()
+
+
+def start():
+    """Start prewarming in the background, once per process (no-op when settings.prewarm is off)."""
+    if not settings.prewarm or _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+
+
+def ready():
+    return _done.is_set()
@@ -0,0 +1,288 @@
+import os
+import time
+import heapq
+import fcntl
+import itertools
+import threading
+from contextlib import contextmanager
+import metrics
+import tracing
+from polling import parse_retry_after
+
+#one governor per upstream endpoint: a token bucket caps the request rate, a slot count caps requests
+#in flight, and callers queue in priority order (interactive requests overtake batch work).
+#with RATE_LIMIT_STATE_DIR set, buckets and slots live in lock files there, so every process on the
+#host (gunicorn workers, batch runs) shares the same budget; otherwise limits are per process.
+#a 429 from upstream empties the bucket for Retry-After and the call is retried.
+
+RATE_LIMIT_STATE_DIR = os.getenv("RATE_LIMIT_STATE_DIR")
+#longest a caller queues before giving up with UpstreamBusyError
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "300"))
+#how many times a rate-limited (429) call is retried
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+#seconds to back off on a 429 without a Retry-After header
+RATE_LIMIT_DEFAULT_BACKOFF = float(os.getenv("RATE_LIMIT_DEFAULT_BACKOFF", "5"))
+
+#lower value is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+#endpoint -> "requests per second, burst, concurrent requests"; override with RATE_LIMIT_<ENDPOINT>,
+#e.g. RATE_LIMIT_MESHY_CREATE="1,5,4"
+DEFAULT_LIMITS = {
+    "meshy.create": "2,10,8",
+    "openai.image": "1,5,4",
+    "openai.transcribe": "5,10,8",
+}
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a call could not get through the limiter within RATE_LIMIT_MAX_WAIT."""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"{endpoint} is busy; retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def parse_limit(value):
+    rate, burst, concurrency = (float(part) for part in value.split(","))
+    return rate, max(1.0, burst), max(1, int(concurrency))
+
+
+_local = threading.local()
+
+
+def current_priority():
+    return getattr(_local, "priority", "interactive")
+
+
+@contextmanager
+def priority(name):
+    """Run the block's upstream calls at the given priority class."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}; use one of {list(PRIORITIES)}")
+    previous = current_priority()
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class _LocalState:
+    """Bucket and slots kept in this process."""
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate, self.burst, self.concurrency = rate, burst, concurrency
+        self.tokens, self.updated, self.not_before = burst, time.monotonic(), 0.0
+        self.active = 0
+
+    def take_token(self):
+        """0 if a token was taken, else seconds until one is available."""
+        now = time.monotonic()
+        if now < self.not_before:
+            return self.not_before - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def take_slot(self):
+        if self.active >= self.concurrency:
+            return None
+        self.active += 1
+        return True
+
+    def release_slot(self, slot):
+        self.active -= 1
+
+    def back_off(self, seconds):
+        self.tokens = 0
+        self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+
+class _SharedState:
+    """
+    Bucket and slots shared by every process using the same state directory. The bucket is a small file
+    updated under flock; each slot is a lock file held for the duration of a call, so a crashed process
+    releases its slots automatically.
+    """
+
+    def __init__(self, name, rate, burst, concurrency, state_dir):
+        self.rate, self.burst, self.concurrency = rate, burst, concurrency
+        os.makedirs(state_dir, exist_ok=True)
+        self.bucket_path = os.path.join(state_dir, f"{name}.bucket")
+        self.slot_paths = [os.path.join(state_dir, f"{name}.slot{i}") for i in range(concurrency)]
+
+    def _update_bucket(self, update):
+        fd = os.open(self.bucket_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 64, 0).decode("ascii").split()
+            #wall clock, since monotonic clocks are not comparable across processes
+            now = time.time()
+            tokens, updated, not_before = (float(v) for v in raw) if len(raw) == 3 else (self.burst, now, 0.0)
+            result, tokens, updated, not_before = update(now, tokens, updated, not_before)
+            data = f"{tokens:.6f} {updated:.6f} {not_before:.6f}".encode("ascii")
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, data, 0)
+            return result
+        finally:
+            os.close(fd)
+
+    def take_token(self):
+        def update(now, tokens, updated, not_before):
+            if now < not_before:
+                return not_before - now, tokens, updated, not_before
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            if tokens >= 1:
+                return 0.0, tokens - 1, now, not_before
+            wait = (1 - tokens) / self.rate if self.rate > 0 else 1.0
+            return wait, tokens, now, not_before
+        return self._update_bucket(update)
+
+    def take_slot(self):
+        for path in self.slot_paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release_slot(self, fd):
+        os.close(fd)
+
+    def back_off(self, seconds):
+        def update(now, tokens, updated, not_before):
+            return None, 0.0, now, max(not_before, now + seconds)
+        self._update_bucket(update)
+
+
+class Limiter:
+    """
+    Admission control for one upstream endpoint. Waiters queue by (priority, arrival); only the head of
+    the queue may take a token and a slot, so lower priority work never starves interactive requests.
+    """
+
+    def __init__(self, name, rate, burst, concurrency, state_dir=RATE_LIMIT_STATE_DIR):
+        self.name = name
+        if state_dir:
+            self._state = _SharedState(name, rate, burst, concurrency, state_dir)
+        else:
+            self._state = _LocalState(rate, burst, concurrency)
+        #other processes cannot wake us, so shared limiters re-check at least this often
+        self._recheck = 0.05 if state_dir else None
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def _report_depth(self):
+        metrics.gauge("upstream_queue_depth", len(self._waiting), endpoint=self.name)
+
+    def _acquire(self, priority_class, max_wait):
+        ticket = (PRIORITIES[priority_class], next(self._seq))
+        started = time.monotonic()
+        deadline = started + max_wait
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._report_depth()
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.inc("upstream_rejected", endpoint=self.name, priority=priority_class)
+                        raise UpstreamBusyError(self.name, RATE_LIMIT_DEFAULT_BACKOFF)
+                    wait = remaining
+                    if self._waiting[0] == ticket:
+                        slot = self._state.take_slot()
+                        if slot is not None:
+                            token_wait = self._state.take_token()
+                            if token_wait == 0:
+                                break
+                            self._state.release_slot(slot)
+                            wait = min(wait, token_wait)
+                    if self._recheck is not None:
+                        wait = min(wait, self._recheck)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._report_depth()
+                self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        metrics.observe("upstream_wait_seconds", waited, endpoint=self.name, priority=priority_class)
+        tracing.add("upstream_wait_seconds", round(waited, 6))
+        return slot
+
+    def _release(self, slot):
+        with self._cond:
+            self._state.release_slot(slot)
+            self._cond.notify_all()
+
+    @contextmanager
+    def acquire(self, priority_class=None, max_wait=RATE_LIMIT_MAX_WAIT):
+        slot = self._acquire(priority_class or current_priority(), max_wait)
+        try:
+            yield
+        finally:
+            self._release(slot)
+
+    def back_off(self, seconds):
+        with self._cond:
+            self._state.back_off(seconds)
+        metrics.inc("upstream_rate_limited", endpoint=self.name)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(endpoint):
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            env_name = "RATE_LIMIT_" + endpoint.upper().replace(".", "_").replace("-", "_")
+            rate, burst, concurrency = parse_limit(os.getenv(env_name) or DEFAULT_LIMITS[endpoint])
+            limiter = _limiters[endpoint] = Limiter(endpoint, rate, burst, concurrency)
+        return limiter
+
+
+def _rate_limit_delay(outcome):
+    """Seconds to back off if outcome (a response or an exception) is a 429, else None."""
+    response = getattr(outcome, "response", outcome)
+    if getattr(response, "status_code", None) != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+    return RATE_LIMIT_DEFAULT_BACKOFF if retry_after is None else retry_after
+
+
+def upstream_call(endpoint, fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) once admitted by the endpoint's limiter; 429 responses or errors back the limiter
+    off for Retry-After and are retried up to RATE_LIMIT_RETRIES times, then raise UpstreamBusyError.
+    """
+    limiter = get_limiter(endpoint)
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        with limiter.acquire():
+            try:
+                result = fn(*args, **kwargs)
+                error = None
+            except Exception as e:
+                result, error = None, e
+        delay = _rate_limit_delay(error if error is not None else result)
+        if delay is None:
+            if error is not None:
+                raise error
+            return result
+        if attempt == RATE_LIMIT_RETRIES:
+            limiter.back_off(delay)
+            raise UpstreamBusyError(endpoint, delay)
+        print(f"{endpoint} rate limited; backing off {delay:.1f}s (attempt {attempt + 1})")
+        tracing.add("rate_limited", 1)
+        limiter.back_off(delay)
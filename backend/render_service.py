@@ -0,0 +1,154 @@
+import os
+import time
+import signal
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import Client, Listener
+from tracing import span
+
+#in production the http workers do not render themselves: renders go to a render service, a separate
+#process holding RENDER_WORKERS single-process pools, each with its own warm offscreen GL context. requests
+#for the same model go to the same render worker (so its decimated-actor cache and mesh cache stay warm)
+#unless that worker is backed up and another is idle. without RENDER_SERVICE_ADDRESS, or when the service
+#cannot be reached, rendering happens in-process as before.
+
+#unix socket path, or host:port
+RENDER_SERVICE_ADDRESS = os.getenv("RENDER_SERVICE_ADDRESS")
+RENDER_SERVICE_AUTHKEY = os.getenv("RENDER_SERVICE_AUTHKEY", "render").encode()
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+#a model's own render worker is skipped when it has this many more renders queued than the least busy one
+RENDER_AFFINITY_SLACK = int(os.getenv("RENDER_AFFINITY_SLACK", "1"))
+
+
+def _address(address):
+    host, sep, port = address.rpartition(":")
+    return (host, int(port)) if sep and port.isdigit() else address
+
+
+def enabled():
+    return bool(RENDER_SERVICE_ADDRESS)
+
+
+def render_frames(glb_path, model_info=None):
+    """{view_name: frame} for glb_path, from the render service if one is configured, else rendered here."""
+    if RENDER_SERVICE_ADDRESS:
+        try:
+            with span("render.remote", model_bytes=os.path.getsize(glb_path)) as remote:
+                with Client(_address(RENDER_SERVICE_ADDRESS), authkey=RENDER_SERVICE_AUTHKEY) as conn:
+                    conn.send((os.path.abspath(glb_path), model_info))
+                    status, payload, info = conn.recv()
+                remote.set(**info)
+            if status != "ok":
+                raise RuntimeError(payload)
+            return payload
+        except (OSError, EOFError) as e:
+            print("Render service unavailable, rendering in-process:", e)
+
+    # pyvista/vtk load on first use (or in the prewarm thread), not at startup
+    from vista_3d_to_images import render_frames_with_pyvista
+    return render_frames_with_pyvista(glb_path, model_info=model_info)
+
+
+def _init_worker():
+    import vista_3d_to_images
+    vista_3d_to_images.warm_up()
+
+
+def _render(glb_path, model_info, queued):
+    from vista_3d_to_images import render_frames_with_pyvista
+    started = time.perf_counter()
+    frames = render_frames_with_pyvista(glb_path, model_info=model_info)
+    return frames, {"queue_wait_seconds": round(started - queued, 6), "worker_pid": os.getpid(),
+                    "render_seconds": round(time.perf_counter() - started, 6)}
+
+
+class RenderService:
+    def __init__(self, address, workers=RENDER_WORKERS, authkey=RENDER_SERVICE_AUTHKEY):
+        self.address = _address(address)
+        self.authkey = authkey
+        #spawn, not fork: a GL context (or half-initialised vtk state) must never be inherited
+        context = multiprocessing.get_context("spawn")
+        self.pools = [ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker)
+                      for _ in range(workers)]
+        self.pending = [0] * workers
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.listener = Listener(self.address, authkey=authkey)
+
+    def _pick(self, key):
+        """Index of the render worker for key: its own, unless that one is backed up and another is idle."""
+        preferred = int(hashlib.sha256(key.encode()).hexdigest(), 16) % len(self.pools)
+        with self._lock:
+            least = min(range(len(self.pools)), key=self.pending.__getitem__)
+            index = preferred if self.pending[preferred] - self.pending[least] < RENDER_AFFINITY_SLACK else least
+            self.pending[index] += 1
+        return index
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                glb_path, model_info = conn.recv()
+            except EOFError:
+                return
+            index = self._pick((model_info or {}).get("sha256") or glb_path)
+            try:
+                frames, info = self.pools[index].submit(_render, glb_path, model_info, time.perf_counter()).result()
+                conn.send(("ok", frames, {**info, "render_worker": index}))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}", {"render_worker": index}))
+            finally:
+                with self._lock:
+                    self.pending[index] -= 1
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            if self._stopping.is_set():
+                conn.close()
+                break
+            #not daemon threads: a render in progress at shutdown still gets its answer sent
+            threading.Thread(target=self._handle, args=(conn,)).start()
+        self.listener.close()
+
+    def stop(self):
+        """Stop accepting renders; the ones in progress finish before the worker processes exit."""
+        self._stopping.set()
+        #accept() does not notice the listener closing from another thread, so wake it with a connection
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        for pool in self.pools:
+            pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--address", type=str, default=RENDER_SERVICE_ADDRESS or "/tmp/render.sock",
+                        help="Unix socket path or host:port to listen on")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS, help="Render worker processes")
+
+    args = parser.parse_args()
+
+    address = _address(args.address)
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+    service = RenderService(args.address, args.workers)
+    for pool in service.pools:
+        #start every worker (and its GL context) now rather than on the first render
+        pool.submit(os.getpid).result()
+
+    def shutdown(signum, frame):
+        threading.Thread(target=service.stop).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    print(f"Render service listening on {args.address} with {args.workers} workers")
+    service.serve_forever()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import uuid
+
+#generated artifacts are stored under <dir>/<key>/ and indexed in <dir>/index.sqlite
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(os.getcwd(), "cache", "results"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def normalize_prompt(text):
+    return " ".join((text or "").lower().split())
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _key(kind, **fields):
+    return hashlib.sha256(json.dumps({"kind": kind, **fields}, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def text_key(text, art_style, should_remesh=True, quality="full"):
+    fields = {"prompt": normalize_prompt(text), "art_style": art_style, "should_remesh": should_remesh}
+    #full keys predate quality tiers; leaving quality out of them keeps existing entries valid
+    if quality != "full":
+        fields["quality"] = quality
+    return _key("text-to-3d", **fields)
+
+
+def image_key(image_path, should_remesh=True, should_texture=True, enable_pbr=False):
+    return _key("image-to-3d", image=file_sha256(image_path), should_remesh=should_remesh,
+                should_texture=should_texture, enable_pbr=enable_pbr)
+
+
+def remix_key(glb_path, text):
+    return _key("remix", model=file_sha256(glb_path), prompt=normalize_prompt(text))
+
+
+def _copy(src, dst):
+    #copy rather than hard link: output files get rewritten in place by later generations,
+    #which would otherwise corrupt the cached artifact sharing the inode
+    shutil.copyfile(src, dst)
+
+
+class ResultCache:
+    """
+    Persistent content-addressed store of generated files, bounded by total size (LRU) and entry age (TTL).
+    """
+
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, kind TEXT, files TEXT, size INTEGER,"
+            " created_at REAL, last_access REAL)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(entries)")]
+        if "meta" not in columns:
+            self._db.execute("ALTER TABLE entries ADD COLUMN meta TEXT")
+        self._db.commit()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Return {name: path} for a live entry and mark it recently used, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT files, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            names, created_at = json.loads(row[0]), row[1]
+            paths = {name: os.path.join(self._entry_dir(key), name) for name in names}
+            if now - created_at > self.ttl or not all(os.path.exists(p) for p in paths.values()):
+                self._remove_locked(key)
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return paths
+
+    def restore(self, key, dest_dir, names=None):
+        """Place the cached files for key into dest_dir; returns the restored paths or None on a miss."""
+        paths = self.get(key)
+        if paths is None:
+            return None
+        os.makedirs(dest_dir, exist_ok=True)
+        restored = {}
+        for name, src in paths.items():
+            if names is None or name in names:
+                restored[name] = os.path.join(dest_dir, name)
+                _copy(src, restored[name])
+        return restored
+
+    def meta(self, key):
+        """The meta dict stored with key's entry ({} if none), without touching its files."""
+        with self._lock:
+            row = self._db.execute("SELECT meta FROM entries WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] else {}
+
+    def put(self, key, kind, files, meta=None):
+        """Store {name: source_path} under key, then evict down to the size budget. meta is a small JSON-able dict."""
+        staging = f"{self._entry_dir(key)}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(staging)
+        size = 0
+        for name, src in files.items():
+            _copy(src, os.path.join(staging, name))
+            size += os.path.getsize(src)
+
+        now = time.time()
+        with self._lock:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            os.replace(staging, self._entry_dir(key))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, files, size, created_at, last_access, meta)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(sorted(files)), size, now, now, json.dumps(meta) if meta else None),
+            )
+            self._db.commit()
+            self._evict_locked(now)
+
+    def _evict_locked(self, now):
+        expired = self._db.execute("SELECT key FROM entries WHERE created_at < ?", (now - self.ttl,)).fetchall()
+        for (key,) in expired:
+            self._remove_locked(key)
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove_locked(key)
+            total -= size
+
+    def _remove_locked(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._db.commit()
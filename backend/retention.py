@@ -0,0 +1,189 @@
+import os
+import time
+import fcntl
+import shutil
+import threading
+import metrics
+from glb_optimize import lod_base_name
+
+#background cleanup of generated files: everything past its category's TTL is removed, then the least
+#recently used items go until the total is under the quota. Artifacts that a running job is writing or
+#reading (pending ones and the parents of pending remixes) are never removed.
+#with several server processes sharing the store, a lock file in the artifact root makes sure only one of
+#them sweeps at a time; the others skip that round.
+
+RETENTION_MAX_BYTES = int(os.getenv("RETENTION_MAX_BYTES", str(10 * 1024 ** 3)))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "300"))
+#pending artifacts older than this belong to a job that died with its process and are fair game
+RETENTION_PENDING_MAX_SECONDS = float(os.getenv("RETENTION_PENDING_MAX_SECONDS", str(24 * 3600)))
+#anything used more recently than this is treated as in use (e.g. still open in a viewer)
+RETENTION_IN_USE_SECONDS = float(os.getenv("RETENTION_IN_USE_SECONDS", "600"))
+
+#seconds each category is kept after its last use; 0 keeps it until the quota needs the space
+RETENTION_TTLS = {
+    "artifacts": float(os.getenv("RETENTION_TTL_ARTIFACTS", str(7 * 24 * 3600))),
+    "models": float(os.getenv("RETENTION_TTL_MODELS", str(7 * 24 * 3600))),
+    "images": float(os.getenv("RETENTION_TTL_IMAGES", str(24 * 3600))),
+    "debug_audio": float(os.getenv("RETENTION_TTL_DEBUG_AUDIO", str(24 * 3600))),
+    "batches": float(os.getenv("RETENTION_TTL_BATCHES", str(7 * 24 * 3600))),
+    "ingest": float(os.getenv("RETENTION_TTL_INGEST", str(24 * 3600))),
+}
+
+_DERIVED_SUFFIXES = (".gz", ".br")
+
+
+def _disk_usage(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _group_name(name):
+    """The file a derived file belongs to: model.low.glb.gz -> model.glb, so they are evicted together."""
+    for suffix in _DERIVED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return lod_base_name(name)
+
+
+def _file_groups(category, directory):
+    """Items of a plain directory: top-level files grouped with their derived files, and subdirectories."""
+    groups = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        key = entry.name if entry.is_dir() else _group_name(entry.name)
+        group = groups.setdefault(key, {"category": category, "key": os.path.join(directory, key),
+                                        "paths": [], "bytes": 0, "last_used": 0.0, "in_use": False})
+        group["paths"].append(entry.path)
+        group["bytes"] += _disk_usage(entry.path) if entry.is_dir() else stat.st_size
+        group["last_used"] = max(group["last_used"], stat.st_mtime)
+    return list(groups.values())
+
+
+class RetentionManager:
+    """
+    Periodically enforces per-category TTLs and a total size quota over the artifact store
+    and plain directories ({category: [dirs]}), recording bytes reclaimed per category.
+    """
+
+    def __init__(self, store, directories, max_bytes=RETENTION_MAX_BYTES, ttls=None,
+                 interval=RETENTION_INTERVAL_SECONDS):
+        self.store = store
+        self.directories = {category: list(dirs) for category, dirs in directories.items()}
+        self.max_bytes = max_bytes
+        self.ttls = dict(RETENTION_TTLS, **(ttls or {}))
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._sweep_lock = threading.Lock()
+
+    def _artifact_items(self, now):
+        rows = self.store.stored()
+        pending = {row[0] for row in rows if row[1] == "pending" and now - row[3] < RETENTION_PENDING_MAX_SECONDS}
+        # a pending remix still reads its parent's model
+        in_use = pending | {row[2] for row in rows if row[0] in pending and row[2]}
+        items = []
+        for artifact_id, status, parent_id, created_at, last_access in rows:
+            path = self.store.dir(artifact_id)
+            if not os.path.isdir(path):
+                continue
+            items.append({
+                "category": "artifacts",
+                "key": artifact_id,
+                "paths": [path],
+                "bytes": _disk_usage(path),
+                "last_used": last_access or created_at,
+                "in_use": artifact_id in in_use,
+            })
+        return items
+
+    def _remove(self, item):
+        if item["category"] == "artifacts":
+            self.store.evict(item["key"])
+            return
+        for path in item["paths"]:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def sweep(self, now=None):
+        """One pass: TTL first, then LRU down to the quota. Returns {category: bytes reclaimed}."""
+        with self._sweep_lock:
+            os.makedirs(self.store.root, exist_ok=True)
+            fd = os.open(os.path.join(self.store.root, ".retention.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return {}
+            try:
+                return self._sweep(now)
+            finally:
+                os.close(fd)
+
+    def _sweep(self, now):
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        items = self._artifact_items(now)
+        for category, dirs in self.directories.items():
+            for directory in dirs:
+                items.extend(_file_groups(category, directory))
+
+        for item in items:
+            item["in_use"] = item["in_use"] or now - item["last_used"] < RETENTION_IN_USE_SECONDS
+
+        reclaimed = {}
+        total = sum(item["bytes"] for item in items)
+        removable = sorted((item for item in items if not item["in_use"]), key=lambda item: item["last_used"])
+        for item in removable:
+            ttl = self.ttls.get(item["category"], 0)
+            expired = ttl > 0 and now - item["last_used"] > ttl
+            if not expired and total <= self.max_bytes:
+                continue
+            self._remove(item)
+            total -= item["bytes"]
+            reclaimed[item["category"]] = reclaimed.get(item["category"], 0) + item["bytes"]
+            metrics.inc("retention_bytes_reclaimed", item["bytes"], category=item["category"])
+            metrics.inc("retention_items_removed", category=item["category"], reason="ttl" if expired else "quota")
+
+        metrics.observe("retention_sweep_seconds", time.perf_counter() - started)
+        metrics.observe("retention_bytes_stored", total)
+        if reclaimed:
+            print(f"Retention: reclaimed {reclaimed}, {total} bytes stored")
+        if total > self.max_bytes:
+            print(f"Retention: {total} bytes stored is over the {self.max_bytes} quota but the rest is in use")
+        return reclaimed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print("Retention sweep failed:", e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,24 @@
+import os
+from dotenv import load_dotenv
+
+#configuration is read once, at startup: importing this module loads .env into the environment (variables
+#that are already set win), so every module reading its own os.getenv constants afterwards sees it too.
+#credentials and server options live on the settings object instead of being re-read on every call.
+
+load_dotenv()
+
+
+class Settings:
+    def __init__(self):
+        self.meshy_api_key = os.getenv("MESHY_API")
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.host = os.getenv("HOST", "0.0.0.0")
+        self.port = int(os.getenv("PORT", "5000"))
+        #load pyvista, the generation modules and the openai client in the background right after startup
+        self.prewarm = os.getenv("PREWARM", "1") == "1"
+
+    def meshy_headers(self):
+        return {"Authorization": f"Bearer {self.meshy_api_key}"}
+
+
+settings = Settings()
@@ -1,19 +1,20 @@
 import os
 import numpy as np
-import trimesh
 import pyrender
 from PIL import Image
+from mesh_prep import PREVIEW_FACE_BUDGET, load_mesh, prepare_mesh
+
+#define views: (eye position, target position)
+CAMERA_VIEWS = {
+    "front": (np.array([0, -3, 0]), np.array([0,0,0])),
+    "left": (np.array([3, 0, 0]), np.array([0,0,0])),
+    "right": (np.array([-3, 0, 0]), np.array([0,0,0])),
+    "back": (np.array([0, 3, 0]), np.array([0,0,0])),
+    #add top?
+}
 
 def load_scene(glb_path):
-    #load 3d scene from the GLB file using trimesh
-    scene_or_mesh = trimesh.load(glb_path, force='scene')
-    #convert trimesh.Scene to a list of meshes (if it isnt a single mesh)
-    if isinstance(scene_or_mesh, trimesh.Scene):
-        #create a single merged mesh
-        mesh = trimesh.util.concatenate(scene_or_mesh.dump())
-    else:
-        mesh = scene_or_mesh
-    return mesh
+    return load_mesh(glb_path)
 
 def look_at(eye, target, up=np.array([0, 0, 1])):
     forward = target - eye
@@ -29,14 +30,11 @@ def look_at(eye, target, up=np.array([0, 0, 1])):
     mat[:3, 3] = eye
     return mat
 
-def render_views(glb_path, output_dir):
+def render_views(glb_path, output_dir, views=CAMERA_VIEWS, viewport_size=(640, 480), face_budget=PREVIEW_FACE_BUDGET):
     os.makedirs(output_dir, exist_ok=True)
 
-    #load mesh from glb
-    mesh = load_scene(glb_path)
-    center = mesh.bounding_box.centroid
-    print("Mesh center:", center)
-    mesh.apply_translation(-mesh.bounding_box.centroid)
+    #load mesh from glb, centered, scaled to fit the camera distance and decimated to the preview face budget
+    mesh = prepare_mesh(glb_path, face_budget)
 
     #create pyrender mesh from trimesh
     render_mesh = pyrender.Mesh.from_trimesh(mesh, smooth=True)
@@ -45,20 +43,11 @@ def render_views(glb_path, output_dir):
     scene.add(render_mesh)
 
     #create offscreen renderer
-    renderer = pyrender.OffscreenRenderer(viewport_width=640, viewport_height=480)
+    renderer = pyrender.OffscreenRenderer(viewport_width=viewport_size[0], viewport_height=viewport_size[1])
 
     camera = pyrender.PerspectiveCamera(yfov=np.pi / 3.0)
 
-    #define views: (eye position, target position)
-    camera_views = {
-        "front": (np.array([0, -3, 0]), np.array([0,0,0])),
-        "left": (np.array([3, 0, 0]), np.array([0,0,0])),
-        "right": (np.array([-3, 0, 0]), np.array([0,0,0])),
-        "back": (np.array([0, 3, 0]), np.array([0,0,0])),
-        #add top?
-    }
-
-    for view, (eye, target) in camera_views.items():
+    for view, (eye, target) in views.items():
         #set camera pose using look_at
         camera_pose = look_at(eye, target)
         cam_node = scene.add(camera, pose=camera_pose)
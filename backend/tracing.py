@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+import metrics
+
+#spans around each pipeline stage (meshy create/poll/download, rendering, openai calls). a span records its
+#duration, its parent and attributes such as bytes transferred and time spent queued for an upstream.
+#spans nest through a context variable, so a job's stages share one trace id; recent traces are kept in
+#memory for /traces/<trace id>, every span feeds the span_seconds histogram on /metrics, and with
+#TRACE_LOG_PATH set finished spans are also appended there as JSON lines.
+
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
+#how many recent traces /traces can look up
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+_current = contextvars.ContextVar("span", default=None)
+_lock = threading.Lock()
+_traces = OrderedDict()
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.error = None
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount):
+        """Accumulate a numeric attribute, e.g. bytes read so far."""
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self):
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "started_at": round(self.started_at, 6), "duration": self.duration, "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def add(key, amount):
+    """Accumulate an attribute on the current span, if there is one (for helpers shared by several stages)."""
+    span_ = _current.get()
+    if span_ is not None:
+        span_.add(key, amount)
+
+
+def response_sizes(response):
+    """request_bytes/response_bytes attributes for a requests response."""
+    body = response.request.body if response.request is not None else None
+    return {"request_bytes": len(body or b""), "response_bytes": len(response.content)}
+
+
+def wrap(fn):
+    """fn bound to a copy of the caller's context, so spans it opens in a pool thread join the caller's trace."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def _record(span_):
+    record = span_.to_dict()
+    with _lock:
+        spans = _traces.get(span_.trace_id)
+        if spans is None:
+            spans = _traces[span_.trace_id] = []
+            while len(_traces) > TRACE_BUFFER_SIZE:
+                _traces.popitem(last=False)
+        spans.append(record)
+        if TRACE_LOG_PATH:
+            with open(TRACE_LOG_PATH, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    metrics.observe("span_seconds", span_.duration, span=span_.name, status="error" if span_.error else "ok")
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the block as a child of the current span (or as the root of a new trace)."""
+    parent = _current.get()
+    span_ = Span(name, parent.trace_id if parent else uuid.uuid4().hex, parent.span_id if parent else None, attrs)
+    token = _current.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        span_.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        span_.duration = round(time.perf_counter() - span_._started, 6)
+        _record(span_)
+
+
+def get_trace(trace_id):
+    """Finished spans of a trace in start order, or None if it is unknown or has aged out."""
+    with _lock:
+        spans = _traces.get(trace_id)
+        return sorted(spans, key=lambda s: s["started_at"]) if spans is not None else None
@@ -1,8 +1,17 @@
-import requests
-import time
-from dotenv import load_dotenv
+from settings import settings
+from meshy_client import MESHY_BASE_URL, wait_for_task_sync
+from downloader import download_task_models
+from rate_limit import upstream_call
+from http_session import get_session
+from tracing import response_sizes, span, wrap
+from concurrent.futures import ThreadPoolExecutor
 import os
 
+#"fast" stops after the preview (draft) model; it can be refined later from the stored preview task id.
+#"full" runs preview and refine in one go
+QUALITY_TIERS = ("fast", "full")
+DEFAULT_QUALITY = os.getenv("DEFAULT_QUALITY", "full")
+
 #create task to generate 3d model from text
 def create_draft_task(prompt, art_style, headers):
 
@@ -14,68 +23,53 @@ def create_draft_task(prompt, art_style, headers):
     "should_remesh": True,
     }
 
-    response = requests.post(
-    "https://api.meshy.ai/openapi/v2/text-to-3d",
-    headers=headers,
-    json=payload,
-    )
+    with span("meshy.create", kind="text-to-3d", mode="preview") as create:
+        response = upstream_call(
+        "meshy.create",
+        get_session().post,
+        f"{MESHY_BASE_URL}/openapi/v2/text-to-3d",
+        headers=headers,
+        json=payload,
+        )
+        create.set(status_code=response.status_code, **response_sizes(response))
 
-    if response.status_code != 200 and response.status_code != 202:
-        print("Error:", response.status_code, response.text)
-    response.raise_for_status()
-    task_id = response.json()["result"]
+        if response.status_code != 200 and response.status_code != 202:
+            print("Error:", response.status_code, response.text)
+        response.raise_for_status()
+        task_id = response.json()["result"]
+        create.set(task_id=task_id)
     print("Task created. Task ID:", task_id)
 
     return task_id
 
 #we get the id of the task returned from meshy ai
 #since this is an asynchronous task handled by meshy ai's servers, we need to continually request the status of the task
-def return_draft_task(task_id, headers):
-    task = None
-
-    while True:
-        task_response = requests.get(
-            f"https://api.meshy.ai/openapi/v2/text-to-3d/{task_id}",
-            headers=headers,
-        )
-
-        if task_response.status_code != 200 and task_response.status_code != 202:
-            print("Error:", task_response.status_code, task_response.text)
-        task_response.raise_for_status()
+#polling is multiplexed with every other outstanding task on the shared meshy client's event loop
+def return_draft_task(task_id, headers, on_progress=None):
+    report = (lambda task: on_progress("draft", task["progress"])) if on_progress else None
+    task = wait_for_task_sync("text-to-3d", task_id, headers, report, stage="draft")
 
-        task = task_response.json()
-
-        #if we break from this, the task has finished processing on the server
-        if task["status"] == "SUCCEEDED":
-            print("Task finished.")
-            break
-
-        if task["status"] == "FAILED" or task["status"] == "CANCELED" :
-            print("Task failed, please retry this operation.")
-            return
-
-        print("Task status:", task["status"], "| Progress:", task["progress"], "| Retrying in 5 seconds...")
-        time.sleep(5)
+    if task["status"] != "SUCCEEDED":
+        print("Task failed, please retry this operation.")
+        return
 
+    print("Task finished.")
     return task
 
-#download the 3d model in glb format
+#download the 3d model in glb format (plus any extra MESHY_MODEL_FORMATS), streamed straight to disk
 def download_draft__model(task, draft_filename):
-    model_url = task["model_urls"]["glb"]
-
-    model_response = requests.get(model_url)
-    model_response.raise_for_status()
-
-    with open(draft_filename, "wb") as f:
-        f.write(model_response.content)
+    download_task_models(task, draft_filename)
 
     print("Draft model downloaded.")
 
 
-def gen_3d_draft(prompt, artstyle, draft_filename, headers):
+def gen_3d_draft(prompt, artstyle, draft_filename, headers, on_progress=None):
     task_id = create_draft_task(prompt, artstyle, headers)
 
-    task = return_draft_task(task_id, headers)
+    task = return_draft_task(task_id, headers, on_progress)
+
+    if task is None:
+        return
 
     download_draft__model(task, draft_filename)
 
@@ -89,88 +83,108 @@ def create_refined_task(task_id, headers):
         #"task_id": task_id,
     }
 
-    generate_refined_response = requests.post(
-        "https://api.meshy.ai/openapi/v2/text-to-3d",
-        headers=headers,
-        json=generate_refined_request,
-    )
+    with span("meshy.create", kind="text-to-3d", mode="refine") as create:
+        generate_refined_response = upstream_call(
+            "meshy.create",
+            get_session().post,
+            f"{MESHY_BASE_URL}/openapi/v2/text-to-3d",
+            headers=headers,
+            json=generate_refined_request,
+        )
+        create.set(status_code=generate_refined_response.status_code, **response_sizes(generate_refined_response))
 
-    if generate_refined_response.status_code != 200 and generate_refined_response.status_code != 202:
-            print("Error:", generate_refined_response.status_code, generate_refined_response.text)
+        if generate_refined_response.status_code != 200 and generate_refined_response.status_code != 202:
+                print("Error:", generate_refined_response.status_code, generate_refined_response.text)
 
-    generate_refined_response.raise_for_status()
+        generate_refined_response.raise_for_status()
 
-    refined_task_id = generate_refined_response.json()["result"]
+        refined_task_id = generate_refined_response.json()["result"]
+        create.set(task_id=refined_task_id)
 
     print("Refined task created. Task ID:", refined_task_id)
     
     return refined_task_id
 
 #poll until refined task is done processing on server
-def return_refined_task(refined_task_id, headers):
-    refined_task = None
+def return_refined_task(refined_task_id, headers, on_progress=None):
+    report = (lambda task: on_progress("refine", task["progress"])) if on_progress else None
+    refined_task = wait_for_task_sync("text-to-3d", refined_task_id, headers, report, stage="refine")
 
-    while True:
-        refined_task_response = requests.get(
-            f"https://api.meshy.ai/openapi/v2/text-to-3d/{refined_task_id}",
-            headers=headers,
-        )
-
-        if refined_task_response.status_code != 200 and refined_task_response.status_code != 202:
-            print("Error:", refined_task_response.status_code, refined_task_response.text)
-        refined_task_response.raise_for_status()
+    if refined_task["status"] != "SUCCEEDED":
+        print("Refined task failed, please retry this operation.")
+        return
 
-        refined_task = refined_task_response.json()
+    print("Refined task finished.")
+    return refined_task
 
-        if refined_task["status"] == "SUCCEEDED":
-            print("Refined task finished.")
-            break
+def download_refined_model(refined_task, refined_filename):
+    download_task_models(refined_task, refined_filename)
 
-        if refined_task["status"] == "FAILED" or refined_task["status"] == "CANCELED" :
-            print("Refined task failed, please retry this operation.")
-            return
+    print("Refined model downloaded.")
 
-        print("Refined task status:", refined_task["status"], "| Progress:", refined_task["progress"], "| Retrying in 5 seconds...")
-        time.sleep(5)
+def gen_3d_refined(task_id, refined_filename, headers, on_progress=None):
+    refined_task_id = create_refined_task(task_id, headers)
 
-    return refined_task
+    refined_task = return_refined_task(refined_task_id, headers, on_progress)
+    if refined_task is None:
+        return
 
-def download_refined_model(refined_task, refined_filename):
-    refined_model_url = refined_task["model_urls"]["glb"]
+    download_refined_model(refined_task, refined_filename)
 
-    refined_model_response = requests.get(refined_model_url)
-    refined_model_response.raise_for_status()
 
-    with open(refined_filename, "wb") as f:
-        f.write(refined_model_response.content)
+#returns the preview task id (None if the preview failed)
+def txt_gen_3d(text, artstyle, save_path, on_progress=None):
 
-    print("Refined model downloaded.")
+    os.makedirs(save_path, exist_ok=True)
 
-def gen_3d_refined(task_id, refined_filename, headers):
-    refined_task_id = create_refined_task(task_id, headers)
+    draft_filepath = save_path + "/draft_model.glb"
+    refined_filepath = save_path + "/refined_model.glb"
+    
+    return gen_3d_pipelined(text, artstyle, draft_filepath, refined_filepath, settings.meshy_headers(), on_progress)
 
-    refined_task = return_refined_task(refined_task_id, headers)
 
-    download_refined_model(refined_task, refined_filename)
+#fast tier: only the preview phase; keep the returned preview task id to refine later with txt_refine_3d
+def txt_gen_3d_preview(text, artstyle, save_path, on_progress=None):
+    os.makedirs(save_path, exist_ok=True)
 
+    return gen_3d_draft(text, artstyle, save_path + "/draft_model.glb", settings.meshy_headers(), on_progress)
 
-def txt_gen_3d(text, artstyle, save_path):
 
+#second phase on its own, for a preview generated earlier; meshy keeps preview tasks around, so no re-upload
+def txt_refine_3d(preview_task_id, save_path, on_progress=None):
     os.makedirs(save_path, exist_ok=True)
 
-    load_dotenv()
+    gen_3d_refined(preview_task_id, save_path + "/refined_model.glb", settings.meshy_headers(), on_progress)
 
-    api_key = os.getenv("MESHY_API")
 
-    headers = {
-        "Authorization": f"Bearer {api_key}"
-    }
+#same two phases as gen_3d_draft + gen_3d_refined, but the refine task only needs the preview task id,
+#so it is created as soon as the preview succeeds and the draft download overlaps refine polling
+def gen_3d_pipelined(prompt, artstyle, draft_filename, refined_filename, headers, on_progress=None):
+    task_id = create_draft_task(prompt, artstyle, headers)
 
-    draft_filepath = save_path + "/draft_model.glb"
-    refined_filepath = save_path + "/refined_model.glb"
-    
-    task_id = gen_3d_draft(text, artstyle, draft_filepath, headers)
-    gen_3d_refined(task_id, refined_filepath, headers)
+    task = return_draft_task(task_id, headers, on_progress)
+    if task is None:
+        return
+
+    refined_task_id = create_refined_task(task_id, headers)
+
+    def draft_downloaded(future):
+        if on_progress and future.exception() is None:
+            on_progress(None, draft_ready=True)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="draft-download") as pool:
+        draft_download = pool.submit(wrap(download_draft__model), task, draft_filename)
+        draft_download.add_done_callback(draft_downloaded)
+
+        refined_task = return_refined_task(refined_task_id, headers, on_progress)
+        draft_download.result()
+
+    if refined_task is None:
+        return task_id
+
+    download_refined_model(refined_task, refined_filename)
+
+    return task_id
 
 
 if __name__ == "__main__":
@@ -180,6 +194,7 @@ if __name__ == "__main__":
     parser.add_argument("--text", type=str, required=True, help="Text prompt to guide 3D generation")
     parser.add_argument("--artstyle", type=str, choices=['realistic', 'sculpture', 'pbr'], default="realistic", help="Art style of the 3D model")
     parser.add_argument("--save_path", type=str, required=True, help="Directory to save the 3D files")
+    parser.add_argument("--quality", type=str, choices=QUALITY_TIERS, default=DEFAULT_QUALITY, help="fast stops after the draft")
     
     args = parser.parse_args()
 
@@ -193,11 +208,15 @@ if __name__ == "__main__":
     #the first phase generates a draft
     #the second phase refines the draft
 
+    headers = settings.meshy_headers()
+
     draft_filepath = save_path + "/draft_model.glb"
     refined_filepath = save_path + "/refined_model.glb"
 
     #FIRST PHASE: GENERATE 3D DRAFT
-    task_id = gen_3d_draft(text, artstyle, draft_filepath)
+    task_id = gen_3d_draft(text, artstyle, draft_filepath, headers)
+    print("Preview task ID (refine it later with this):", task_id)
 
     #SECOND PHASE: GENERATE 3D REFINE
-    gen_3d_refined(task_id, refined_filepath)
\ No newline at end of file
+    if task_id is not None and args.quality == "full":
+        gen_3d_refined(task_id, refined_filepath, headers)
@@ -1,6 +1,24 @@
 import pyvista as pv
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from PIL import Image
+from mesh_prep import PREVIEW_FACE_BUDGET, decimate_actors, fit_actors
+from result_cache import file_sha256
+from tracing import span
+
+WINDOW_SIZE = (640, 480)
+
+# Define camera views: name -> [camera position, focal point, view up]
+CAMERA_VIEWS = {
+    "front":   [(0, 0, 5), (0, 0, 0), (0, 1, 0)],
+    "back":    [(0, 0, -5), (0, 0, 0), (0, 1, 0)],
+    "left":    [(-5, 0, 0), (0, 0, 0), (0, 1, 0)],
+    "right":   [(5, 0, 0), (0, 0, 0), (0, 1, 0)],
+    "top":     [(0, 5, 0), (0, 0, 0), (0, 0, -1)],
+    "bottom":  [(0, -5, 0), (0, 0, 0), (0, 0, 1)],
+}
 
 def add_lights(plotter, intensity=1.5):
     plotter.add_light(pv.Light(position=(0, 0, 5), focal_point=(0, 0, 0), intensity=intensity))
@@ -10,49 +28,111 @@ def add_lights(plotter, intensity=1.5):
     plotter.add_light(pv.Light(position=(5, 0, 0), focal_point=(0, 0, 0), intensity=intensity))
     plotter.add_light(pv.Light(position=(-5, 0, 0), focal_point=(0, 0, 0), intensity=intensity))
 
+
+class WarmRenderer:
+    """
+    A long-lived offscreen plotter with its lights already set up.
+    Each render swaps the scene's actors for the new model, so the GL context is created only once.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE):
+        self.window_size = window_size
+        self.plotter = pv.Plotter(off_screen=True, window_size=window_size, lighting='none')
+        add_lights(self.plotter)
+        self.renders = 0
+
+    def render(self, glb_path, views=CAMERA_VIEWS, face_budget=PREVIEW_FACE_BUDGET, model_info=None):
+        """
+        Render every view of glb_path and return {view_name: HxWx3 uint8 frame}.
+        model_info ({"sha256", "triangles"}, recorded at upload) saves hashing the file and decimating small models.
+        """
+        model_info = model_info or {}
+        renderer = self.plotter.renderer
+        # glTF importer actors are not tracked by pyvista, so clear them at the vtk level; lights stay
+        renderer.RemoveAllViewProps()
+        self.plotter.import_gltf(glb_path)
+        # bound render cost for dense models and fit the model to the fixed camera distance
+        if model_info.get("triangles") is None or model_info["triangles"] > face_budget:
+            decimate_actors(renderer, model_info.get("sha256") or file_sha256(glb_path), face_budget)
+        fit_actors(renderer)
+
+        frames = {}
+        for view_name, (pos, focal, up) in views.items():
+            self.plotter.camera_position = [pos, focal, up]
+            frames[view_name] = self.plotter.screenshot(return_img=True)
+
+        renderer.RemoveAllViewProps()
+        self.renders += 1
+        return frames
+
+    def close(self):
+        self.plotter.close()
+
+
+# vtk is not thread safe and the plotter's GL context belongs to the thread that created it, so each process
+# keeps one warmed renderer that is only ever created, used and closed on a single render thread
+_renderer = None
+_render_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+
+def _warm_up(window_size):
+    global _renderer
+    if _renderer is None or _renderer.window_size != window_size:
+        if _renderer is not None:
+            _renderer.close()
+        _renderer = WarmRenderer(window_size)
+    return _renderer
+
+
+def _render(glb_path, views, window_size, face_budget, model_info, queued):
+    global _renderer
+    # time spent waiting for other requests' renders on the shared plotter
+    queue_wait = time.perf_counter() - queued
+    renderer = _warm_up(window_size)
+    try:
+        return queue_wait, renderer.render(glb_path, views, face_budget, model_info)
+    except Exception:
+        # a failed import can leave the scene half built; start from a fresh plotter next time
+        renderer.close()
+        _renderer = None
+        raise
+
+
+def warm_up(window_size=WINDOW_SIZE):
+    return _render_thread.submit(_warm_up, tuple(window_size)).result()
+
+
+def render_frames_with_pyvista(glb_path, views=CAMERA_VIEWS, window_size=WINDOW_SIZE, face_budget=PREVIEW_FACE_BUDGET,
+                               model_info=None):
+    with span("render", views=len(views), model_bytes=os.path.getsize(glb_path)) as render:
+        queued = time.perf_counter()
+        queue_wait, frames = _render_thread.submit(_render, glb_path, views, tuple(window_size), face_budget,
+                                                   model_info, queued).result()
+        render.set(queue_wait_seconds=round(queue_wait, 6))
+        return frames
+
+
 def render_views_with_pyvista(glb_path, output_dir):
     os.makedirs(output_dir, exist_ok=True)
     print("Created images directory:", output_dir)
 
-    # Create a plotter with offscreen rendering
-    plotter = pv.Plotter(off_screen=True, window_size=(640, 480), lighting='none')
-    print("Created plotter")
-
-    # Load the GLB model
+    # Load the GLB model and render every view on the warmed plotter
     try:
-        plotter.import_gltf(glb_path)
-        print("Imported GLB file:", glb_path)
+        frames = render_frames_with_pyvista(glb_path)
+        print("Rendered GLB file:", glb_path)
     except Exception as e:
         print("Error importing GLB file:", e)
         return
 
-    # Add lights
-    add_lights(plotter)
-    print("Added lights")
-
-    # Define camera views
-    camera_views = {
-        "front":   [(0, 0, 5), (0, 0, 0), (0, 1, 0)],
-        "back":    [(0, 0, -5), (0, 0, 0), (0, 1, 0)],
-        "left":    [(-5, 0, 0), (0, 0, 0), (0, 1, 0)],
-        "right":   [(5, 0, 0), (0, 0, 0), (0, 1, 0)],
-        "top":     [(0, 5, 0), (0, 0, 0), (0, 0, -1)],
-        "bottom":  [(0, -5, 0), (0, 0, 0), (0, 0, 1)],
-    }
-
-    # Render and save screenshots
-    for view_name, (pos, focal, up) in camera_views.items():
+    # Save screenshots
+    for view_name, frame in frames.items():
         try:
-            plotter.camera_position = [pos, focal, up]
             out_path = os.path.join(output_dir, f"{view_name}.png")
-            plotter.show(screenshot=out_path, auto_close=False)
+            Image.fromarray(np.asarray(frame)).save(out_path)
             print(f"✅ Saved view: {view_name} → {out_path}")
         except Exception as e:
             print(f"❌ Error rendering view {view_name}:", e)
 
-    plotter.close()
-    print("Plotter closed.")
-
 
 if __name__ == "__main__":
     import argparse
@@ -62,4 +142,4 @@ if __name__ == "__main__":
     parser.add_argument("--save_path", type=str, required=True, help="Directory to save output images")
 
     args = parser.parse_args()
-    render_views_with_pyvista(args.glb_path, args.save_path)
\ No newline at end of file
+    render_views_with_pyvista(args.glb_path, args.save_path)
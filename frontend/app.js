@@ -10,6 +10,9 @@ class TextTo3DApp {
     this.currentModel = null;
     this.modelUrls = { refined: null, draft: null };
     this.currentModelType = "refined";
+    // Artifact of the generated or uploaded model that remixes start from
+    this.artifactId = null;
+    this.sessionId = this.loadSessionId();
 
     // Speech to text state
     this.mediaRecorder = null;
@@ -152,58 +155,56 @@ class TextTo3DApp {
     );
   }
 
+  // Fetch and parse a GLB; resolves with the scene, which LOD the server sent, its size and decode time.
   async loadGLBModel(url) {
-    return new Promise((resolve, reject) => {
-      const loader = new THREE.GLTFLoader();
-      loader.load(
-        url,
-        (gltf) => resolve(gltf.scene),
-        undefined,
-        (error) => reject(error)
-      );
-    });
+    const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error(`HTTP error ${response.status}`);
+    }
+    const lod = response.headers.get("X-Model-LOD") || "original";
+    const buffer = await response.arrayBuffer();
+
+    const loader = new THREE.GLTFLoader();
+    if (typeof MeshoptDecoder !== "undefined") {
+      loader.setMeshoptDecoder(MeshoptDecoder);
+    }
+
+    const start = performance.now();
+    const gltf = await new Promise((resolve, reject) =>
+      loader.parse(buffer, "", resolve, reject)
+    );
+    return {
+      model: gltf.scene,
+      lod,
+      bytes: buffer.byteLength,
+      decodeMs: performance.now() - start,
+    };
+  }
+
+  withLod(url, lod) {
+    return `${url}${url.includes("?") ? "&" : "?"}lod=${lod}`;
   }
 
   async displayModel(modelUrl, modelType = "refined") {
+    // A newer displayModel call supersedes any upgrade still in flight for an older one.
+    const token = (this.displayToken = (this.displayToken || 0) + 1);
     try {
-      if (this.currentModel) {
-        this.scene.remove(this.currentModel);
-      }
-
       this.showModelLoading();
-      const model = await this.loadGLBModel(modelUrl);
 
-      const box = new THREE.Box3().setFromObject(model);
-      const center = box.getCenter(new THREE.Vector3());
-      const size = box.getSize(new THREE.Vector3());
-
-      model.position.sub(center);
-
-      const maxSize = Math.max(size.x, size.y, size.z);
-      const scale = 2 / maxSize;
-      model.scale.setScalar(scale);
-
-      model.traverse((child) => {
-        if (child.isMesh) {
-          child.castShadow = true;
-          child.receiveShadow = true;
-        }
-      });
-
-      this.currentModel = model;
-      this.currentModelType = modelType;
-      this.scene.add(model);
-
-      this.clearPlaceholder();
-      if (!this.viewerArea.contains(this.renderer.domElement)) {
-        this.viewerArea.appendChild(this.renderer.domElement);
-      }
-
-      this.updateModelInfo(modelType, size);
+      // Show the small LOD first, then upgrade once the full-detail variant arrives.
+      const preview = await this.loadGLBModel(this.withLod(modelUrl, "low"));
+      if (token !== this.displayToken) return;
+      this.showModel(preview, modelType);
       this.addMessage(
         `${modelType === "refined" ? "Refined" : "Draft"} model loaded.`,
         "system"
       );
+
+      if (preview.lod === "low") {
+        const full = await this.loadGLBModel(this.withLod(modelUrl, "high"));
+        if (token !== this.displayToken) return;
+        this.showModel(full, modelType);
+      }
     } catch (error) {
       console.error("Error displaying model:", error);
       this.addMessage(
@@ -214,6 +215,41 @@ class TextTo3DApp {
     }
   }
 
+  showModel({ model, lod, bytes, decodeMs }, modelType) {
+    if (this.currentModel) {
+      model.rotation.copy(this.currentModel.rotation);
+      this.scene.remove(this.currentModel);
+    }
+
+    const box = new THREE.Box3().setFromObject(model);
+    const center = box.getCenter(new THREE.Vector3());
+    const size = box.getSize(new THREE.Vector3());
+
+    model.position.sub(center);
+
+    const maxSize = Math.max(size.x, size.y, size.z);
+    const scale = 2 / maxSize;
+    model.scale.setScalar(scale);
+
+    model.traverse((child) => {
+      if (child.isMesh) {
+        child.castShadow = true;
+        child.receiveShadow = true;
+      }
+    });
+
+    this.currentModel = model;
+    this.currentModelType = modelType;
+    this.scene.add(model);
+
+    this.clearPlaceholder();
+    if (!this.viewerArea.contains(this.renderer.domElement)) {
+      this.viewerArea.appendChild(this.renderer.domElement);
+    }
+
+    this.updateModelInfo(modelType, size, { lod, bytes, decodeMs });
+  }
+
   showModelLoading() {
     const placeholder = this.viewerArea.querySelector(".placeholder");
     if (placeholder) {
@@ -241,7 +277,7 @@ class TextTo3DApp {
     }
   }
 
-  updateModelInfo(modelType, size) {
+  updateModelInfo(modelType, size, transfer = null) {
     const modelDetails = document.getElementById("model-details");
     if (!modelDetails) return;
     modelDetails.innerHTML = `
@@ -252,6 +288,13 @@ class TextTo3DApp {
       2
     )} × ${size.z.toFixed(2)}<br/>
       <strong>Format:</strong> GLB (binary glTF)<br/>
+      ${
+        transfer
+          ? `<strong>Detail:</strong> ${transfer.lod} (${this.formatFileSize(
+              transfer.bytes
+            )}, decoded in ${transfer.decodeMs.toFixed(0)} ms)<br/>`
+          : ""
+      }
       <strong>Status:</strong> Ready for inspection and download
     `;
   }
@@ -347,12 +390,14 @@ class TextTo3DApp {
 
       fetch("/upload", {
         method: "POST",
+        headers: { "X-Session-Id": this.sessionId },
         body: formData,
       })
         .then((res) => res.json())
         .then(async (data) => {
           if (data.status === "success") {
-            const modelUrl = `/models/${data.filename}`;
+            const modelUrl = data.models.refined;
+            this.artifactId = data.artifact_id;
             this.modelUrls.refined = modelUrl;
             this.currentModelType = "refined";
             await this.displayModel(modelUrl, "refined");
@@ -459,6 +504,16 @@ class TextTo3DApp {
 
   /* ---------- Chat / generation ---------- */
 
+  // One id per browser so the server keeps this user's artifacts apart from everyone else's.
+  loadSessionId() {
+    let id = localStorage.getItem("sessionId");
+    if (!id) {
+      id = crypto.randomUUID().replace(/-/g, "");
+      localStorage.setItem("sessionId", id);
+    }
+    return id;
+  }
+
   async handleSubmit(e) {
     e.preventDefault();
     const message = this.chatInput.value.trim();
@@ -491,39 +546,57 @@ class TextTo3DApp {
     this.showTypingIndicator();
     this.showProgress();
 
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-      progress += Math.random() * 15;
-      if (progress > 90) progress = 90;
-      this.updateProgress(progress);
-    }, 200);
-
     try {
       const response = await fetch("/txtgen3d", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          "X-Session-Id": this.sessionId,
+        },
         body: JSON.stringify({
           text: message,
           artstyle: "realistic",
-          save_path: "3d_files",
+          // The viewer shows the refined model; don't depend on the server's DEFAULT_QUALITY.
+          quality: "full",
         }),
       });
 
-      clearInterval(progressInterval);
-      this.updateProgress(100);
-
       if (!response.ok) {
         throw new Error(`HTTP error ${response.status}`);
       }
 
-      const result = await response.json();
+      // Cache hits come back finished; everything else is a queued job to follow.
+      // The draft is downloaded while the refine runs, so show it as soon as it lands.
+      const queued = await response.json();
+      let draftShown = false;
+      const job = queued.job_id
+        ? await this.waitForJob(queued.job_id, (job) => {
+            this.updateProgress(this.overallProgress(job));
+            if (!draftShown && job.result && job.result.draft_ready) {
+              draftShown = true;
+              this.modelUrls.draft = `/artifacts/${queued.artifact_id}/files/draft_model.glb`;
+              this.displayModel(this.modelUrls.draft, "draft");
+            }
+          })
+        : null;
+      // A finished job carries artifact_id and models in its result.
+      const result = job
+        ? { status: job.status, message: job.message, ...job.result }
+        : queued;
+      this.updateProgress(100);
 
       if (result.status === "success") {
         this.addMessage(`3D model generated: ${result.message}`, "bot");
 
-        this.modelUrls.refined = `/models/refined_model.glb`;
-        this.modelUrls.draft = `/models/draft_model.glb`;
-        await this.displayModel(this.modelUrls.refined, "refined");
+        // Versioned artifact URLs are cacheable forever.
+        this.artifactId = result.artifact_id;
+        this.modelUrls.refined = result.models.refined || null;
+        this.modelUrls.draft = result.models.draft || null;
+        if (this.modelUrls.refined) {
+          await this.displayModel(this.modelUrls.refined, "refined");
+        } else {
+          await this.displayModel(this.modelUrls.draft, "draft");
+        }
 
         this.addMessage(
           "Use the mouse to rotate the model and the scroll wheel to zoom.",
@@ -536,7 +609,6 @@ class TextTo3DApp {
         );
       }
     } catch (error) {
-      clearInterval(progressInterval);
       console.error("API call failed:", error);
       this.addMessage(
         "There was an error processing your request. Ensure the backend is running and try again.",
@@ -551,6 +623,38 @@ class TextTo3DApp {
     }
   }
 
+  /* ---------- Background jobs ---------- */
+
+  // Generations run as server-side jobs; poll until the job reaches a terminal status.
+  async waitForJob(jobId, onUpdate, intervalMs = 1000) {
+    while (true) {
+      const response = await fetch(`/jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error ${response.status}`);
+      }
+      const job = await response.json();
+      if (onUpdate) onUpdate(job);
+      if (["success", "fail", "error"].includes(job.status)) {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  }
+
+  // Map a job's stage and per-stage Meshy progress onto a single 0-100 bar.
+  overallProgress(job) {
+    const stages = {
+      draft: [0, 50],
+      refine: [50, 100],
+      render: [0, 10],
+      image: [10, 30],
+      remix_draft: [30, 100],
+    };
+    const [start, end] = stages[job.stage] || [0, 5];
+    const progress = Math.min(job.progress || 0, 100);
+    return start + ((end - start) * progress) / 100;
+  }
+
   async sendRemixRequest(prompt) {
     if (!prompt) return;
 
@@ -560,53 +664,51 @@ class TextTo3DApp {
 
     this.showTypingIndicator();
     this.showProgress();
-    let progress = 0;
-    const interval = setInterval(() => {
-      progress += Math.random() * 10;
-      this.updateProgress(Math.min(progress, 90));
-    }, 200);
 
     try {
-      if (!this.modelUrls.refined || !this.modelUrls.refined.includes("/models/")) {
+      if (!this.artifactId) {
         throw new Error("No uploaded model found for remixing.");
       }
 
-      const filename = this.modelUrls.refined.split("/models/")[1];
-      const glb_path = `3d_files/${filename}`;
-
       const response = await fetch("/remixgen3d", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          "X-Session-Id": this.sessionId,
+        },
         body: JSON.stringify({
-          glb_path: glb_path,
-          images_output: "images",
+          parent_id: this.artifactId,
           text: prompt,
-          image_output: "image",
-          threeD_output: "3d_files",
         }),
       });
 
-      clearInterval(interval);
-      this.updateProgress(100);
-
       if (!response.ok) {
         const errorText = await response.text();
         throw new Error(`HTTP ${response.status}: ${errorText}`);
       }
 
-      const result = await response.json();
+      // Cache hits come back finished; everything else is a queued job to follow.
+      const queued = await response.json();
+      const job = queued.job_id
+        ? await this.waitForJob(queued.job_id, (job) =>
+            this.updateProgress(this.overallProgress(job))
+          )
+        : null;
+      const result = job
+        ? { status: job.status, message: job.message, ...job.result }
+        : queued;
+      this.updateProgress(100);
 
       if (result.status === "success") {
         this.addMessage("Remix complete. Displaying new model.", "bot");
 
-        const remixPath = "/models/remixed_draft_model.glb";
+        const remixPath = result.models.draft;
         this.modelUrls.draft = remixPath;
         await this.displayModel(remixPath, "draft");
       } else {
         this.addMessage(`Remix failed: ${result.message}`, "bot");
       }
     } catch (error) {
-      clearInterval(interval);
       console.error("Remix error:", error);
       this.addMessage(`Remix error: ${error.message}`, "bot");
     } finally {